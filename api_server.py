@@ -3,61 +3,235 @@ API Server for Decentralized File Storage Frontend
 This bridges the web UI with your existing backend
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from urllib.parse import quote
 import os
 import json
 import asyncio
-import httpx
-from typing import List, Dict
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+from typing import List, Dict, Optional, Sequence, Tuple
+from src.common.compression import DEFAULT_CODECS, parse_codecs
+from src.common.erasure import ReedSolomon
 from src.common.hashing import sha256_hex
+from src.common.merkle import MerkleTree, merkle_root
+from src.common.transport import Transport, get_transport, set_transport
+from src.dht.placement import Placement
 from src.dht.routing import Contact
-from src.retrieval.manifest import Manifest
-from src.retrieval.retriever import retrieve_file
-
-app = FastAPI(title="Decentralized Storage API")
-
-# Enable CORS for frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+from src.retrieval.cache import ChunkCache
+from src.retrieval.catalog import ManifestCatalog
+from src.retrieval.manifest import BINARY_SUFFIX, JSON_SUFFIX, Manifest, save_binary_manifest
+from src.retrieval.ranges import ChunkLayout, RangeNotSatisfiable, parse_range
+from src.retrieval.retriever import (get_chunk_cache, resolve_span, retrieve_file, set_chunk_cache,
+                                     stream_byte_range, stream_file)
+from src.storage.chunk_store import open_store
+from src.storage.dedup import DedupIndex
+from src.utils.chunking import make_chunker
+from src.utils.parallel import default_workers, ordered_amap
 
 # Configuration
 DHT_HOST = "127.0.0.1"
 DHT_PORT = 7001
 STORAGE_NODES = [7002, 7003]
+REPLICATION_FACTOR = 2  # copies of each chunk, on the nodes closest to its hash
 CHUNK_SIZE = 1024 * 1024  # 1MB
+REGISTER_BATCH = 256  # chunk registrations per /store_many call
+DOWNLOAD_WINDOW = 6  # chunks fetched ahead of the client when streaming
+INGEST_WORKERS = default_workers()  # threads hashing and writing chunks
+INGEST_WINDOW = 2 * INGEST_WORKERS  # chunks in flight per upload
+HTTP_MAX_CONNECTIONS_PER_HOST = 8
+HTTP_KEEPALIVE_SECONDS = 30.0
+DEDUP_INDEX_PATH = "./storage/dedup-index.sqlite3"
+CATALOG_PATH = "./storage/catalog.sqlite3"
+CACHE_MEMORY_BYTES = 256 * 1024 * 1024  # hot chunks kept in RAM
+CACHE_DIR = "./storage/cache"
+CACHE_DISK_BYTES = 4 * 1024 * 1024 * 1024  # warm chunks kept on local disk
+MERKLE_CACHE_BYTES = 64 * 1024 * 1024  # digests of recently proven files' Merkle trees
+FILES_PAGE_SIZE = 100
+FILES_PAGE_MAX = 1000
 MANIFESTS_DIR = "manifests"
+MANIFEST_SUFFIXES = {"json": JSON_SUFFIX, "binary": BINARY_SUFFIX}
 DOWNLOADS_DIR = "downloads"
 
 os.makedirs(MANIFESTS_DIR, exist_ok=True)
 os.makedirs(DOWNLOADS_DIR, exist_ok=True)
 
 
+dedup_index: Optional[DedupIndex] = None
+catalog: Optional[ManifestCatalog] = None
+ingest_pool: Optional[ThreadPoolExecutor] = None
+replica_pool: Optional[ThreadPoolExecutor] = None
+placement = Placement([(DHT_HOST, port) for port in STORAGE_NODES], REPLICATION_FACTOR)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One keep-alive pool per peer, shared by every RPC this process makes
+    set_transport(Transport(
+        max_connections_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+        keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+    ))
+    # Known chunks are skipped on upload; seed the index from the node
+    # directories the first time it is created
+    global dedup_index, ingest_pool, replica_pool, catalog
+    ingest_pool = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+    replica_pool = ThreadPoolExecutor(max_workers=INGEST_WORKERS * len(STORAGE_NODES), thread_name_prefix="replica")
+    dedup_index = DedupIndex(DEDUP_INDEX_PATH)
+    if not len(dedup_index):
+        for port in STORAGE_NODES:
+            dedup_index.add_many(open_store(f"./storage/{port}").iter_hashes())
+    # Listing and search read the catalog; pick up manifests changed while down
+    catalog = ManifestCatalog(CATALOG_PATH, MANIFESTS_DIR)
+    catalog.rebuild()
+    # Repeat downloads of hot files are served without touching the network
+    set_chunk_cache(ChunkCache(CACHE_MEMORY_BYTES, CACHE_DIR, CACHE_DISK_BYTES))
+    try:
+        yield
+    finally:
+        await get_transport().aclose()
+        ingest_pool.shutdown()
+        replica_pool.shutdown()
+        dedup_index.close()
+        catalog.close()
+        set_chunk_cache(None)
+
+
+app = FastAPI(title="Decentralized Storage API", lifespan=lifespan)
+
+# Enable CORS for frontend
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
 def chunk_bytes(data: bytes, size: int):
     """Split data into chunks"""
     for i in range(0, len(data), size):
         yield data[i:i+size]
 
 
+async def read_chunks(file: UploadFile, chunker):
+    """Yield chunks from an upload without buffering the whole file"""
+    loop = asyncio.get_running_loop()
+    while True:
+        block = await file.read(CHUNK_SIZE)
+        if not block:
+            break
+        # Content-defined cut points are CPU work; keep them off the event loop
+        for chunk in await loop.run_in_executor(ingest_pool, chunker.feed, block):
+            yield chunk
+    for chunk in await loop.run_in_executor(ingest_pool, chunker.finish):
+        yield chunk
+
+
+def write_replicas(nodes: List[Contact], key: str, data: bytes, codecs: Sequence[str] = DEFAULT_CODECS):
+    """Write ``data`` to every node in ``nodes``, in parallel when there are several"""
+    if len(nodes) == 1:
+        save_chunk(f"./storage/{nodes[0].port}", key, data, codecs)
+        return
+    list(replica_pool.map(lambda c: save_chunk(f"./storage/{c.port}", key, data, codecs), nodes))
+
+
+def holders_of(key: str) -> List[Contact]:
+    """Every storage node whose store holds ``key``, closest first"""
+    return [c for c in placement.ranked(key) if open_store(f"./storage/{c.port}").has(key)]
+
+
+def ingest_chunk(replicas: int, codecs: Sequence[str], item):
+    """Hash a chunk and store it on its closest nodes unless already held (runs in ingest_pool).
+
+    Returns the chunk hash and length, and ``(key, nodes, known)`` for each
+    stored key: the nodes to register it with (None if nothing was written)
+    and whether the dedup index already knew it. A known chunk is only
+    written to those of its ``replicas`` closest nodes that lack it, and is
+    then registered with every node holding it.
+    """
+    index, chunk_data = item
+    chunk_hash = sha256_hex(chunk_data)
+    nodes = placement.nodes_for(chunk_hash, replicas)
+    if chunk_hash not in dedup_index:
+        write_replicas(nodes, chunk_hash, chunk_data, codecs)
+        return chunk_hash, len(chunk_data), [(chunk_hash, nodes, False)]
+    missing = [c for c in nodes if not open_store(f"./storage/{c.port}").has(chunk_hash)]
+    if not missing:
+        return chunk_hash, len(chunk_data), [(chunk_hash, None, True)]
+    write_replicas(missing, chunk_hash, chunk_data, codecs)
+    return chunk_hash, len(chunk_data), [(chunk_hash, holders_of(chunk_hash), True)]
+
+
+def ingest_stripe(codec: ReedSolomon, codecs: Sequence[str], item):
+    """Erasure-code a chunk and store its k + m shards (runs in ingest_pool).
+
+    Shards go round the nodes in order of XOR distance from the chunk hash,
+    so each node holds as few shards of a stripe as possible. A shard the
+    dedup index knows is only rewritten if its node has lost it. Returns
+    the same as ``ingest_chunk``, one entry per shard; identical shards
+    (such as the zero padding of a short final chunk) are still written to
+    each of their nodes, but only the first entry carries the holders.
+    """
+    index, chunk_data = item
+    chunk_hash = sha256_hex(chunk_data)
+    ranked = placement.ranked(chunk_hash)
+    known: Dict[str, bool] = {}
+    written: Dict[str, List[Contact]] = {}
+    keys = []
+    for s, shard in enumerate(codec.encode(chunk_data)):
+        shard_hash = sha256_hex(shard)
+        if shard_hash not in known:
+            known[shard_hash] = shard_hash in dedup_index
+        node = ranked[s % len(ranked)]
+        if not known[shard_hash] or not open_store(f"./storage/{node.port}").has(shard_hash):
+            save_chunk(f"./storage/{node.port}", shard_hash, shard, codecs)
+            nodes = written.setdefault(shard_hash, [])
+            if node not in nodes:
+                nodes.append(node)
+        keys.append(shard_hash)
+    # A repaired shard is registered with its earlier holders too
+    holders = {h: holders_of(h) if known[h] else nodes for h, nodes in written.items()}
+    stored = []
+    reported = set()
+    for shard_hash in keys:
+        stored.append((shard_hash, None if shard_hash in reported else holders.get(shard_hash), known[shard_hash]))
+        reported.add(shard_hash)
+    return chunk_hash, len(chunk_data), stored
+
+
+def parse_erasure(spec: str) -> ReedSolomon:
+    """``"k+m"`` -> codec; raises ValueError on bad input"""
+    k, sep, m = spec.partition("+")
+    if not sep:
+        raise ValueError("erasure must look like k+m, e.g. 2+2")
+    return ReedSolomon(int(k), int(m))
+
+
 async def register_chunk(chunk_hash: str, peers: List[Dict]):
     """Register chunk in DHT"""
-    url = f"http://{DHT_HOST}:{DHT_PORT}/store"
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        r = await client.post(url, json={"key": chunk_hash, "value": {"peers": peers}})
-        r.raise_for_status()
+    await get_transport().post_json(
+        DHT_HOST, DHT_PORT, "/store",
+        {"key": chunk_hash, "value": {"peers": peers}}, timeout=5.0
+    )
+
+
+async def register_chunks(entries: List[Dict]):
+    """Register many chunks in the DHT with a single batched RPC"""
+    await get_transport().post_json(
+        DHT_HOST, DHT_PORT, "/store_many", {"items": entries}, timeout=30.0
+    )
 
 
-def save_chunk(storage_dir: str, chunk_hash: str, data: bytes):
-    """Save chunk to storage directory"""
-    os.makedirs(storage_dir, exist_ok=True)
-    with open(os.path.join(storage_dir, chunk_hash), "wb") as f:
-        f.write(data)
+def save_chunk(storage_dir: str, chunk_hash: str, data: bytes, codecs: Sequence[str] = DEFAULT_CODECS):
+    """Save chunk to storage directory, compressed with the best of ``codecs`` if that helps"""
+    open_store(storage_dir).put(chunk_hash, data, codecs)
 
 
 @app.get("/")
@@ -70,7 +244,8 @@ async def root():
             "download": "/api/download/{file_id}",
             "files": "/api/files",
             "search": "/api/search/{hash}",
-            "nodes": "/api/nodes"
+            "nodes": "/api/nodes",
+            "cache": "/api/cache"
         }
     }
 
@@ -87,64 +262,156 @@ async def get_nodes_status():
     results = []
     for node in nodes:
         try:
-            async with httpx.AsyncClient(timeout=2.0) as client:
-                response = await client.post(f"http://{node['host']}:{node['port']}/ping")
-                results.append({
-                    **node,
-                    "status": "online" if response.status_code == 200 else "offline"
-                })
+            client = get_transport().client(node["host"], node["port"])
+            response = await client.post("/ping", timeout=2.0)
+            results.append({
+                **node,
+                "status": "online" if response.status_code == 200 else "offline"
+            })
         except:
             results.append({**node, "status": "offline"})
     
     return {"nodes": results}
 
 
+@app.get("/api/cache")
+async def cache_stats():
+    """Hit/miss counters and usage of the gateway's chunk cache"""
+    cache = get_chunk_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
 @app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
-    """Upload a file to the decentralized network"""
+async def upload_file(file: UploadFile = File(...), chunking: str = "fixed",
+                      manifest_format: str = "json", erasure: Optional[str] = None,
+                      replicas: int = Query(REPLICATION_FACTOR, ge=1), compression: Optional[str] = None):
+    """Upload a file to the decentralized network.
+
+    ``chunking=fastcdc`` cuts content-defined chunks so that edited versions
+    of a file share most of their chunks with earlier uploads.
+    ``manifest_format=binary`` stores the manifest as packed digests, which
+    loads lazily and is far smaller for files with millions of chunks.
+    ``erasure=k+m`` stores each chunk as k data and m parity shards spread
+    over the storage nodes instead of plain copies; any k shards rebuild it.
+    Otherwise each chunk is copied to the ``replicas`` nodes closest to its hash;
+    re-uploading with a higher count adds the missing copies of stored chunks.
+    ``compression`` lists the codecs tried on each stored chunk (``zlib,lzma``;
+    default ``none``, stored raw); chunks keep their hashes whatever codec they are stored with.
+    """
+    if manifest_format not in MANIFEST_SUFFIXES:
+        raise HTTPException(status_code=400, detail=f"manifest_format must be one of {sorted(MANIFEST_SUFFIXES)}")
     try:
-        # Read file data
-        data = await file.read()
-        
-        # Split into chunks
-        chunks = list(chunk_bytes(data, CHUNK_SIZE))
-        chunk_hashes = [sha256_hex(c) for c in chunks]
-        
-        # Distribute chunks across storage nodes
-        for i, (chunk_hash, chunk_data) in enumerate(zip(chunk_hashes, chunks)):
-            assigned_port = STORAGE_NODES[i % len(STORAGE_NODES)]
-            storage_dir = f"./storage/{assigned_port}"
-            
-            # Save chunk locally
-            save_chunk(storage_dir, chunk_hash, chunk_data)
-            
-            # Register in DHT
-            await register_chunk(
-                chunk_hash, 
-                [{"host": DHT_HOST, "port": assigned_port}]
-            )
+        chunker = make_chunker(chunking, CHUNK_SIZE)
+        codec = parse_erasure(erasure) if erasure else None
+        codecs = parse_codecs(compression) if compression is not None else DEFAULT_CODECS
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ingest = partial(ingest_chunk, replicas, codecs) if codec is None else partial(ingest_stripe, codec, codecs)
+    try:
+        chunk_hashes = []
+        shard_hashes = []
+        chunk_sizes = []
+        total_size = 0
+        holders: Dict[str, List[Dict]] = {}  # key -> every peer this upload registered it with
+        pending: Dict[str, List[Dict]] = {}  # keys to (re-)register in the next /store_many
+        new_keys = set()  # keys the dedup index did not know before this upload
+        deduped_chunks = 0
+        deduped_bytes = 0
+
+        async def numbered():
+            i = 0
+            async for chunk_data in read_chunks(file, chunker):
+                yield i, chunk_data
+                i += 1
+
+        async def flush():
+            await register_chunks([{"key": key, "value": {"peers": peers}} for key, peers in pending.items()])
+            dedup_index.add_many(pending)
+            pending.clear()
+
+        # Chunks are hashed and written by ingest_pool, up to INGEST_WINDOW at a
+        # time, and come back in file order; memory stays at a few chunks
+        # regardless of the upload size. DHT registrations are batched into
+        # one /store_many call per REGISTER_BATCH keys. Chunks the nodes
+        # already hold skip both the write and the RPC.
+        async for chunk_hash, chunk_len, stored in ordered_amap(
+            ingest, numbered(), ingest_pool, INGEST_WINDOW
+        ):
+            chunk_hashes.append(chunk_hash)
+            chunk_sizes.append(chunk_len)
+            total_size += chunk_len
+            if codec is not None:
+                shard_hashes.extend(key for key, _, _ in stored)
+            # Deduplicated: stored before this upload began (not just repeated
+            # within it) and nothing had to be written again
+            if all(known and nodes is None and key not in new_keys for key, nodes, known in stored):
+                deduped_chunks += 1
+                deduped_bytes += chunk_len
+            new_keys.update(key for key, _, known in stored if not known)
+
+            # A registration replaces the key's value, so it always carries every
+            # holder seen so far: a key written again after an earlier batch was
+            # flushed (chunks are ingested ahead of this loop, and shards are
+            # placed by position) keeps the nodes registered before
+            for key, nodes, _ in stored:
+                if nodes is None:
+                    continue
+                peers = holders.setdefault(key, [])
+                added = [p for p in ({"host": c.host, "port": c.port} for c in nodes) if p not in peers]
+                if added:
+                    peers.extend(added)
+                    pending[key] = peers
+            if len(pending) >= REGISTER_BATCH:
+                await flush()
+
+        # Register in DHT
+        if pending:
+            await flush()
         
         # Create manifest
         manifest = {
             "fileId": file.filename,
             "originalName": file.filename,
-            "totalChunks": len(chunks),
+            "totalChunks": len(chunk_hashes),
             "chunkHashes": chunk_hashes,
             "chunkSize": CHUNK_SIZE,
-            "size": len(data)
+            "size": total_size,
+            # Content ID: commits to every chunk hash and their order
+            "merkleRoot": merkle_root(chunk_hashes)
         }
+        if chunker.name != "fixed":
+            # Variable-size chunks: record how they were cut and their sizes
+            manifest["chunking"] = chunker.params()
+            manifest["chunkSizes"] = chunk_sizes
+        if codec is not None:
+            manifest["erasure"] = codec.params()
+            manifest["shardHashes"] = shard_hashes
         
         # Save manifest
-        manifest_path = os.path.join(MANIFESTS_DIR, f"{file.filename}.json")
-        with open(manifest_path, "w") as f:
-            json.dump(manifest, f, indent=2)
+        manifest_path = os.path.join(MANIFESTS_DIR, file.filename + MANIFEST_SUFFIXES[manifest_format])
+        if manifest_format == "binary":
+            save_binary_manifest(manifest, manifest_path)
+        else:
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f, indent=2)
+        # Drop a manifest left in the other format by an earlier upload
+        for suffix in MANIFEST_SUFFIXES.values():
+            stale = os.path.join(MANIFESTS_DIR, file.filename + suffix)
+            if stale != manifest_path and os.path.exists(stale):
+                os.remove(stale)
+        catalog.add(file.filename, manifest, manifest_path)
         
         return {
             "status": "success",
             "message": f"File uploaded successfully",
             "fileId": file.filename,
-            "chunks": len(chunks),
+            "chunks": len(chunk_hashes),
+            "dedupedChunks": deduped_chunks,
+            "dedupedBytes": deduped_bytes,
             "hash": chunk_hashes[0],
+            "contentId": manifest["merkleRoot"],
             "manifest": manifest
         }
         
@@ -153,30 +420,17 @@ async def upload_file(file: UploadFile = File(...)):
 
 
 @app.get("/api/files")
-async def list_files():
-    """List all uploaded files"""
+async def list_files(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(FILES_PAGE_SIZE, ge=1, le=FILES_PAGE_MAX),
+    sort: str = "newest",
+):
+    """List uploaded files, newest first, one page at a time"""
+    if sort not in ("newest", "oldest"):
+        raise HTTPException(status_code=400, detail="sort must be 'newest' or 'oldest'")
     try:
-        files = []
-        if os.path.exists(MANIFESTS_DIR):
-            for filename in os.listdir(MANIFESTS_DIR):
-                if filename.endswith('.json'):
-                    try:
-                        with open(os.path.join(MANIFESTS_DIR, filename)) as f:
-                            manifest = json.load(f)
-                            files.append({
-                                "name": manifest.get("originalName", manifest.get("fileId", filename.replace(".json", ""))),
-                                "hash": manifest["chunkHashes"][0] if manifest.get("chunkHashes") else "unknown",
-                                "chunks": manifest.get("totalChunks", 0),
-                                "size": manifest.get("size", 0)
-                            })
-                    except Exception as e:
-                        print(f"Error reading manifest {filename}: {e}")
-                        continue
-        
-        # Sort by most recent first (assuming filename contains timestamp or reverse list)
-        files.reverse()
-        
-        return {"files": files}
+        total, files = catalog.list(offset, limit, newest_first=sort == "newest")
+        return {"files": files, "total": total, "offset": offset, "limit": limit}
     except Exception as e:
         print(f"Error listing files: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -186,43 +440,170 @@ async def list_files():
 async def search_by_hash(hash: str):
     """Search for a file by its content hash"""
     try:
-        # Search in manifests
-        if os.path.exists(MANIFESTS_DIR):
-            for filename in os.listdir(MANIFESTS_DIR):
-                if filename.endswith('.json'):
-                    with open(os.path.join(MANIFESTS_DIR, filename)) as f:
-                        manifest = json.load(f)
-                        if hash in manifest["chunkHashes"]:
-                            return {
-                                "found": True,
-                                "file": {
-                                    "name": manifest.get("originalName", filename),
-                                    "hash": hash,
-                                    "chunks": manifest["totalChunks"],
-                                    "size": manifest.get("size", 0)
-                                }
-                            }
-        
-        return {"found": False, "message": "File not found"}
+        file = catalog.find_chunk(hash)
+        if file is None:
+            return {"found": False, "message": "File not found"}
+        return {"found": True, "file": dict(file, hash=hash)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def find_manifest(file_id: str) -> Optional[str]:
+    for suffix in MANIFEST_SUFFIXES.values():
+        path = os.path.join(MANIFESTS_DIR, file_id + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+merkle_trees: "OrderedDict[Tuple[str, int], MerkleTree]" = OrderedDict()  # LRU first
+merkle_trees_bytes = 0
+merkle_trees_lock = threading.Lock()
+
+
+def merkle_tree(manifest_path: str, mtime_ns: int) -> MerkleTree:
+    """Tree for a manifest, from an LRU bounded by MERKLE_CACHE_BYTES of digests (runs in ingest_pool)."""
+    global merkle_trees_bytes
+    # Keyed on mtime so a re-upload under the same name rebuilds the tree
+    key = (manifest_path, mtime_ns)
+    with merkle_trees_lock:
+        tree = merkle_trees.get(key)
+        if tree is not None:
+            merkle_trees.move_to_end(key)
+            return tree
+    tree = MerkleTree(Manifest.load(manifest_path).chunkHashes)
+    with merkle_trees_lock:
+        if tree.nbytes <= MERKLE_CACHE_BYTES and key not in merkle_trees:
+            merkle_trees[key] = tree
+            merkle_trees_bytes += tree.nbytes
+            while merkle_trees_bytes > MERKLE_CACHE_BYTES:
+                _, old = merkle_trees.popitem(last=False)
+                merkle_trees_bytes -= old.nbytes
+    return tree
+
+
+@app.get("/api/proof/{file_id}")
+async def range_proof(file_id: str, start: int = Query(0, ge=0), end: Optional[int] = Query(None, ge=1)):
+    """Chunk hashes ``[start, end)`` of a file with a Merkle proof against its root"""
+    manifest_path = find_manifest(file_id)
+    if manifest_path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    manifest = Manifest.load(manifest_path)
+    end = manifest.totalChunks if end is None else end
+    if not start < end <= manifest.totalChunks:
+        raise HTTPException(status_code=416, detail=f"Chunk range [{start}, {end}) outside 0..{manifest.totalChunks}")
+    loop = asyncio.get_running_loop()
+    tree = await loop.run_in_executor(
+        ingest_pool, merkle_tree, manifest_path, os.stat(manifest_path).st_mtime_ns)
+    return {
+        "fileId": manifest.fileId,
+        "merkleRoot": tree.root(),
+        "totalChunks": manifest.totalChunks,
+        "start": start,
+        "end": end,
+        "chunkHashes": manifest.chunkHashes[start:end],
+        "proof": tree.prove_range(start, end),
+    }
+
+
+def attachment_header(filename: str) -> str:
+    """Content-Disposition value, RFC 5987-encoded for non-ASCII names"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+@lru_cache(maxsize=32)
+def chunk_layout(manifest_path: str, mtime_ns: int) -> ChunkLayout:
+    return ChunkLayout(Manifest.load(manifest_path))
+
+
+async def prefetched(chunks):
+    """Await the first piece of ``chunks`` and return a body yielding all of it.
+
+    Lookup failures then surface as an error status instead of a truncated body.
+    """
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+
+    async def body():
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    return body()
+
+
+async def range_response(manifest: Manifest, bootstrap: List[Contact], layout: ChunkLayout,
+                         ranges, headers: Dict[str, str]) -> StreamingResponse:
+    """206 response for one range, or multipart/byteranges for several.
+
+    Every chunk a multipart response covers is looked up before it starts,
+    so a missing one fails the request instead of truncating a later part.
+    """
+    size = layout.size
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers = dict(headers, **{
+            "Content-Range": f"bytes {start}-{end}/{size}",
+            "Content-Length": str(end - start + 1),
+        })
+        body = await prefetched(stream_byte_range(manifest, bootstrap, layout, start, end, window=DOWNLOAD_WINDOW))
+        return StreamingResponse(body, status_code=206, media_type="application/octet-stream", headers=headers)
+
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (f"--{boundary}\r\nContent-Type: application/octet-stream\r\n"
+         f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n").encode()
+        for start, end in ranges
+    ]
+    closing = f"--{boundary}--\r\n".encode()
+    spans = [layout.span(start, end) for start, end in ranges]
+    resolved = await asyncio.gather(*(resolve_span(manifest, bootstrap, first, last + 1) for first, last in spans))
+    length = sum(len(h) + (end - start + 1) + 2 for h, (start, end) in zip(part_headers, ranges)) + len(closing)
+
+    async def parts():
+        for part_header, (start, end), items in zip(part_headers, ranges, resolved):
+            yield part_header
+            chunks = stream_byte_range(manifest, bootstrap, layout, start, end, window=DOWNLOAD_WINDOW,
+                                       resolved=items)
+            try:
+                async for data in chunks:
+                    yield data
+            finally:
+                await chunks.aclose()
+            yield b"\r\n"
+        yield closing
+
+    headers = dict(headers, **{"Content-Length": str(length)})
+    return StreamingResponse(await prefetched(parts()), status_code=206,
+                             media_type=f"multipart/byteranges; boundary={boundary}", headers=headers)
+
+
 @app.get("/api/download/{file_id}")
-async def download_file_endpoint(file_id: str):
-    """Download a file by reconstructing it from chunks"""
+async def download_file_endpoint(file_id: str, request: Request, stream: bool = True):
+    """Download a file, streaming chunks in order as they are fetched.
+
+    Pass ``stream=false`` to reconstruct the file in ``downloads/`` first.
+    ``Range`` requests (honouring ``If-Range`` against the Merkle-root ETag)
+    fetch only the chunks overlapping the requested bytes.
+    """
     try:
         # Find manifest
-        manifest_path = os.path.join(MANIFESTS_DIR, f"{file_id}.json")
+        manifest_path = find_manifest(file_id)
         
-        if not os.path.exists(manifest_path):
+        if manifest_path is None:
             raise HTTPException(status_code=404, detail="File not found")
         
-        # Load manifest
-        with open(manifest_path) as f:
-            manifest_data = json.load(f)
-        
-        manifest = Manifest(**manifest_data)
+        # Load manifest (JSON or binary)
+        manifest = Manifest.load(manifest_path)
+        layout = chunk_layout(manifest_path, os.stat(manifest_path).st_mtime_ns)
         
         # Create bootstrap contacts
         bootstrap = [Contact(
@@ -230,16 +611,42 @@ async def download_file_endpoint(file_id: str):
             host=DHT_HOST, 
             port=DHT_PORT
         )]
+
+        headers = {"Content-Disposition": attachment_header(file_id)}
+        if manifest.merkleRoot:
+            headers["ETag"] = f'"{manifest.merkleRoot}"'
+        if layout.size is not None:
+            headers["Accept-Ranges"] = "bytes"
+
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        # Byte ranges need the file size; a stale If-Range means "send it all"
+        if range_header and layout.size is not None and (if_range is None or if_range == headers.get("ETag")):
+            try:
+                ranges = parse_range(range_header, layout.size)
+            except RangeNotSatisfiable:
+                raise HTTPException(status_code=416, detail="Range not satisfiable",
+                                    headers={"Content-Range": f"bytes */{layout.size}"})
+            if ranges is not None:
+                return await range_response(manifest, bootstrap, layout, ranges, headers)
         
-        # Retrieve file
-        output_path = await retrieve_file(manifest, bootstrap, out_dir=DOWNLOADS_DIR)
-        
-        return FileResponse(
-            output_path,
-            media_type="application/octet-stream",
-            filename=file_id
-        )
+        if not stream:
+            # Retrieve file
+            output_path = await retrieve_file(manifest, bootstrap, out_dir=DOWNLOADS_DIR)
+
+            return FileResponse(
+                output_path,
+                media_type="application/octet-stream",
+                filename=file_id
+            )
+
+        if layout.size is not None:
+            headers["Content-Length"] = str(layout.size)
+        body = await prefetched(stream_file(manifest, bootstrap, window=DOWNLOAD_WINDOW))
+        return StreamingResponse(body, media_type="application/octet-stream", headers=headers)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,111 @@
+"""Routing table, XOR metric and iterative lookup benchmarks."""
+import itertools
+import json
+import random
+
+import httpx
+
+from src.common.transport import Transport, set_transport
+from src.dht.id import id_to_int, xor_distance
+from src.dht.kademlia import find_value
+from src.dht.routing import Contact, RoutingTable
+
+from .harness import Case, bench
+
+CONTACTS = [100, 1_000, 10_000, 100_000]
+
+
+# Seeded so every run times the same tables and the same lookup paths
+def random_id(rng, nbytes=20):
+    return rng.getrandbits(nbytes * 8).to_bytes(nbytes, "big")
+
+
+def random_contacts(n, seed=0):
+    rng = random.Random(seed)
+    return [Contact(id_hex=random_id(rng).hex(), host="10.0.0.1", port=i) for i in range(n)]
+
+
+@bench("routing.add", contacts=CONTACTS)
+def routing_add(contacts):
+    # Fill a fresh k=20 table; past the first few buckets most adds land in replacement caches
+    cs = random_contacts(contacts)
+    self_id = random_id(random.Random(1))
+
+    def fill():
+        rt = RoutingTable(self_id)
+        for c in cs:
+            rt.add(c)
+
+    return Case(fill, ops=contacts)
+
+
+@bench("routing.closest", contacts=CONTACTS)
+def routing_closest(contacts):
+    # Every contact kept (k = n), as Placement does, so the lookup really scans n contacts
+    rng = random.Random(1)
+    rt = RoutingTable(random_id(rng), k=contacts)
+    for c in random_contacts(contacts):
+        rt.add(c)
+    targets = itertools.cycle([random_id(rng).hex() for _ in range(64)])
+    return lambda: rt.closest(next(targets), 20)
+
+
+@bench("xor_distance")
+def xor_pairs():
+    rng = random.Random(1)
+    pairs = [(random_id(rng), random_id(rng)) for _ in range(1000)]
+
+    def run():
+        for a, b in pairs:
+            xor_distance(a, b)
+
+    return Case(run, ops=len(pairs))
+
+
+class FakeNetwork:
+    """In-process Kademlia nodes answering /find_value and /store from routing tables.
+
+    Requests go through the real Transport and httpx.MockTransport, so a
+    lookup pays the same client-side costs as against live nodes without any
+    sockets or servers.
+    """
+
+    def __init__(self, n, key, k=20, seed=0):
+        rng = random.Random(seed)
+        self.contacts = random_contacts(n, seed)
+        self.tables = {}
+        self.values = {}
+        for c in self.contacts:
+            rt = RoutingTable(bytes.fromhex(c.id_hex))
+            for other in rng.sample(self.contacts, min(n, 200)):
+                rt.add(other)
+            self.tables[c.port] = rt
+        holders = sorted(self.contacts, key=lambda c: c.id_int ^ id_to_int(key))[:k]
+        for c in holders:
+            self.values[(c.port, key)] = {"peers": [{"host": "10.0.0.2", "port": 7002}]}
+
+    def handler(self, request):
+        body = json.loads(request.content)
+        port = request.url.port
+        if request.url.path == "/store":
+            return httpx.Response(200, json={"ok": True})
+        value = self.values.get((port, body["key"]))
+        if value is not None:
+            return httpx.Response(200, json={"ok": True, "value": value})
+        contacts = [{"id": c.id_hex, "host": c.host, "port": c.port}
+                    for c in self.tables[port].closest(body["key"], 20)]
+        return httpx.Response(200, json={"ok": True, "contacts": contacts})
+
+
+@bench("kademlia.find_value", nodes=[50, 500])
+def kademlia_find_value(nodes):
+    key = random_id(random.Random(1), 32).hex()
+    net = FakeNetwork(nodes, key)
+    previous = set_transport(Transport(transport_factory=lambda host, port: httpx.MockTransport(net.handler)))
+    start = net.contacts[:3]
+
+    async def lookup():
+        value = await find_value(start, key)
+        assert value is not None
+
+    return Case(lookup, teardown=lambda: set_transport(previous))
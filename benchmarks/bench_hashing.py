@@ -0,0 +1,38 @@
+"""Chunk hashing and splitting throughput at several chunk sizes."""
+import os
+
+from demo_prepare import chunk_bytes
+from src.common.hashing import sha256_hex
+from src.utils.chunking import FixedChunker
+
+from .harness import Case, bench
+
+CHUNK_SIZES = [4 * 1024, 64 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+STREAM_BYTES = 16 * 1024 * 1024  # input split per call by the chunking benchmarks
+
+
+@bench("sha256_hex", chunk_size=CHUNK_SIZES)
+def sha256(chunk_size):
+    data = os.urandom(chunk_size)
+    return Case(lambda: sha256_hex(data), nbytes=chunk_size)
+
+
+@bench("chunk_bytes", chunk_size=CHUNK_SIZES)
+def split(chunk_size):
+    data = os.urandom(STREAM_BYTES)
+    n = STREAM_BYTES // chunk_size
+    return Case(lambda: list(chunk_bytes(data, chunk_size)), ops=n, nbytes=STREAM_BYTES)
+
+
+@bench("fixed_chunker.feed", chunk_size=CHUNK_SIZES)
+def fixed_feed(chunk_size):
+    # Streaming path used by uploads: 1 MiB reads, as api_server does
+    blocks = [os.urandom(1024 * 1024) for _ in range(STREAM_BYTES // (1024 * 1024))]
+
+    def run():
+        chunker = FixedChunker(chunk_size)
+        for block in blocks:
+            chunker.feed(block)
+        chunker.finish()
+
+    return Case(run, ops=STREAM_BYTES // chunk_size, nbytes=STREAM_BYTES)
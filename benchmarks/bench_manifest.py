@@ -0,0 +1,67 @@
+"""Loading large JSON and binary manifests."""
+import atexit
+import json
+import os
+import shutil
+import tempfile
+
+from src.common.merkle import merkle_root
+from src.retrieval.manifest import Manifest, load_manifest_data, save_binary_manifest
+
+from .harness import bench
+
+CHUNKS = [10_000, 200_000]
+
+_tmp = None
+
+
+def workdir():
+    global _tmp
+    if _tmp is None:
+        _tmp = tempfile.mkdtemp(prefix="dfs-bench-")
+        atexit.register(shutil.rmtree, _tmp, True)
+    return _tmp
+
+
+def manifest_files(chunks):
+    """JSON and binary manifests of a ``chunks``-chunk file, written once per size."""
+    base = os.path.join(workdir(), f"m{chunks}")
+    if not os.path.exists(base + ".json"):
+        hashes = [os.urandom(32).hex() for _ in range(chunks)]
+        manifest = {
+            "fileId": "bench.bin",
+            "totalChunks": chunks,
+            "chunkHashes": hashes,
+            "chunkSize": 1024 * 1024,
+            "size": chunks * 1024 * 1024,
+            "merkleRoot": merkle_root(hashes),
+        }
+        with open(base + ".json", "w") as f:
+            json.dump(manifest, f, indent=2)
+        save_binary_manifest(manifest, base + ".dfsm")
+    return base + ".json", base + ".dfsm"
+
+
+@bench("manifest.load", chunks=CHUNKS, format=["json", "binary"])
+def manifest_load(chunks, format):
+    path = manifest_files(chunks)[format == "binary"]
+    return lambda: Manifest.load(path)
+
+
+@bench("manifest.parse", chunks=CHUNKS, format=["json", "binary"])
+def manifest_parse(chunks, format):
+    # Raw field access without model construction
+    path = manifest_files(chunks)[format == "binary"]
+    return lambda: load_manifest_data(path)
+
+
+@bench("manifest.iterate_hashes", chunks=CHUNKS, format=["json", "binary"])
+def manifest_iterate(chunks, format):
+    # Load plus one pass over every hash, as a full download does
+    path = manifest_files(chunks)[format == "binary"]
+
+    def run():
+        for _ in Manifest.load(path).chunkHashes:
+            pass
+
+    return run
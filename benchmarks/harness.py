@@ -0,0 +1,187 @@
+"""Tiny benchmark harness: registration, timing, JSON results and baseline comparison.
+
+A benchmark is a setup function registered with ``@bench``. It receives one
+combination of its parameters and returns the operation to time: a plain
+callable, a coroutine function, or a ``Case`` that also says how many
+operations and bytes one call covers, and how to undo any process-wide
+state the setup changed. Setup cost is never timed.
+"""
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+MIN_TIME = 0.2  # seconds one timed repeat should last
+REPEATS = 5
+THRESHOLD = 0.25  # a median this much slower than the baseline is a regression
+
+REGISTRY: List["Benchmark"] = []
+
+
+@dataclass
+class Case:
+    fn: Callable[[], Any]
+    ops: int = 1  # operations performed by one call of fn
+    nbytes: int = 0  # bytes processed by one call of fn, for throughput
+    teardown: Optional[Callable[[], None]] = None  # undoes setup once the case is measured
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[..., Any]
+    params: Dict[str, List[Any]]
+
+    def cases(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        keys = list(self.params)
+        for values in itertools.product(*(self.params[k] for k in keys)):
+            combo = dict(zip(keys, values))
+            yield case_key(self.name, combo), combo
+
+
+def case_key(name: str, params: Dict[str, Any]) -> str:
+    if not params:
+        return name
+    return name + "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+
+
+def bench(name: str, **params: List[Any]):
+    """Register a setup function under ``name``, run once per parameter combination."""
+    def register(setup):
+        REGISTRY.append(Benchmark(name, setup, params))
+        return setup
+    return register
+
+
+def _timer(case: Case) -> Tuple[Callable[[int], float], Callable[[], None]]:
+    """A function timing ``loops`` calls of the case, and one releasing its resources."""
+    fn = case.fn
+    if asyncio.iscoroutinefunction(fn):
+        loop = asyncio.new_event_loop()
+
+        async def run(loops: int) -> float:
+            t0 = time.perf_counter()
+            for _ in range(loops):
+                await fn()
+            return time.perf_counter() - t0
+
+        return (lambda loops: loop.run_until_complete(run(loops))), loop.close
+
+    def timed(loops: int) -> float:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - t0
+
+    return timed, lambda: None
+
+
+def measure(case: Case, min_time: float = MIN_TIME, repeats: int = REPEATS) -> Dict[str, Any]:
+    timed, close = _timer(case)
+    try:
+        # Calibrate like timeit.autorange: grow the loop count until a repeat is long enough
+        loops = 1
+        while True:
+            elapsed = timed(loops)
+            if elapsed >= min_time or loops >= 1 << 30:
+                break
+            loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.1))
+        samples = [timed(loops) / (loops * case.ops) for _ in range(repeats)]
+    finally:
+        close()
+        if case.teardown is not None:
+            case.teardown()
+    median = statistics.median(samples)
+    result = {
+        "median_ns": median * 1e9,
+        "min_ns": min(samples) * 1e9,
+        "stdev_ns": statistics.stdev(samples) * 1e9 if len(samples) > 1 else 0.0,
+        "loops": loops,
+        "repeats": repeats,
+    }
+    if case.nbytes:
+        result["mb_per_s"] = case.nbytes / case.ops / median / 1e6
+    return result
+
+
+def run(pattern: Optional[str] = None, min_time: float = MIN_TIME, repeats: int = REPEATS,
+        log: Callable[[str], None] = print) -> Dict[str, Dict[str, Any]]:
+    """Run every registered case whose key contains ``pattern``."""
+    results: Dict[str, Dict[str, Any]] = {}
+    for b in REGISTRY:
+        for key, params in b.cases():
+            if pattern and pattern not in key:
+                continue
+            case = b.setup(**params)
+            if not isinstance(case, Case):
+                case = Case(case)
+            r = measure(case, min_time, repeats)
+            results[key] = {"name": b.name, "params": params, **r}
+            rate = f"  {r['mb_per_s']:9.1f} MB/s" if "mb_per_s" in r else ""
+            log(f"{key:<55} {format_ns(r['median_ns']):>12}/op{rate}")
+    return results
+
+
+def format_ns(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f} {unit}"
+    return f"{ns:.1f} ns"
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit or None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "argv": sys.argv[1:],
+    }
+
+
+def save(path: str, results: Dict[str, Dict[str, Any]]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]],
+            threshold: float = THRESHOLD) -> List[Dict[str, Any]]:
+    """Per-case verdicts on the median time: ``regression``, ``improvement``, ``ok`` or ``new``."""
+    rows = []
+    for key, cur in current.items():
+        base = baseline.get(key)
+        if base is None:
+            rows.append({"key": key, "status": "new", "ratio": None})
+            continue
+        ratio = cur["median_ns"] / base["median_ns"]
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"key": key, "status": status, "ratio": ratio,
+                     "baseline_ns": base["median_ns"], "current_ns": cur["median_ns"]})
+    return rows
@@ -0,0 +1,61 @@
+"""Run the benchmarks, save JSON results and flag regressions against a baseline.
+
+    python -m benchmarks.run                        # run all, compare with benchmarks/baseline.json
+    python -m benchmarks.run -k routing --quick     # subset, shorter timings
+    python -m benchmarks.run --save-baseline        # record the current numbers as the baseline
+
+Exits with status 1 when any case is more than ``--threshold`` slower than
+its baseline median, so CI can fail the build on a hot-path regression.
+"""
+import argparse
+import os
+import sys
+
+from . import bench_dht, bench_hashing, bench_manifest  # noqa: F401  (register benchmarks)
+from .harness import MIN_TIME, REPEATS, THRESHOLD, compare, format_ns, load, run, save
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "baseline.json")
+RESULTS = os.path.join(HERE, "results", "latest.json")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-k", dest="pattern", help="only cases whose key contains this text")
+    ap.add_argument("--output", default=RESULTS, help="where to write this run's JSON results")
+    ap.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare against")
+    ap.add_argument("--save-baseline", action="store_true", help="write the results to --baseline as well")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD,
+                    help="fractional slowdown of the median that counts as a regression")
+    ap.add_argument("--min-time", type=float, default=MIN_TIME, help="seconds per timed repeat")
+    ap.add_argument("--repeats", type=int, default=REPEATS)
+    ap.add_argument("--quick", action="store_true", help="short repeats for a smoke run; too noisy to compare")
+    args = ap.parse_args(argv)
+    if args.quick:
+        args.min_time, args.repeats = 0.02, 3
+
+    results = run(args.pattern, args.min_time, args.repeats)
+    save(args.output, results)
+    print(f"\nresults written to {args.output}")
+    if args.save_baseline:
+        save(args.baseline, results)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare against; record one with --save-baseline")
+        return 0
+
+    rows = compare(load(args.baseline), results, args.threshold)
+    flagged = [r for r in rows if r["status"] in ("regression", "improvement")]
+    for r in flagged:
+        print(f"{r['status'].upper():<12} {r['key']:<55} {format_ns(r['baseline_ns']):>10} -> "
+              f"{format_ns(r['current_ns']):>10}  ({r['ratio']:.2f}x)")
+    new = sum(r["status"] == "new" for r in rows)
+    regressions = sum(r["status"] == "regression" for r in rows)
+    print(f"{len(rows)} cases: {regressions} regressed, {len(flagged) - regressions} improved, "
+          f"{new} without a baseline (threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,51 +1,96 @@
-import os, json, asyncio, httpx, argparse
+import os, json, asyncio, argparse
+from concurrent.futures import ThreadPoolExecutor
+from src.common.compression import CODECS, parse_codecs
 from src.common.hashing import sha256_hex
+from src.common.merkle import merkle_root
+from src.common.transport import get_transport
+from src.dht.placement import Placement
+from src.retrieval.manifest import BINARY_SUFFIX, save_binary_manifest
+from src.storage.chunk_store import open_store
+from src.utils.chunking import CHUNKERS, make_chunker
+from src.utils.parallel import default_workers, ordered_map
 
 def chunk_bytes(data: bytes, size: int):
     for i in range(0, len(data), size):
         yield data[i:i+size]
 
 async def register_chunk(dht_host: str, dht_port: int, chunk_hash: str, peers):
-    url = f"http://{dht_host}:{dht_port}/store"
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        r = await client.post(url, json={"key": chunk_hash, "value": {"peers": peers}})
-        r.raise_for_status()
+    await get_transport().post_json(dht_host, dht_port, "/store",
+                                    {"key": chunk_hash, "value": {"peers": peers}}, timeout=5.0)
 
-def save_chunk(storage_dir: str, chunk_hash: str, data: bytes):
-    os.makedirs(storage_dir, exist_ok=True)
-    with open(os.path.join(storage_dir, chunk_hash), "wb") as f:
-        f.write(data)
+async def register_chunks(dht_host: str, dht_port: int, entries):
+    await get_transport().post_json(dht_host, dht_port, "/store_many", {"items": entries}, timeout=30.0)
+
+def save_chunk(storage_dir: str, chunk_hash: str, data: bytes, codecs=None):
+    open_store(storage_dir).put(chunk_hash, data, codecs)
 
 async def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--file", required=True, help="Path to input file to split")
     ap.add_argument("--chunk_size", type=int, default=1024*1024)
+    ap.add_argument("--chunking", choices=CHUNKERS, default="fixed", help="fixed-size or content-defined (fastcdc) chunks")
     ap.add_argument("--dht_host", default="127.0.0.1")
     ap.add_argument("--dht_port", type=int, default=7001)
     ap.add_argument("--peer_ports", type=str, default="7002,7003", help="ports that will host chunks")
+    ap.add_argument("--replicas", type=int, default=2, help="copies of each chunk, on the nodes closest to its hash")
+    ap.add_argument("--workers", type=int, default=default_workers(), help="threads hashing and writing chunks")
+    ap.add_argument("--register_batch", type=int, default=256, help="chunks registered per /store_many call")
+    ap.add_argument("--manifest_format", choices=("json", "binary"), default="json",
+                    help="binary writes manifest.dfsm with packed digests")
+    ap.add_argument("--compression", default="none",
+                    help=f"comma list of codecs tried per chunk ({','.join(CODECS)}) or none")
     args = ap.parse_args()
+    try:
+        codecs = parse_codecs(args.compression)
+    except ValueError as e:
+        ap.error(str(e))
 
     data = open(args.file, "rb").read()
-    chunks = list(chunk_bytes(data, args.chunk_size))
-    hashes = [sha256_hex(c) for c in chunks]
+    chunker = make_chunker(args.chunking, args.chunk_size)
+    chunks = chunker.feed(data) + chunker.finish()
 
     peer_ports = [int(p.strip()) for p in args.peer_ports.split(",") if p.strip()]
+    placement = Placement([("127.0.0.1", p) for p in peer_ports], args.replicas)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool, \
+            ThreadPoolExecutor(max_workers=args.workers * placement.replicas) as replica_pool:
+        def store(c):
+            h = sha256_hex(c)
+            nodes = placement.nodes_for(h)
+            list(replica_pool.map(lambda n: save_chunk(f"./storage/{n.port}", h, c, codecs), nodes))
+            return h, nodes
+
+        stored = list(ordered_map(store, chunks, pool, 2 * args.workers))
+    hashes = [h for h, _ in stored]
 
-    for i, (h, c) in enumerate(zip(hashes, chunks)):
-        assigned_port = peer_ports[i % len(peer_ports)]
-        storage_dir = f"./storage/{assigned_port}"
-        save_chunk(storage_dir, h, c)
-        await register_chunk(args.dht_host, args.dht_port, h, [{"host":"127.0.0.1","port":assigned_port}])
+    try:
+        entries = []
+        for h, nodes in stored:
+            entries.append({"key": h, "value": {"peers": [{"host": n.host, "port": n.port} for n in nodes]}})
+        for i in range(0, len(entries), args.register_batch):
+            await register_chunks(args.dht_host, args.dht_port, entries[i:i + args.register_batch])
+    finally:
+        await get_transport().aclose()
 
     manifest = {
         "fileId": os.path.basename(args.file) + ".reconstructed",
         "totalChunks": len(chunks),
         "chunkHashes": hashes,
-        "chunkSize": args.chunk_size
+        "chunkSize": args.chunk_size,
+        "size": len(data),
+        "merkleRoot": merkle_root(hashes)
     }
-    with open("manifest.json", "w") as f:
-        json.dump(manifest, f, indent=2)
-    print(f"Created manifest.json with {len(chunks)} chunks.")
+    if chunker.name != "fixed":
+        manifest["chunking"] = chunker.params()
+        manifest["chunkSizes"] = [len(c) for c in chunks]
+    if args.manifest_format == "binary":
+        out = "manifest" + BINARY_SUFFIX
+        save_binary_manifest(manifest, out)
+    else:
+        out = "manifest.json"
+        with open(out, "w") as f:
+            json.dump(manifest, f, indent=2)
+    print(f"Created {out} with {len(chunks)} chunks.")
 
 if __name__ == "__main__":
     asyncio.run(main())
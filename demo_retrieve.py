@@ -1,20 +1,30 @@
 import json, argparse, asyncio
 from src.retrieval.manifest import Manifest
-from src.retrieval.retriever import retrieve_file
+from src.retrieval.retriever import retrieve_file, verify_manifest
 from src.dht.routing import Contact
+from src.common.transport import get_transport
+
+async def run(manifest, bootstrap):
+    try:
+        return await retrieve_file(manifest, bootstrap)
+    finally:
+        await get_transport().aclose()
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--manifest", default="manifest.json")
+    ap.add_argument("--manifest", default="manifest.json", help="JSON or binary (.dfsm) manifest")
     ap.add_argument("--bootstrap", default='[{"host":"127.0.0.1","port":7001}]',
                     help='JSON list of contacts e.g. [{"host":"127.0.0.1","port":7001}]')
+    ap.add_argument("--content_id", help="trusted Merkle root; the manifest is rejected unless it matches")
     args = ap.parse_args()
 
-    manifest = Manifest(**json.load(open(args.manifest)))
+    manifest = Manifest.load(args.manifest)
+    if args.content_id or manifest.merkleRoot:
+        verify_manifest(manifest, args.content_id)
     bs_cfg = json.loads(args.bootstrap)
     bootstrap = [Contact(id_hex="0"*40, host=c["host"], port=c["port"]) for c in bs_cfg]
 
-    out_path = asyncio.run(retrieve_file(manifest, bootstrap))
+    out_path = asyncio.run(run(manifest, bootstrap))
     print(f"Saved file to: {out_path}")
 
 if __name__ == "__main__":
@@ -1,12 +1,91 @@
 # client.py
-import socket, json
+import asyncio
+import itertools
+import socket
+
+from .message_protocol import MAX_FRAME, encode_frame, read_frame, recv_json, send_json
+
+
+class PeerClient:
+    """Persistent, pipelined connection to one peer.
+
+    Every request gets a fresh ``id``; a background task matches response
+    frames to waiting callers by that ``id``, so any number of requests can
+    be outstanding at once and answered in any order.
+    """
+
+    def __init__(self, host, port, max_frame=MAX_FRAME):
+        self.host = host
+        self.port = port
+        self.max_frame = max_frame
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._write_lock = asyncio.Lock()
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._read_task = asyncio.ensure_future(self._read_loop())
+        return self
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _read_loop(self):
+        error = ConnectionError("Connection closed")
+        try:
+            while True:
+                msg = await read_frame(self._reader, self.max_frame)
+                if msg is None:
+                    break
+                fut = self._pending.pop(msg.get("id"), None)
+                if fut is not None and not fut.done():
+                    fut.set_result(msg)
+        except Exception as e:
+            error = e
+        finally:
+            pending, self._pending = self._pending, {}
+            for fut in pending.values():
+                if not fut.done():
+                    fut.set_exception(error)
+
+    async def request(self, msg, timeout=None):
+        """Send ``msg`` and wait for the response frame carrying the same id."""
+        if self._read_task is None or self._read_task.done():
+            raise ConnectionError("Not connected")
+        req_id = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = fut
+        try:
+            async with self._write_lock:
+                self._writer.write(encode_frame({**msg, "id": req_id}))
+                # Blocks while the socket buffer is full: the peer sets the pace
+                await self._writer.drain()
+            return await (fut if timeout is None else asyncio.wait_for(fut, timeout))
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        if self._read_task is not None:
+            await asyncio.gather(self._read_task, return_exceptions=True)
+
 
 def send_message(ip, port, msg):
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.connect((ip, port))
-        s.sendall(json.dumps(msg).encode())
-        data = s.recv(4096)
-        print("[RESPONSE]", data.decode())
+        send_json(s, msg)
+        print("[RESPONSE]", recv_json(s))
 
 if __name__ == "__main__":
     send_message("127.0.0.1", 5000, {"type": "HELLO", "payload": "Hi Peer!"})
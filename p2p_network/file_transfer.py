@@ -1,23 +1,49 @@
-import os, socket, json, hashlib
-from message_protocol import send_json, recv_json
+import os, hashlib
+from .message_protocol import recv_into_exactly, recv_json, send_json
+
+RECV_BUFFER = 256 * 1024  # bytes received per recv_into; the only per-transfer allocation
 
 def send_chunk(conn, filepath):
     size = os.path.getsize(filepath)
     header = {"type": "CHUNK_RESPONSE", "content_length": size}
     send_json(conn, header)
     with open(filepath, "rb") as f:
-        while (chunk := f.read(4096)):
-            conn.sendall(chunk)
+        # The kernel copies file pages straight to the socket where it can
+        conn.sendfile(f, 0, size)
+
+def receive_chunk(sock, dest_path, buffer=None):
+    """Receive one chunk into ``dest_path`` and return its SHA-256.
 
-def receive_chunk(sock, dest_path):
+    Data lands in a single reusable buffer (pass ``buffer`` to share one
+    across calls) and goes from there to the file and the hash, so memory
+    use does not grow with the chunk. The file only appears under
+    ``dest_path`` once every byte has arrived.
+    """
+    if buffer is not None and len(buffer) == 0:
+        raise ValueError("receive buffer must not be empty")
     header = recv_json(sock)
+    if header is None:
+        raise ConnectionError("Connection closed")
     size = header["content_length"]
-    data = b""
-    while len(data) < size:
-        chunk = sock.recv(min(4096, size - len(data)))
-        if not chunk:
-            break
-        data += chunk
-    with open(dest_path, "wb") as f:
-        f.write(data)
-    return hashlib.sha256(data).hexdigest()
+    view = memoryview(buffer if buffer is not None else bytearray(min(RECV_BUFFER, size) or 1))
+    h = hashlib.sha256()
+    tmp = dest_path + ".part"
+    try:
+        with open(tmp, "wb") as f:
+            remaining = size
+            while remaining:
+                want = min(len(view), remaining)
+                got = recv_into_exactly(sock, view[:want])
+                h.update(view[:got])
+                f.write(view[:got])
+                if got < want:
+                    raise ConnectionError(f"Connection closed with {remaining - got} of {size} bytes missing")
+                remaining -= got
+        os.replace(tmp, dest_path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    return h.hexdigest()
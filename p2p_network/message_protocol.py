@@ -1,19 +1,75 @@
-import json, struct
+import asyncio, json, struct
+
+HEADER = struct.Struct("!I")  # 4-byte big-endian body length before every JSON frame
+MAX_FRAME = 16 * 1024 * 1024  # larger frames are refused rather than buffered
+
+
+class FrameError(Exception):
+    """The peer sent a frame that cannot be decoded or is too large."""
+
+
+def encode_frame(obj):
+    data = json.dumps(obj, separators=(",", ":")).encode()
+    return HEADER.pack(len(data)) + data
+
+
+def decode_frame(data):
+    try:
+        return json.loads(data.decode())
+    except ValueError as e:
+        raise FrameError(f"bad frame: {e}") from None
+
 
 def send_json(sock, obj):
-    data = json.dumps(obj).encode()
-    sock.sendall(struct.pack("!I", len(data)))
-    sock.sendall(data)
+    sock.sendall(encode_frame(obj))
 
-def recv_json(sock):
-    header = sock.recv(4)
-    if not header:
+def recv_into_exactly(sock, view):
+    """Fill ``view`` from ``sock``; returns the bytes read, short only on EOF."""
+    got = 0
+    while got < len(view):
+        n = sock.recv_into(view[got:])
+        if not n:
+            break
+        got += n
+    return got
+
+
+def recv_exactly(sock, length):
+    """Exactly ``length`` bytes, read into one preallocated buffer."""
+    buf = bytearray(length)
+    if recv_into_exactly(sock, memoryview(buf)) < length:
+        raise ConnectionError("Connection closed")
+    return buf
+
+
+def recv_json(sock, max_frame=MAX_FRAME):
+    """Next JSON frame from a blocking socket, or None on a clean EOF between frames."""
+    header = bytearray(HEADER.size)
+    got = recv_into_exactly(sock, memoryview(header))
+    if got == 0:
         return None
-    length = struct.unpack("!I", header)[0]
-    data = b""
-    while len(data) < length:
-        chunk = sock.recv(length - len(data))
-        if not chunk:
-            raise ConnectionError("Connection closed")
-        data += chunk
-    return json.loads(data.decode())
+    if got < HEADER.size:
+        raise ConnectionError("Connection closed mid-frame")
+    (length,) = HEADER.unpack(header)
+    if length > max_frame:
+        raise FrameError(f"frame of {length} bytes exceeds the {max_frame} byte limit")
+    return decode_frame(recv_exactly(sock, length))
+
+
+async def read_frame(reader, max_frame=MAX_FRAME):
+    """Next JSON frame from an asyncio stream, or None on a clean EOF between frames."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("Connection closed mid-frame") from None
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > max_frame:
+        raise FrameError(f"frame of {length} bytes exceeds the {max_frame} byte limit")
+    try:
+        data = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ConnectionError("Connection closed mid-frame") from None
+    return decode_frame(data)
+
@@ -1,31 +1,173 @@
 # server.py
-import socket
-import threading
-import json
-
-def handle_client(conn, addr):
-    print(f"[NEW CONNECTION] {addr} connected.")
-    with conn:
-        data = conn.recv(4096)
-        if not data:
-            return
+"""asyncio peer server speaking length-prefixed JSON frames.
+
+Connections are persistent: a peer sends any number of request frames,
+each carrying an ``id``, and every response echoes the ``id`` of its
+request. Requests on one connection are handled concurrently, so
+responses may come back out of order and a client can pipeline freely.
+At most ``max_inflight`` requests per connection are in progress; past
+that the server stops reading from the socket and TCP flow control
+pushes back on the sender. Responses are written through ``drain`` so a
+slow reader cannot make the server buffer without bound.
+
+Idle connections cost one task and two small buffers each; a single
+sweeper closes the ones that have been quiet for ``idle_timeout``.
+"""
+import asyncio
+import time
+
+from .message_protocol import MAX_FRAME, FrameError, encode_frame, read_frame
+
+MAX_INFLIGHT = 64  # concurrent requests per connection before reads pause
+IDLE_TIMEOUT = 300.0  # seconds a connection may sit without a request
+BACKLOG = 4096  # pending accepts, so connection bursts are not refused
+
+
+async def default_handler(msg):
+    return {"status": "ok", "message": "received your data"}
+
+
+class PeerServer:
+    def __init__(self, handlers=None, max_inflight=MAX_INFLIGHT, idle_timeout=IDLE_TIMEOUT,
+                 max_frame=MAX_FRAME, verbose=False):
+        # message type -> async handler(msg) returning the response dict
+        self.handlers = dict(handlers or {})
+        self.max_inflight = max_inflight
+        self.idle_timeout = idle_timeout
+        self.max_frame = max_frame
+        self.verbose = verbose
+        self.requests = 0
+        self._server = None
+        self._sweeper = None
+        # writer -> [monotonic time of the last frame, requests in progress]
+        self._active = {}
+        self._handlers = set()
+
+    @property
+    def connections(self):
+        return len(self._active)
+
+    def route(self, msg_type):
+        """Decorator registering an async handler for ``msg_type``."""
+        def register(fn):
+            self.handlers[msg_type] = fn
+            return fn
+        return register
+
+    async def start(self, host="0.0.0.0", port=5000):
+        self._server = await asyncio.start_server(self.handle_connection, host, port, backlog=BACKLOG)
+        if self.idle_timeout:
+            self._sweeper = asyncio.ensure_future(self._sweep_idle())
+        return self._server
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self._server is not None:
+            self._server.close()
+        # Since 3.12 wait_closed() also waits for open connections, so end them first
+        for writer in list(self._active):
+            writer.close()
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def _sweep_idle(self):
+        # One timer for every connection instead of a timeout per read
+        while True:
+            await asyncio.sleep(self.idle_timeout / 4)
+            cutoff = time.monotonic() - self.idle_timeout
+            for writer, (last, inflight) in list(self._active.items()):
+                if last < cutoff and not inflight:
+                    writer.close()
+
+    async def respond(self, msg):
+        handler = self.handlers.get(msg.get("type"), default_handler)
         try:
-            msg = json.loads(data.decode())
-            print(f"[RECEIVED FROM {addr}] {msg}")
-            response = {"status": "ok", "message": "received your data"}
-            conn.sendall(json.dumps(response).encode())
+            response = await handler(msg)
         except Exception as e:
-            print("Error:", e)
+            response = {"status": "error", "message": str(e)}
+        if "id" in msg:
+            response = {**response, "id": msg["id"]}
+        return response
 
-def start_server(host="0.0.0.0", port=5000):
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind((host, port))
-    server.listen()
+    async def handle_connection(self, reader, writer):
+        addr = writer.get_extra_info("peername")
+        state = self._active[writer] = [time.monotonic(), 0]
+        self._handlers.add(asyncio.current_task())
+        if self.verbose:
+            print(f"[NEW CONNECTION] {addr} connected.")
+        slots = asyncio.Semaphore(self.max_inflight)
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def serve(msg):
+            try:
+                frame = encode_frame(await self.respond(msg))
+                async with write_lock:
+                    writer.write(frame)
+                    await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                state[1] -= 1
+                slots.release()
+
+        try:
+            while True:
+                # Backpressure: no new frame is read while the connection is saturated
+                await slots.acquire()
+                try:
+                    msg = await read_frame(reader, self.max_frame)
+                except BaseException:
+                    slots.release()
+                    raise
+                if msg is None:
+                    slots.release()
+                    break
+                if not isinstance(msg, dict):
+                    slots.release()
+                    raise FrameError("frame is not a JSON object")
+                self.requests += 1
+                state[0] = time.monotonic()
+                state[1] += 1
+                if self.verbose:
+                    print(f"[RECEIVED FROM {addr}] {msg}")
+                task = asyncio.ensure_future(serve(msg))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        except FrameError as e:
+            async with write_lock:
+                writer.write(encode_frame({"status": "error", "message": str(e)}))
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            del self._active[writer]
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+async def serve_forever(host="0.0.0.0", port=5000):
+    server = PeerServer(verbose=True)
+    srv = await server.start(host, port)
     print(f"[LISTENING] Peer listening on {host}:{port}")
-    while True:
-        conn, addr = server.accept()
-        thread = threading.Thread(target=handle_client, args=(conn, addr))
-        thread.start()
+    async with srv:
+        await srv.serve_forever()
+
+
+def start_server(host="0.0.0.0", port=5000):
+    asyncio.run(serve_forever(host, port))
 
 if __name__ == "__main__":
     start_server()
@@ -9,14 +9,11 @@ def main():
     ap.add_argument("--port", type=int, default=7001)
     ap.add_argument("--bootstrap", default='[]', help="JSON list of peers [{host,port,id?}]")
     ap.add_argument("--storage_dir", default=None, help="Directory to store chunks (overrides default)")
+    ap.add_argument("--store_path", default=None, help="SQLite file for DHT records (default: <storage_dir>/dht-<port>.sqlite3)")
     args = ap.parse_args()
 
     bootstrap = json.loads(args.bootstrap)
-    node = DHTNode(args.host, args.port, bootstrap)
-    if args.storage_dir:
-        import os
-        node.storage_dir = args.storage_dir
-        os.makedirs(node.storage_dir, exist_ok=True)
+    node = DHTNode(args.host, args.port, bootstrap, storage_dir=args.storage_dir, store_path=args.store_path)
 
     app = node.app()
     uvicorn.run(app, host=args.host, port=args.port, log_level="info")
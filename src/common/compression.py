@@ -0,0 +1,101 @@
+"""Per-chunk compression codecs.
+
+Chunk identity is always the SHA-256 of the uncompressed bytes; a codec
+only changes how a chunk is stored on disk and sent over the wire. Each
+chunk is compressed with whichever configured codec does best, and kept
+raw when none of them saves enough to pay for decoding it on every read.
+Compression is off unless a caller names codecs: even zlib's fastest level
+is far slower than hashing, and peers that cannot decode a codec make the
+node decompress on every read.
+"""
+import lzma
+import zlib
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+SAMPLE_BYTES = 64 * 1024  # prefix test-compressed before trying the whole chunk
+MIN_SIZE = 256  # chunks smaller than this are never compressed
+MAX_RATIO = 0.9  # compressed output must be at most this fraction of the input
+
+
+class Codec(NamedTuple):
+    name: str
+    http_name: str  # Content-Encoding token used on /chunks
+    compress: Callable[[bytes], bytes]
+    decompressor: Callable[[], object]  # object with .decompress(data) for streaming
+
+
+CODECS: Dict[str, Codec] = {
+    # HTTP "deflate" is the zlib format, so clients decode it natively
+    "zlib": Codec("zlib", "deflate", lambda b: zlib.compress(b, 6), zlib.decompressobj),
+    "lzma": Codec("lzma", "x-lzma", lambda b: lzma.compress(b, preset=6), lzma.LZMADecompressor),
+}
+BY_HTTP_NAME: Dict[str, Codec] = {c.http_name: c for c in CODECS.values()}
+DEFAULT_CODECS: Tuple[str, ...] = ()  # opt-in: compressing costs ingest and serving throughput
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"unknown chunk codec {name!r}") from None
+
+
+def parse_codecs(spec: str) -> Tuple[str, ...]:
+    """``"none"`` or a comma list like ``"zlib,lzma"`` -> codec names; raises ValueError on bad input."""
+    if spec == "none":
+        return ()
+    names = tuple(name.strip() for name in spec.split(",") if name.strip())
+    if not names:
+        raise ValueError("no codecs given; use none to store chunks raw")
+    for name in names:
+        get_codec(name)
+    return names
+
+
+def compress(data: bytes, codecs: Sequence[str] = DEFAULT_CODECS) -> Tuple[Optional[str], bytes]:
+    """``(codec, payload)`` for the smallest encoding of ``data``; ``(None, data)`` if none helps.
+
+    A cheap zlib pass over the first ``SAMPLE_BYTES`` weeds out
+    already-compressed or random data before any full-size attempt.
+    """
+    if not codecs or len(data) < MIN_SIZE:
+        return None, data
+    sample = bytes(data[:SAMPLE_BYTES])
+    if len(zlib.compress(sample, 1)) > len(sample) * MAX_RATIO:
+        return None, data
+    best_name, best = None, data
+    limit = len(data) * MAX_RATIO
+    for name in codecs:
+        payload = get_codec(name).compress(data)
+        if len(payload) <= limit and len(payload) < len(best):
+            best_name, best = name, payload
+    return best_name, best
+
+
+def decompress(codec: Optional[str], payload: bytes) -> bytes:
+    if codec is None:
+        return payload
+    d = get_codec(codec).decompressor()
+    return d.decompress(payload)
+
+
+def accepted_codecs(accept_encoding: Optional[str]) -> Dict[str, Codec]:
+    """Codecs named in an Accept-Encoding header, keyed by storage name (``q=0`` excluded)."""
+    accepted: Dict[str, Codec] = {}
+    for item in (accept_encoding or "").split(","):
+        token, _, params = item.strip().partition(";")
+        codec = BY_HTTP_NAME.get(token.strip().lower())
+        if codec is None:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted[codec.name] = codec
+    return accepted
+
+
+ACCEPT_ENCODING = ", ".join(c.http_name for c in CODECS.values())
@@ -0,0 +1,135 @@
+"""Merkle tree over a file's chunk hashes.
+
+Hashing follows RFC 6962: leaves are H(0x00 || digest) and interior nodes
+H(0x01 || left || right), so a leaf can never be passed off as a node. An
+unpaired node at the end of a level is carried up unchanged, which gives
+the same root as the RFC's split-at-power-of-two definition.
+"""
+from hashlib import sha256
+from typing import Iterable, List, Sequence, Tuple
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def leaf_hash(chunk_hash: str) -> bytes:
+    return sha256(LEAF_PREFIX + bytes.fromhex(chunk_hash)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return sha256(NODE_PREFIX + left + right).digest()
+
+
+EMPTY_ROOT = sha256(b"").hexdigest()
+DIGEST_SIZE = 32
+
+
+class MerkleBuilder:
+    """Streaming root computation holding O(log n) hashes."""
+
+    def __init__(self):
+        self._stack: List[Tuple[int, bytes]] = []  # (subtree size, hash), sizes strictly decreasing
+        self.count = 0
+
+    def add(self, chunk_hash: str):
+        size, h = 1, leaf_hash(chunk_hash)
+        while self._stack and self._stack[-1][0] == size:
+            left_size, left = self._stack.pop()
+            size, h = size + left_size, node_hash(left, h)
+        self._stack.append((size, h))
+        self.count += 1
+
+    def root(self) -> str:
+        if not self._stack:
+            return EMPTY_ROOT
+        h = self._stack[-1][1]
+        for _, left in reversed(self._stack[:-1]):
+            h = node_hash(left, h)
+        return h.hex()
+
+
+def merkle_root(chunk_hashes: Iterable[str]) -> str:
+    builder = MerkleBuilder()
+    for h in chunk_hashes:
+        builder.add(h)
+    return builder.root()
+
+
+class MerkleTree:
+    """All levels of the tree, for producing range proofs.
+
+    Each level is one ``bytes`` of concatenated 32-byte digests rather than
+    a list of digest objects, which keeps a cached tree at ~64 bytes a leaf.
+    """
+
+    def __init__(self, chunk_hashes: Iterable[str]):
+        level = b"".join(leaf_hash(h) for h in chunk_hashes)
+        self.levels: List[bytes] = [level]
+        while len(level) > DIGEST_SIZE:
+            nodes = len(level) // DIGEST_SIZE
+            nxt = b"".join(node_hash(level[i:i + DIGEST_SIZE], level[i + DIGEST_SIZE:i + 2 * DIGEST_SIZE])
+                           for i in range(0, (nodes - 1) * DIGEST_SIZE, 2 * DIGEST_SIZE))
+            if nodes % 2:
+                nxt += level[-DIGEST_SIZE:]
+            self.levels.append(nxt)
+            level = nxt
+
+    def __len__(self) -> int:
+        return len(self.levels[0]) // DIGEST_SIZE
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(level) for level in self.levels)
+
+    def root(self) -> str:
+        return self.levels[-1].hex() if self.levels[0] else EMPTY_ROOT
+
+    def prove_range(self, start: int, end: int) -> List[str]:
+        """Sibling hashes needed to rebuild the root from leaves ``[start, end)``.
+
+        Per level, bottom up: the left neighbour of the range if it starts on
+        a right child, then the right neighbour if it ends on a left child.
+        """
+        if not 0 <= start < end <= len(self):
+            raise ValueError(f"invalid range [{start}, {end}) for {len(self)} leaves")
+        proof: List[str] = []
+        lo, hi = start, end
+        for level in self.levels[:-1]:
+            if lo % 2:
+                proof.append(level[(lo - 1) * DIGEST_SIZE:lo * DIGEST_SIZE].hex())
+            if hi % 2 and hi * DIGEST_SIZE < len(level):
+                proof.append(level[hi * DIGEST_SIZE:(hi + 1) * DIGEST_SIZE].hex())
+            lo, hi = lo // 2, (hi + 1) // 2
+        return proof
+
+
+def verify_range(root: str, total: int, start: int, chunk_hashes: Sequence[str], proof: Sequence[str]) -> bool:
+    """Check that ``chunk_hashes`` are leaves ``start..`` of a ``total``-leaf tree with ``root``.
+
+    As in RFC 6962 the root does not commit to the leaf count, so ``total``
+    must come from the same trusted source as ``root`` (the manifest).
+    """
+    end = start + len(chunk_hashes)
+    if not 0 <= start < end <= total:
+        return False
+    nodes = [leaf_hash(h) for h in chunk_hashes]
+    siblings = iter(bytes.fromhex(p) for p in proof)
+    lo, hi, width = start, end, total
+    try:
+        while width > 1:
+            if lo % 2:
+                nodes.insert(0, next(siblings))
+                lo -= 1
+            if hi % 2 and hi < width:
+                nodes.append(next(siblings))
+                hi += 1
+            # nodes now cover [lo, hi) with lo even
+            nxt = [node_hash(nodes[i], nodes[i + 1]) for i in range(0, len(nodes) - 1, 2)]
+            if len(nodes) % 2:
+                nxt.append(nodes[-1])  # unpaired last node of the level
+            nodes, lo, hi, width = nxt, lo // 2, (hi + 1) // 2, (width + 1) // 2
+    except (StopIteration, ValueError):
+        return False
+    if next(siblings, None) is not None:
+        return False
+    return len(nodes) == 1 and nodes[0].hex() == root
@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+MAX_CONNECTIONS_PER_HOST = 8
+KEEPALIVE_EXPIRY = 30.0
+
+
+class Transport:
+    """Keep-alive HTTP client pool shared by every DHT and chunk RPC.
+
+    One ``httpx.AsyncClient`` is kept per ``(host, port)`` so each peer gets its
+    own bounded connection pool and sockets are reused across requests.
+    Clients are tied to the event loop that created them and are closed when
+    that loop shuts down its async generators, as ``asyncio.run`` does, so
+    repeated ``asyncio.run`` calls do not leak connections.
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+        keepalive_expiry: float = KEEPALIVE_EXPIRY,
+        transport_factory: Optional[Callable[[str, int], httpx.AsyncBaseTransport]] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_connections_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.transport_factory = transport_factory
+        self._clients: Dict[Tuple[str, int], httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._guard = None
+
+    async def _close_with_loop(self, clients: Dict[Tuple[str, int], httpx.AsyncClient]):
+        # Finalised by loop.shutdown_asyncgens() (asyncio.run does this) while
+        # the loop can still close the sockets its clients opened
+        try:
+            yield
+        finally:
+            for c in list(clients.values()):
+                await c.aclose()
+            clients.clear()
+
+    def _bind_loop(self, loop: asyncio.AbstractEventLoop):
+        # A fresh dict per loop; the previous loop's clients stay with that loop's guard
+        self._clients = {}
+        self._loop = loop
+        self._guard = self._close_with_loop(self._clients)
+        asyncio.ensure_future(self._guard.__anext__())
+
+    def client(self, host: str, port: int) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pooled connections belong to the loop that opened them
+            self._bind_loop(loop)
+        key = (host, port)
+        c = self._clients.get(key)
+        if c is None or c.is_closed:
+            kwargs: Dict[str, Any] = {"limits": self.limits}
+            if self.transport_factory is not None:
+                kwargs["transport"] = self.transport_factory(host, port)
+            c = httpx.AsyncClient(base_url=f"http://{host}:{port}", **kwargs)
+            self._clients[key] = c
+        return c
+
+    async def get(self, host: str, port: int, path: str, timeout: float = 5.0, **kwargs) -> httpx.Response:
+        r = await self.client(host, port).get(path, timeout=timeout, **kwargs)
+        r.raise_for_status()
+        return r
+
+    async def post_json(self, host: str, port: int, path: str, body: Any = None, timeout: float = 3.0) -> Dict[str, Any]:
+        r = await self.client(host, port).post(path, json=body, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for c in clients:
+            await c.aclose()
+
+
+_transport = Transport()
+
+
+def get_transport() -> Transport:
+    return _transport
+
+
+def set_transport(transport: Transport) -> Transport:
+    """Install the process-wide transport and return the previous one."""
+    global _transport
+    previous, _transport = _transport, transport
+    return previous
@@ -1,7 +1,7 @@
-import httpx
 from typing import Any, Dict
 # src/dht/client.py
 import requests
+from ..common.transport import get_transport
 
 class DHTClient:
     def __init__(self, base_url="http://127.0.0.1:8000"):
@@ -19,8 +19,4 @@ class DHTClient:
 
 
 async def rpc(host: str, port: int, path: str, body: Dict[str, Any], timeout=3.0) -> Dict[str, Any]:
-    url = f"http://{host}:{port}{path}"
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        r = await client.post(url, json=body)
-        r.raise_for_status()
-        return r.json()
+    return await get_transport().post_json(host, port, path, body, timeout=timeout)
@@ -2,6 +2,7 @@ import os
 from hashlib import sha256
 
 NODE_ID_BYTES = 20  # 160-bit
+NODE_ID_BITS = NODE_ID_BYTES * 8
 
 def node_id_from_string(s: str) -> bytes:
     full = sha256(s.encode("utf-8")).digest()  # 32 bytes
@@ -10,5 +11,10 @@ def node_id_from_string(s: str) -> bytes:
 def random_node_id() -> bytes:
     return node_id_from_string(os.urandom(32).hex())
 
+def id_to_int(id_hex: str) -> int:
+    """Integer form of an ID or key, truncated/padded to NODE_ID_BYTES like xor_distance."""
+    return int(id_hex[:NODE_ID_BYTES * 2].ljust(NODE_ID_BYTES * 2, "0"), 16)
+
 def xor_distance(a: bytes, b: bytes) -> int:
-    return int.from_bytes(bytes(x ^ y for x, y in zip(a, b)), "big")
+    n = min(len(a), len(b))
+    return int.from_bytes(a[:n], "big") ^ int.from_bytes(b[:n], "big")
@@ -1,31 +1,158 @@
 import asyncio
-from typing import Any, List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 from .routing import Contact
 from .client import rpc
+from .id import id_to_int
 
-async def find_value(start: List[Contact], key_hex: str, alpha: int = 3) -> Optional[Any]:
-    seen = set()
-    shortlist = list(start)
+BATCH_SIZE = 1000  # keys per batched RPC
+K = 20  # contacts a lookup converges on
 
-    while shortlist:
-        batch, shortlist = shortlist[:alpha], shortlist[alpha:]
-        tasks = [rpc(c.host, c.port, "/find_value", {"key": key_hex}) for c in batch]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        next_contacts: List[Contact] = []
-        for res in results:
+@dataclass
+class LookupStats:
+    hops: int = 0
+    rpcs: int = 0
+    failures: int = 0
+
+def _addr(c: Contact) -> Tuple[str, int]:
+    return c.host, c.port
+
+async def _lookup(start: List[Contact], key_hex: str, path: str, body: Dict[str, Any],
+                  alpha: int, k: int, stats: LookupStats) -> Tuple[Optional[Any], List[Contact]]:
+    """Iterative Kademlia lookup shared by find_node and find_value.
+
+    The shortlist is kept ordered by XOR distance to the key. Each hop
+    queries the ``alpha`` closest contacts not yet asked, among the ``k``
+    closest live ones, in parallel; the lookup converges once all of those
+    ``k`` have responded. Returns the value (if ``path`` yields one) and the
+    closest responsive contacts.
+    """
+    target = id_to_int(key_hex)
+    shortlist: Dict[Tuple[str, int], Contact] = {_addr(c): c for c in start}
+    queried = set()
+    responded: List[Contact] = []
+
+    def nearest() -> List[Contact]:
+        return sorted(shortlist.values(), key=lambda c: c.id_int ^ target)[:k]
+
+    while True:
+        batch = [c for c in nearest() if _addr(c) not in queried][:alpha]
+        if not batch:
+            break
+        stats.hops += 1
+        stats.rpcs += len(batch)
+        queried.update(_addr(c) for c in batch)
+        results = await asyncio.gather(
+            *(rpc(c.host, c.port, path, body) for c in batch), return_exceptions=True
+        )
+        for c, res in zip(batch, results):
             if isinstance(res, Exception):
+                stats.failures += 1
+                del shortlist[_addr(c)]
                 continue
             if res.get("value") is not None:
-                return res["value"]
+                return res["value"], sorted(responded, key=lambda x: x.id_int ^ target)
+            responded.append(c)
             for cc in res.get("contacts", []):
-                k = cc["id"]
-                if k not in seen:
-                    seen.add(k)
-                    next_contacts.append(Contact(id_hex=cc["id"], host=cc["host"], port=cc["port"]))
-        shortlist.extend(next_contacts)
-    return None
+                nc = Contact(id_hex=cc["id"], host=cc["host"], port=cc["port"])
+                if _addr(nc) not in queried:
+                    shortlist[_addr(nc)] = nc
+    return None, sorted(responded, key=lambda c: c.id_int ^ target)[:k]
+
+async def find_node(start: List[Contact], target_hex: str, alpha: int = 3, k: int = K,
+                    stats: Optional[LookupStats] = None) -> List[Contact]:
+    stats = stats if stats is not None else LookupStats()
+    _, contacts = await _lookup(start, target_hex, "/find_node", {"target": target_hex}, alpha, k, stats)
+    return contacts
+
+async def find_value(start: List[Contact], key_hex: str, alpha: int = 3, k: int = K,
+                     stats: Optional[LookupStats] = None) -> Optional[Any]:
+    stats = stats if stats is not None else LookupStats()
+    value, lacking = await _lookup(start, key_hex, "/find_value", {"key": key_hex}, alpha, k, stats)
+    if value is not None and lacking:
+        # Cache at the closest node that did not have it so later lookups stop sooner
+        c = lacking[0]
+        stats.rpcs += 1
+        try:
+            await rpc(c.host, c.port, "/store", {"key": key_hex, "value": value})
+        except Exception:
+            stats.failures += 1
+    return value
+
+async def find_values(start: List[Contact], keys: List[str], alpha: int = 3, k: int = K,
+                      batch_size: int = BATCH_SIZE) -> Dict[str, Any]:
+    """Look up many keys at once, grouping keys that share a next hop into one RPC.
+
+    Each unresolved key is routed to its closest contact not yet asked for it,
+    among the ``k`` closest live contacts known for that key, so a key follows
+    the same convergence rule as ``find_value``. All keys bound for the same
+    contact travel together in batches of ``batch_size``. Keys that are never
+    found are absent from the result.
+    """
+    found: Dict[str, Any] = {}
+    candidates: Dict[str, List[Contact]] = {key: list(start) for key in dict.fromkeys(keys)}
+    asked: Dict[str, set] = {key: set() for key in candidates}
+    sem = asyncio.Semaphore(alpha)
+
+    async def query(c: Contact, batch: List[str]):
+        async with sem:
+            try:
+                return c, batch, await rpc(c.host, c.port, "/find_values", {"keys": batch})
+            except Exception:
+                return c, batch, None
+
+    while candidates:
+        groups: Dict[Tuple[str, int], Tuple[Contact, List[str]]] = {}
+        for key in list(candidates):
+            c = next((x for x in candidates[key][:k] if _addr(x) not in asked[key]), None)
+            if c is None:
+                del candidates[key]
+                continue
+            asked[key].add(_addr(c))
+            groups.setdefault(_addr(c), (c, []))[1].append(key)
+        if not groups:
+            break
+
+        tasks = [
+            query(c, group[i:i + batch_size])
+            for c, group in groups.values()
+            for i in range(0, len(group), batch_size)
+        ]
+        for c, batch, body in await asyncio.gather(*tasks):
+            if body is None:
+                for key in batch:
+                    if key in candidates:
+                        candidates[key] = [x for x in candidates[key] if _addr(x) != _addr(c)]
+                continue
+            for key, value in body.get("values", {}).items():
+                if key in candidates and value is not None:
+                    found[key] = value
+                    del candidates[key]
+            nodes = body.get("nodes", {})
+            for key, ids in body.get("closest", {}).items():
+                if key not in candidates:
+                    continue
+                known = {_addr(x): x for x in candidates[key]}
+                for cid in ids:
+                    if cid in nodes:
+                        nc = Contact(id_hex=cid, host=nodes[cid]["host"], port=nodes[cid]["port"])
+                        known.setdefault(_addr(nc), nc)
+                target = id_to_int(key)
+                candidates[key] = sorted(known.values(), key=lambda x: x.id_int ^ target)
+    return found
 
 async def store_value(contacts: List[Contact], key_hex: str, value: Any, alpha: int = 3) -> None:
     batch = contacts[:alpha]
     tasks = [rpc(c.host, c.port, "/store", {"key": key_hex, "value": value}) for c in batch]
     await asyncio.gather(*tasks, return_exceptions=True)
+
+async def store_values(contacts: List[Contact], items: Dict[str, Any], alpha: int = 3,
+                       batch_size: int = BATCH_SIZE) -> None:
+    """Store many key/value pairs with one ``/store_many`` RPC per batch and contact."""
+    pairs = [{"key": k, "value": v} for k, v in items.items()]
+    tasks = [
+        rpc(c.host, c.port, "/store_many", {"items": pairs[i:i + batch_size]})
+        for c in contacts[:alpha]
+        for i in range(0, len(pairs), batch_size)
+    ]
+    await asyncio.gather(*tasks, return_exceptions=True)
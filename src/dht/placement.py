@@ -0,0 +1,40 @@
+from typing import Iterable, List, Optional, Tuple
+from .id import node_id_from_string
+from .routing import Contact, RoutingTable
+
+
+def storage_node_id(host: str, port: int) -> str:
+    """Stable placement ID of a storage node, derived from its address."""
+    return node_id_from_string(f"{host}:{port}").hex()
+
+
+class Placement:
+    """Picks the storage nodes responsible for a key by XOR distance.
+
+    Node IDs are hashes of their addresses, so a key maps to the same
+    nodes on every run, and adding a node only moves the keys for which it
+    becomes one of the ``replicas`` closest: about ``replicas / N`` of them.
+    """
+
+    def __init__(self, nodes: Iterable[Tuple[str, int]], replicas: int = 1):
+        nodes = list(nodes)
+        if not nodes:
+            raise ValueError("no storage nodes to place chunks on")
+        if replicas < 1:
+            raise ValueError("replicas must be at least 1")
+        self.replicas = min(replicas, len(nodes))
+        # Buckets must never overflow into the replacement cache
+        self.table = RoutingTable(bytes(20), k=len(nodes))
+        for host, port in nodes:
+            self.table.add(Contact(id_hex=storage_node_id(host, port), host=host, port=port))
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def ranked(self, key: str) -> List[Contact]:
+        """Every node, closest to ``key`` first."""
+        return self.table.closest(key, len(self.table))
+
+    def nodes_for(self, key: str, replicas: Optional[int] = None) -> List[Contact]:
+        """The ``replicas`` nodes (default: the configured factor) that should hold ``key``."""
+        return self.table.closest(key, replicas or self.replicas)
@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
-from typing import List
-from .id import xor_distance
+from typing import Dict, List
+from .id import NODE_ID_BITS, id_to_int
 
 @dataclass
 class Contact:
@@ -8,23 +8,75 @@ class Contact:
     host: str
     port: int
     last_seen: float = field(default=0.0)
+    id_int: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.id_int = id_to_int(self.id_hex)
 
 class RoutingTable:
+    """Kademlia routing table of k-buckets indexed by XOR prefix length.
+
+    Bucket ``i`` holds contacts whose distance from us has bit length ``i``,
+    so bucket 0 only ever contains our own ID. Each bucket keeps at most
+    ``k`` contacts ordered from least to most recently seen; contacts that
+    arrive while a bucket is full wait in a replacement cache.
+    """
+
     def __init__(self, self_id: bytes, k: int = 20):
         self.k = k
         self.self_id = self_id
-        self._contacts: List[Contact] = []
+        self._self_int = int.from_bytes(self_id, "big")
+        self._buckets: List[List[Contact]] = [[] for _ in range(NODE_ID_BITS + 1)]
+        self._replacements: Dict[int, List[Contact]] = {}
+        self._index: Dict[str, Contact] = {}
+
+    def _bucket_index(self, id_int: int) -> int:
+        return (id_int ^ self._self_int).bit_length()
 
     def add(self, c: Contact):
-        key = c.id_hex
-        self._contacts = [x for x in self._contacts if x.id_hex != key]
-        self._contacts.append(c)
-        self._contacts.sort(key=lambda x: xor_distance(bytes.fromhex(x.id_hex), self.self_id))
-        self._contacts = self._contacts[: self.k * 8]
+        idx = self._bucket_index(c.id_int)
+        bucket = self._buckets[idx]
+        old = self._index.get(c.id_hex)
+        if old is not None:
+            bucket.remove(old)
+        elif len(bucket) >= self.k:
+            cache = self._replacements.setdefault(idx, [])
+            cache[:] = ([x for x in cache if x.id_hex != c.id_hex] + [c])[-self.k:]
+            return
+        bucket.append(c)
+        self._index[c.id_hex] = c
+
+    def remove(self, id_hex: str):
+        c = self._index.pop(id_hex, None)
+        if c is None:
+            return
+        idx = self._bucket_index(c.id_int)
+        self._buckets[idx].remove(c)
+        cache = self._replacements.get(idx)
+        if cache:
+            r = cache.pop()
+            self._buckets[idx].append(r)
+            self._index[r.id_hex] = r
 
     def closest(self, target_hex: str, count: int = 20) -> List[Contact]:
-        target = bytes.fromhex(target_hex)
-        return sorted(self._contacts, key=lambda x: xor_distance(bytes.fromhex(x.id_hex), target))[:count]
+        # Contacts in the target's own bucket are closest, every lower bucket
+        # is next (all at the same distance magnitude), then each higher
+        # bucket in turn, so only the buckets that can contribute are sorted.
+        target = id_to_int(target_hex)
+        idx = self._bucket_index(target)
+        found = list(self._buckets[idx])
+        if len(found) < count:
+            for j in range(idx - 1, -1, -1):
+                found.extend(self._buckets[j])
+            j = idx + 1
+            while len(found) < count and j <= NODE_ID_BITS:
+                found.extend(self._buckets[j])
+                j += 1
+        found.sort(key=lambda x: x.id_int ^ target)
+        return found[:count]
 
     def all(self) -> List[Contact]:
-        return list(self._contacts)
+        return [c for bucket in self._buckets for c in bucket]
+
+    def __len__(self) -> int:
+        return len(self._index)
@@ -1,13 +1,22 @@
+import asyncio
 import os
 import time
-from typing import Any, Dict, List
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
 from .routing import RoutingTable, Contact
 from .id import random_node_id
-from ..common.hashing import sha256_hex
+from .store import KVStore
+from ..common.compression import accepted_codecs, decompress, get_codec
+from ..storage.chunk_store import open_store
+from ..storage.verify import VerifyCache
+
+SCRUB_INTERVAL = 60.0  # seconds between background integrity passes
+SCRUB_BATCH = 200  # chunks re-hashed per pass
 
 
 class StoreBody(BaseModel):
@@ -15,6 +24,10 @@ class StoreBody(BaseModel):
     value: Any
 
 
+class StoreManyBody(BaseModel):
+    items: List[StoreBody]
+
+
 class FindNodeBody(BaseModel):
     target: str
 
@@ -23,16 +36,24 @@ class FindValueBody(BaseModel):
     key: str
 
 
+class FindValuesBody(BaseModel):
+    keys: List[str]
+
+
 class DHTNode:
-    def __init__(self, host: str, port: int, bootstrap: List[Dict[str, Any]]):
+    def __init__(self, host: str, port: int, bootstrap: List[Dict[str, Any]],
+                 storage_dir: Optional[str] = None, store_path: Optional[str] = None):
         self.host = host
         self.port = port
         self.node_id = random_node_id()
         self.id_hex = self.node_id.hex()
         self.rt = RoutingTable(self.node_id)
-        self.store: Dict[str, Any] = {}
-        self.storage_dir = os.environ.get("STORAGE_DIR", f"./storage/{self.port}")
+        self.storage_dir = storage_dir or os.environ.get("STORAGE_DIR", f"./storage/{self.port}")
         os.makedirs(self.storage_dir, exist_ok=True)
+        self.chunks = open_store(self.storage_dir)
+        self.verified = VerifyCache()
+        # chunk -> peers records survive restarts
+        self.store = KVStore(store_path or os.path.join(self.storage_dir, f"dht-{self.port}.sqlite3"))
 
         self.rt.add(Contact(id_hex=self.id_hex, host=self.host, port=self.port, last_seen=time.time()))
         for peer in bootstrap:
@@ -41,8 +62,28 @@ class DHTNode:
             pid = peer.get("id") or self.id_hex
             self.rt.add(Contact(id_hex=pid, host=peer["host"], port=peer["port"], last_seen=time.time()))
 
+    def close(self):
+        self.store.close()
+
     def app(self) -> FastAPI:
-        app = FastAPI()
+        async def scrub_loop():
+            loop = asyncio.get_running_loop()
+            while True:
+                await asyncio.sleep(SCRUB_INTERVAL)
+                bad = await loop.run_in_executor(None, self.verified.scrub, SCRUB_BATCH)
+                for chunk_hash in bad:
+                    print(f"[DHTNode] stored chunk {chunk_hash[:8]}... failed re-verification")
+
+        @asynccontextmanager
+        async def lifespan(app: FastAPI):
+            scrubber = asyncio.ensure_future(scrub_loop())
+            try:
+                yield
+            finally:
+                scrubber.cancel()
+                self.close()
+
+        app = FastAPI(lifespan=lifespan)
 
         @app.post("/ping")
         def ping():
@@ -55,6 +96,13 @@ class DHTNode:
             self.store[body.key] = body.value
             return {"ok": True}
 
+        @app.post("/store_many")
+        def store_many(body: StoreManyBody):
+            if any(not item.key for item in body.items):
+                raise HTTPException(400, "missing key")
+            self.store.put_many((item.key, item.value) for item in body.items)
+            return {"ok": True, "stored": len(body.items)}
+
         @app.post("/find_node")
         def find_node(body: FindNodeBody):
             contacts = [
@@ -65,28 +113,58 @@ class DHTNode:
 
         @app.post("/find_value")
         def find_value(body: FindValueBody):
-            if body.key in self.store:
-                return {"ok": True, "value": self.store[body.key]}
+            value = self.store.get(body.key)
+            if value is not None:
+                return {"ok": True, "value": value}
             contacts = [
                 {"id": c.id_hex, "host": c.host, "port": c.port}
                 for c in self.rt.closest(body.key, 20)
             ]
             return {"ok": True, "contacts": contacts}
 
+        @app.post("/find_values")
+        def find_values(body: FindValuesBody):
+            # Contacts are sent once and referenced by id from each missing key
+            values: Dict[str, Any] = {}
+            closest: Dict[str, List[str]] = {}
+            nodes: Dict[str, Dict[str, Any]] = {}
+            stored = self.store.get_many(body.keys)
+            for key in body.keys:
+                if stored.get(key) is not None:
+                    values[key] = stored[key]
+                    continue
+                ids = []
+                for c in self.rt.closest(key, 20):
+                    nodes[c.id_hex] = {"host": c.host, "port": c.port}
+                    ids.append(c.id_hex)
+                closest[key] = ids
+            return {"ok": True, "values": values, "closest": closest, "nodes": nodes}
+
         @app.get("/chunks/{chunk_hash}")
-        def get_chunk(chunk_hash: str):
+        def get_chunk(chunk_hash: str, request: Request):
             try:
-                bytes.fromhex(chunk_hash)
-            except Exception:
+                if len(bytes.fromhex(chunk_hash)) != 32:
+                    raise ValueError(chunk_hash)
+            except ValueError:
                 raise HTTPException(400, "invalid chunk hash")
-            p = os.path.join(self.storage_dir, chunk_hash)
-            if not os.path.exists(p):
+            loc = self.chunks.locate(chunk_hash)
+            if loc is None:
                 raise HTTPException(404, "chunk not found")
-            with open(p, "rb") as f:
-                data = f.read()
-            if sha256_hex(data) != chunk_hash:
+            # Hashed once per (inode, mtime, size); repeat reads skip straight to sending
+            st = self.verified.check(chunk_hash, loc)
+            if st is None:
                 raise HTTPException(500, "stored chunk corrupted")
-            return Response(content=data, media_type="application/octet-stream")
+            headers = {"Vary": "Accept-Encoding"}
+            if loc.codec is not None:
+                if loc.codec not in accepted_codecs(request.headers.get("accept-encoding")):
+                    # Clients that cannot decode this codec get the original bytes
+                    data = decompress(loc.codec, self.chunks.read(loc))
+                    return Response(content=data, media_type="application/octet-stream", headers=headers)
+                headers["Content-Encoding"] = get_codec(loc.codec).http_name
+            if loc.packed:
+                return Response(content=self.chunks.read(loc), media_type="application/octet-stream",
+                                headers=headers)
+            return FileResponse(loc.path, media_type="application/octet-stream", stat_result=st, headers=headers)
 
         return app
 
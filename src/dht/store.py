@@ -0,0 +1,166 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class KVStore:
+    """Durable key/value store for DHT records, backed by SQLite in WAL mode.
+
+    Writers queue their records and a single background thread commits
+    everything queued so far in one transaction, so concurrent ``/store``
+    requests share a single fsync (group commit). ``put`` returns once the
+    record is durable unless ``wait=False``. Reads see queued records
+    immediately. Reopening the file is instant, so a node holding millions
+    of keys serves again as soon as it restarts.
+    """
+
+    def __init__(self, path: str, synchronous: str = "FULL"):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []  # every thread's connection, closed in close()
+        self._synchronous = synchronous
+        self._cond = threading.Condition()
+        self._pending: Dict[str, str] = {}
+        self._writing: Dict[str, str] = {}
+        self._queued = 0
+        self._committed = 0
+        self._failed: Optional[Tuple[int, int, BaseException]] = None
+        self._closed = False
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID")
+        conn.commit()
+
+        self._writer = threading.Thread(target=self._write_loop, name="kvstore-writer", daemon=True)
+        self._writer.start()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("store is closed")
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(f"PRAGMA synchronous={self._synchronous}")
+            self._local.conn = conn
+            with self._cond:
+                self._readers.append(conn)
+        return conn
+
+    def _write_loop(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute(f"PRAGMA synchronous={self._synchronous}")
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    break
+                batch, self._pending = self._pending, {}
+                self._writing = batch
+                first, seq = self._committed, self._queued
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", batch.items())
+            except Exception as e:
+                with self._cond:
+                    self._failed = (first, seq, e)
+            with self._cond:
+                self._writing = {}
+                self._committed = seq
+                self._cond.notify_all()
+        conn.close()
+
+    def _lookup(self, key: str) -> Any:
+        with self._cond:
+            raw = self._pending.get(key)
+            if raw is None:
+                raw = self._writing.get(key)
+        if raw is None:
+            row = self._conn().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return _MISSING
+            raw = row[0]
+        return json.loads(raw)
+
+    def put_many(self, items: Iterable[Tuple[str, Any]], wait: bool = True):
+        encoded = [(k, json.dumps(v)) for k, v in items]
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("store is closed")
+            self._pending.update(encoded)
+            self._queued += 1
+            seq = self._queued
+            self._cond.notify_all()
+            if wait:
+                while self._committed < seq:
+                    self._cond.wait()
+                failed = self._failed
+                if failed is not None and failed[0] < seq <= failed[1]:
+                    raise RuntimeError(f"store write failed: {failed[2]}")
+
+    def put(self, key: str, value: Any, wait: bool = True):
+        self.put_many([(key, value)], wait=wait)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Values for the keys that are present, fetched with few queries."""
+        found: Dict[str, Any] = {}
+        rest = []
+        with self._cond:
+            for k in keys:
+                raw = self._pending.get(k) or self._writing.get(k)
+                if raw is not None:
+                    found[k] = json.loads(raw)
+                else:
+                    rest.append(k)
+        conn = self._conn()
+        for i in range(0, len(rest), 500):
+            part = rest[i:i + 500]
+            marks = ",".join("?" * len(part))
+            for k, raw in conn.execute(f"SELECT key, value FROM kv WHERE key IN ({marks})", part):
+                found[k] = json.loads(raw)
+        return found
+
+    def flush(self):
+        with self._cond:
+            seq = self._queued
+            while self._committed < seq:
+                self._cond.wait()
+
+    def update(self, items: Dict[str, Any]):
+        self.put_many(items.items())
+
+    def __setitem__(self, key: str, value: Any):
+        self.put(key, value)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._conn().execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        with self._cond:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
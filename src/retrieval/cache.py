@@ -0,0 +1,198 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from ..common.hashing import sha256_hex
+
+
+class ChunkCache:
+    """Content-addressed chunk cache: an in-memory LRU over an on-disk LRU.
+
+    Chunks are keyed by their SHA-256, so an entry can never go stale; the
+    only reason to drop one is space. Each tier has its own byte budget.
+    Reads promote disk hits into memory, writes go to both tiers, and disk
+    entries are re-hashed when read so a damaged file is dropped rather
+    than served.
+
+    The lock only ever guards the in-memory bookkeeping; file reads, writes
+    and hashing happen outside it. ``get_disk`` and ``put_disk`` block, so
+    async callers run them in an executor and keep memory lookups inline.
+    """
+
+    def __init__(self, memory_bytes: int, disk_dir: Optional[str] = None, disk_bytes: int = 0):
+        self.memory_limit = memory_bytes
+        self.disk_dir = disk_dir if disk_bytes > 0 else None
+        self.disk_limit = disk_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # hash -> size, LRU first
+        self._disk_bytes = 0
+        self._writing: Set[str] = set()  # hashes being written to disk outside the lock
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        if self.disk_dir is not None:
+            self._load_disk_index()
+
+    def _path(self, chunk_hash: str) -> str:
+        return os.path.join(self.disk_dir, chunk_hash[:2], chunk_hash)
+
+    def _load_disk_index(self):
+        # Rebuild LRU order from mtimes, which are bumped on every disk hit
+        entries = []
+        os.makedirs(self.disk_dir, exist_ok=True)
+        for sub in os.scandir(self.disk_dir):
+            if not sub.is_dir():
+                continue
+            for e in os.scandir(sub.path):
+                if e.name.endswith(".tmp"):
+                    os.remove(e.path)
+                    continue
+                st = e.stat()
+                entries.append((st.st_mtime_ns, e.name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+        self._remove(self._evict_disk())
+
+    def _evict_memory(self):
+        while self._memory_bytes > self.memory_limit and self._memory:
+            _, data = self._memory.popitem(last=False)
+            self._memory_bytes -= len(data)
+
+    def _evict_disk(self) -> List[str]:
+        """Drop least recently used disk entries over the budget; returns hashes whose files to remove."""
+        evicted = []
+        while self._disk_bytes > self.disk_limit and self._disk:
+            chunk_hash, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(chunk_hash)
+        return evicted
+
+    def _remove(self, chunk_hashes: List[str]):
+        for chunk_hash in chunk_hashes:
+            try:
+                os.remove(self._path(chunk_hash))
+            except FileNotFoundError:
+                pass
+
+    def _remember(self, chunk_hash: str, data: bytes):
+        if len(data) > self.memory_limit or chunk_hash in self._memory:
+            return
+        self._memory[chunk_hash] = data
+        self._memory_bytes += len(data)
+        self._evict_memory()
+
+    def __contains__(self, chunk_hash: str) -> bool:
+        with self._lock:
+            return chunk_hash in self._memory or chunk_hash in self._disk
+
+    def get(self, chunk_hash: str) -> Optional[bytes]:
+        data = self.get_memory(chunk_hash)
+        return data if data is not None else self.get_disk(chunk_hash)
+
+    def get_memory(self, chunk_hash: str) -> Optional[bytes]:
+        """The chunk if it is in the memory tier; never touches the disk and never counts a miss."""
+        with self._lock:
+            data = self._memory.get(chunk_hash)
+            if data is not None:
+                self._memory.move_to_end(chunk_hash)
+                self.hits_memory += 1
+            return data
+
+    def get_disk(self, chunk_hash: str) -> Optional[bytes]:
+        """The chunk from the disk tier, promoted into memory. Blocking: file I/O and a SHA-256.
+
+        The lock only guards the index; reading and re-hashing happen outside it.
+        """
+        with self._lock:
+            if chunk_hash not in self._disk:
+                self.misses += 1
+                return None
+        path = self._path(chunk_hash)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:  # evicted since the index was checked
+            data = None
+        damaged = data is not None and sha256_hex(data) != chunk_hash
+        with self._lock:
+            if data is None or damaged:
+                size = self._disk.pop(chunk_hash, None)
+                if size is not None:
+                    self._disk_bytes -= size
+                self.misses += 1
+            else:
+                if chunk_hash in self._disk:
+                    self._disk.move_to_end(chunk_hash)
+                self.hits_disk += 1
+                self._remember(chunk_hash, data)
+        try:
+            if damaged:
+                os.remove(path)
+            elif data is not None:
+                os.utime(path)
+        except FileNotFoundError:
+            pass
+        return None if damaged else data
+
+    def put(self, chunk_hash: str, data: bytes):
+        """Cache a chunk the caller has already verified against ``chunk_hash``."""
+        self.put_memory(chunk_hash, data)
+        self.put_disk(chunk_hash, data)
+
+    def put_memory(self, chunk_hash: str, data: bytes):
+        with self._lock:
+            self._remember(chunk_hash, data)
+
+    def put_disk(self, chunk_hash: str, data: bytes):
+        """Write a verified chunk to the disk tier. Blocking; the file is written outside the lock.
+
+        The disk tier is best effort, so a failed write leaves the chunk uncached
+        instead of raising.
+        """
+        if self.disk_dir is None or len(data) > self.disk_limit:
+            return
+        with self._lock:
+            if chunk_hash in self._disk or chunk_hash in self._writing:
+                return
+            self._writing.add(chunk_hash)
+        path = self._path(chunk_hash)
+        tmp = path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            with self._lock:
+                self._writing.discard(chunk_hash)
+            return
+        with self._lock:
+            self._writing.discard(chunk_hash)
+            self._disk[chunk_hash] = len(data)
+            self._disk_bytes += len(data)
+            evicted = self._evict_disk()
+        self._remove(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hitsMemory": self.hits_memory,
+                "hitsDisk": self.hits_disk,
+                "misses": self.misses,
+                "hitRate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "memoryEntries": len(self._memory),
+                "memoryBytes": self._memory_bytes,
+                "memoryLimit": self.memory_limit,
+                "diskEntries": len(self._disk),
+                "diskBytes": self._disk_bytes,
+                "diskLimit": self.disk_limit,
+            }
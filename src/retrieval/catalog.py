@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from .manifest import BINARY_SUFFIX, JSON_SUFFIX, load_manifest_data
+
+MANIFEST_SUFFIXES = (JSON_SUFFIX, BINARY_SUFFIX)
+
+
+class ManifestCatalog:
+    """SQLite index over the manifests directory.
+
+    Keeps one row per manifest (name, size, chunk count, upload time) plus
+    an inverted chunk-hash -> file index, so listing and hash search are
+    index lookups instead of re-reading every manifest. Uploads add entries
+    incrementally; ``rebuild`` re-syncs with the directory on startup and
+    only re-reads manifests whose mtime changed.
+    """
+
+    def __init__(self, db_path: str, manifests_dir: str):
+        self.manifests_dir = manifests_dir
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                file_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                first_hash TEXT NOT NULL,
+                chunks INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                uploaded_at REAL NOT NULL,
+                path TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_uploaded_at ON files (uploaded_at);
+            CREATE TABLE IF NOT EXISTS chunk_files (
+                hash TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                PRIMARY KEY (hash, file_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS chunk_files_file_id ON chunk_files (file_id);
+        """)
+        self._db.commit()
+
+    def _put(self, file_id: str, manifest: Dict[str, Any], path: str, uploaded_at: float):
+        hashes = manifest.get("chunkHashes") or []
+        self._db.execute("DELETE FROM chunk_files WHERE file_id = ?", (file_id,))
+        self._db.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                file_id,
+                manifest.get("originalName", manifest.get("fileId", file_id)),
+                hashes[0] if hashes else "unknown",
+                manifest.get("totalChunks", 0),
+                manifest.get("size", 0),
+                uploaded_at,
+                path,
+                os.stat(path).st_mtime_ns,
+            ),
+        )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO chunk_files (hash, file_id) VALUES (?, ?)",
+            ((h, file_id) for h in hashes),
+        )
+
+    def add(self, file_id: str, manifest: Dict[str, Any], path: str):
+        with self._lock:
+            self._put(file_id, manifest, path, time.time())
+            self._db.commit()
+
+    def rebuild(self):
+        with self._lock:
+            known = {
+                row[0]: row[1]
+                for row in self._db.execute("SELECT file_id, mtime_ns FROM files")
+            }
+            present = set()
+            for entry in os.scandir(self.manifests_dir):
+                suffix = os.path.splitext(entry.name)[1]
+                if suffix not in MANIFEST_SUFFIXES:
+                    continue
+                file_id = entry.name[:-len(suffix)]
+                present.add(file_id)
+                st = entry.stat()
+                if known.get(file_id) == st.st_mtime_ns:
+                    continue
+                try:
+                    manifest = load_manifest_data(entry.path)
+                except Exception as e:
+                    print(f"Error reading manifest {entry.name}: {e}")
+                    continue
+                self._put(file_id, manifest, entry.path, st.st_mtime)
+            for file_id in set(known) - present:
+                self._db.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+                self._db.execute("DELETE FROM chunk_files WHERE file_id = ?", (file_id,))
+            self._db.commit()
+
+    @staticmethod
+    def _summary(row) -> Dict[str, Any]:
+        return {"fileId": row[0], "name": row[1], "hash": row[2], "chunks": row[3],
+                "size": row[4], "uploadedAt": row[5]}
+
+    def list(self, offset: int = 0, limit: int = 100, newest_first: bool = True) -> Tuple[int, List[Dict[str, Any]]]:
+        order = "DESC" if newest_first else "ASC"
+        with self._lock:
+            total = self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            rows = self._db.execute(
+                "SELECT file_id, name, first_hash, chunks, size, uploaded_at FROM files "
+                f"ORDER BY uploaded_at {order}, rowid {order} LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return total, [self._summary(r) for r in rows]
+
+    def find_chunk(self, chunk_hash: str) -> Optional[Dict[str, Any]]:
+        """The most recently uploaded file containing ``chunk_hash``, if any."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT f.file_id, f.name, f.first_hash, f.chunks, f.size, f.uploaded_at "
+                "FROM chunk_files c JOIN files f ON f.file_id = c.file_id "
+                "WHERE c.hash = ? ORDER BY f.uploaded_at DESC, f.rowid DESC LIMIT 1",
+                (chunk_hash,),
+            ).fetchone()
+        return None if row is None else self._summary(row)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,78 @@
+import os
+import struct
+from typing import Iterator, Optional, Tuple
+
+MAGIC = b"DFSCKPT1"
+
+
+class DownloadCheckpoint:
+    """Sidecar bitmap of the chunks already written to a partial download.
+
+    The file is ``MAGIC``, a 64-char content key identifying the manifest,
+    the chunk count, then one bit per chunk. It is replaced atomically on every save, and
+    callers save only after the data it vouches for has been synced, so a
+    crash can lose recent progress but never mark a chunk that is missing.
+    """
+
+    def __init__(self, path: str, key: str, total: int):
+        self.path = path
+        self.key = key.encode()
+        self.total = total
+        self.bits = bytearray((total + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def load(cls, path: str, key: str, total: int) -> "DownloadCheckpoint":
+        """The saved checkpoint if it belongs to ``key``, else an empty one."""
+        ckpt = cls(path, key, total)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return ckpt
+        header = ckpt.header()
+        if raw[:len(header)] == header and len(raw) == len(header) + len(ckpt.bits):
+            ckpt.bits[:] = raw[len(header):]
+            ckpt.count = sum(bin(b).count("1") for b in ckpt.bits)
+        return ckpt
+
+    def header(self) -> bytes:
+        return MAGIC + self.key + struct.pack("<Q", self.total)
+
+    def __contains__(self, index: int) -> bool:
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def mark(self, index: int):
+        if index not in self:
+            self.bits[index >> 3] |= 1 << (index & 7)
+            self.count += 1
+
+    def done(self) -> bool:
+        return self.count == self.total
+
+    def missing_runs(self) -> Iterator[Tuple[int, int]]:
+        """``(first, stop)`` index ranges of chunks not yet written."""
+        i = 0
+        while i < self.total:
+            if i in self:
+                i += 1
+                continue
+            first = i
+            while i < self.total and i not in self:
+                i += 1
+            yield first, i
+
+    def save(self, bits: Optional[bytes] = None):
+        """Write ``bits`` (default: the current bitmap) to disk."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.header() + bytes(self.bits if bits is None else bits))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
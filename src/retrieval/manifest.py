@@ -1,8 +1,160 @@
+import json
+import mmap
+import os
+import struct
+from itertools import islice
+from collections.abc import Sequence
+import numpy as np
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Binary manifest layout:
+#   MAGIC | digests (32 bytes each) | chunk sizes (uint32 LE each, optional)
+#   | shard digests (32 bytes each, optional) | metadata JSON
+#   | uint64 LE metadata length | END_MAGIC
+# Metadata holds every field except the arrays, so the file can be mapped
+# and read lazily regardless of the number of chunks.
+BINARY_MAGIC = b"DFSMAN1\n"
+BINARY_END = b"DFSMEND\n"
+BINARY_SUFFIX = ".dfsm"
+JSON_SUFFIX = ".json"
+DIGEST_SIZE = 32
+SIZE_FORMAT = "<I"
+SIZE_DTYPE = "<u4"  # SIZE_FORMAT as a NumPy dtype
+_FOOTER = struct.Struct("<Q")
+_WRITE_BATCH = 65536  # records encoded per write
+
+
+class PackedArray(Sequence):
+    """Read-only sequence over fixed-width records in a buffer, decoded on access."""
+
+    def __init__(self, buf, offset: int, count: int, itemsize: int, decode: Callable[[bytes], Any]):
+        self._buf = buf
+        self._offset = offset
+        self._count = count
+        self._itemsize = itemsize
+        self._decode = decode
+
+    def raw(self, index: int) -> bytes:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("index out of range")
+        start = self._offset + index * self._itemsize
+        return bytes(self._buf[start:start + self._itemsize])
+
+    def array(self, dtype: str) -> "np.ndarray":
+        """The raw records as a NumPy array of ``dtype`` sharing the buffer, no decoding."""
+        return np.frombuffer(self._buf, dtype=dtype, count=self._count, offset=self._offset)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        return self._decode(self.raw(index))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        end = self._offset + self._count * self._itemsize
+        for start in range(self._offset, end, self._itemsize):
+            yield self._decode(bytes(self._buf[start:start + self._itemsize]))
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, Sequence)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
 
 class Manifest(BaseModel):
     fileId: str
     totalChunks: int
     chunkHashes: List[str]
     chunkSize: int
+    size: Optional[int] = None
+    # Present for content-defined chunking, where chunks vary in size
+    chunking: Optional[Dict[str, Any]] = None
+    chunkSizes: Optional[List[int]] = None
+    # Merkle root over chunkHashes (src.common.merkle); the file's content ID
+    merkleRoot: Optional[str] = None
+    # Erasure-coded chunks ({"algorithm", "k", "m"}): chunk i is stored as the
+    # k + m shards shardHashes[i * (k + m):(i + 1) * (k + m)]
+    erasure: Optional[Dict[str, Any]] = None
+    shardHashes: Optional[List[str]] = None
+
+    @classmethod
+    def load(cls, path: str) -> "Manifest":
+        """Read a JSON or binary manifest; binary arrays stay memory-mapped."""
+        data = load_manifest_data(path)
+        if isinstance(data["chunkHashes"], PackedArray):
+            # Validation would copy every hash into a list
+            fields = {k: data.get(k) for k in cls.model_fields if k in data}
+            return cls.model_construct(**fields)
+        return cls(**data)
+
+
+def is_binary_manifest(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def load_manifest_data(path: str) -> Dict[str, Any]:
+    """Manifest fields as a dict; for binary manifests the arrays are PackedArrays."""
+    if not is_binary_manifest(path):
+        with open(path) as f:
+            return json.load(f)
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    tail = len(buf) - len(BINARY_END)
+    if tail < len(BINARY_MAGIC) + _FOOTER.size or buf[tail:] != BINARY_END:
+        raise ValueError(f"truncated binary manifest: {path}")
+    (meta_len,) = _FOOTER.unpack_from(buf, tail - _FOOTER.size)
+    meta_start = tail - _FOOTER.size - meta_len
+    data = json.loads(buf[meta_start:meta_start + meta_len])
+    count = data["totalChunks"]
+    offset = len(BINARY_MAGIC)
+    data["chunkHashes"] = PackedArray(buf, offset, count, DIGEST_SIZE, bytes.hex)
+    offset += count * DIGEST_SIZE
+    if data.pop("hasChunkSizes", False):
+        data["chunkSizes"] = PackedArray(
+            buf, offset, count, struct.calcsize(SIZE_FORMAT),
+            lambda b: struct.unpack(SIZE_FORMAT, b)[0],
+        )
+        offset += count * struct.calcsize(SIZE_FORMAT)
+    shard_count = data.pop("shardCount", None)
+    if shard_count is not None:
+        data["shardHashes"] = PackedArray(buf, offset, shard_count, DIGEST_SIZE, bytes.hex)
+    return data
+
+
+def _write_batched(f, items: Iterable, encode: Callable[[List[Any]], bytes]):
+    it = iter(items)
+    while True:
+        batch = list(islice(it, _WRITE_BATCH))
+        if not batch:
+            break
+        f.write(encode(batch))
+
+
+def save_binary_manifest(manifest: Dict[str, Any], path: str):
+    """Write ``manifest`` (the same dict the JSON format holds) in binary form."""
+    hashes: Iterable[str] = manifest["chunkHashes"]
+    sizes = manifest.get("chunkSizes")
+    shards = manifest.get("shardHashes")
+    meta = {k: v for k, v in manifest.items() if k not in ("chunkHashes", "chunkSizes", "shardHashes")}
+    meta["hasChunkSizes"] = sizes is not None
+    if shards is not None:
+        meta["shardCount"] = len(shards)
+    meta_bytes = json.dumps(meta).encode()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(BINARY_MAGIC)
+        _write_batched(f, hashes, lambda batch: bytes.fromhex("".join(batch)))
+        if sizes is not None:
+            _write_batched(f, sizes, lambda batch: struct.pack(f"<{len(batch)}I", *batch))
+        if shards is not None:
+            _write_batched(f, shards, lambda batch: bytes.fromhex("".join(batch)))
+        f.write(meta_bytes)
+        f.write(_FOOTER.pack(len(meta_bytes)))
+        f.write(BINARY_END)
+    os.replace(tmp, path)
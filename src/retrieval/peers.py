@@ -0,0 +1,101 @@
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Tuple
+
+EWMA_ALPHA = 0.2  # weight of the newest sample
+ERROR_PENALTY = 10.0  # a peer failing every request looks 11x slower
+LATENCY_WINDOW = 512  # recent successful fetches the hedge deadline is taken from
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT = 0.5  # seconds, until there are enough samples
+HEDGE_MIN = 0.02
+HEDGE_MAX = 2.0
+
+
+def peer_key(peer: Dict[str, Any]) -> Tuple[str, int]:
+    return peer["host"], peer["port"]
+
+
+@dataclass
+class PeerStats:
+    latency: float = 0.0  # EWMA of successful fetch time, seconds
+    error_rate: float = 0.0  # EWMA of failures (1) and successes (0)
+    samples: int = 0
+    inflight: int = 0
+
+    def score(self, untried_latency: float) -> float:
+        # Lower is better; queued work on a peer adds to its expected latency.
+        # A peer that has only ever failed is assumed as slow as a hedge can wait.
+        if self.samples:
+            latency = self.latency
+        else:
+            latency = HEDGE_MAX if self.error_rate else untried_latency
+        return latency * (1 + ERROR_PENALTY * self.error_rate) * (1 + self.inflight)
+
+
+class PeerTracker:
+    """Per-peer latency and error EWMAs used to rank replicas and time hedges."""
+
+    def __init__(self, alpha: float = EWMA_ALPHA, percentile: float = HEDGE_PERCENTILE):
+        self.alpha = alpha
+        self.percentile = percentile
+        self.peers: Dict[Tuple[str, int], PeerStats] = {}
+        self._recent: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._deadline = HEDGE_DEFAULT
+        self._stale = 0
+
+    def stats(self, peer: Dict[str, Any]) -> PeerStats:
+        key = peer_key(peer)
+        s = self.peers.get(key)
+        if s is None:
+            s = self.peers[key] = PeerStats()
+        return s
+
+    def started(self, peer: Dict[str, Any]) -> float:
+        self.stats(peer).inflight += 1
+        return time.monotonic()
+
+    def succeeded(self, peer: Dict[str, Any], started: float):
+        elapsed = time.monotonic() - started
+        s = self.stats(peer)
+        s.inflight -= 1
+        if s.samples:
+            s.latency += self.alpha * (elapsed - s.latency)
+        else:
+            s.latency = elapsed
+        s.error_rate -= self.alpha * s.error_rate
+        s.samples += 1
+        self._recent.append(elapsed)
+        self._stale += 1
+
+    def failed(self, peer: Dict[str, Any]):
+        s = self.stats(peer)
+        s.inflight -= 1
+        s.error_rate += self.alpha * (1 - s.error_rate)
+
+    def cancelled(self, peer: Dict[str, Any]):
+        self.stats(peer).inflight -= 1
+
+    def rank(self, peers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Peers best first; untried peers rank as fast so they get measured.
+
+        Peers are shuffled before the stable sort so equally good replicas
+        share the load.
+        """
+        known = [s.latency for s in self.peers.values() if s.samples]
+        untried = max(min(known), HEDGE_MIN) if known else HEDGE_MIN
+        shuffled = random.sample(peers, len(peers))
+        return sorted(shuffled, key=lambda p: self.stats(p).score(untried))
+
+    def hedge_deadline(self) -> float:
+        """Seconds to wait on a request before hedging it to another replica."""
+        if len(self._recent) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT
+        if self._stale >= 32 or self._stale == len(self._recent):
+            ordered = sorted(self._recent)
+            idx = min(int(self.percentile * len(ordered)), len(ordered) - 1)
+            self._deadline = min(max(ordered[idx], HEDGE_MIN), HEDGE_MAX)
+            self._stale = 0
+        return self._deadline
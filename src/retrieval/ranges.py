@@ -0,0 +1,90 @@
+"""Byte ranges for partial downloads (RFC 7233 ``Range`` headers)."""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .manifest import SIZE_DTYPE, Manifest, PackedArray
+
+MAX_RANGES = 16  # more ranges per request than this is refused
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class ChunkLayout:
+    """Maps byte offsets to chunk indices for fixed- or variable-size chunks.
+
+    Variable sizes are summed into one int64 array (8 bytes a chunk); a
+    binary manifest's mapped sizes are summed straight from the file, never
+    decoded into Python ints.
+    """
+
+    def __init__(self, manifest: Manifest):
+        self.total_chunks = manifest.totalChunks
+        self.chunk_size = manifest.chunkSize
+        sizes = manifest.chunkSizes
+        if sizes is not None:
+            raw = sizes.array(SIZE_DTYPE) if isinstance(sizes, PackedArray) else np.asarray(sizes, dtype=np.int64)
+            self._ends: Optional[np.ndarray] = np.cumsum(raw, dtype=np.int64)
+            self.size: Optional[int] = int(self._ends[-1]) if len(self._ends) else 0
+        else:
+            self._ends = None
+            self.size = manifest.size
+
+    def start_of(self, index: int) -> int:
+        if self._ends is None:
+            return index * self.chunk_size
+        return int(self._ends[index - 1]) if index else 0
+
+    def length_of(self, index: int) -> int:
+        end = self.start_of(index + 1) if index + 1 < self.total_chunks else self.size
+        return end - self.start_of(index)
+
+    def chunk_at(self, offset: int) -> int:
+        if self._ends is None:
+            return offset // self.chunk_size
+        return int(np.searchsorted(self._ends, offset, side="right"))
+
+    def span(self, start: int, end: int) -> Tuple[int, int]:
+        """First and last chunk holding bytes ``start..end`` (inclusive)."""
+        return self.chunk_at(start), self.chunk_at(end)
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Inclusive ``(start, end)`` pairs for a ``Range`` header.
+
+    Returns None when the header is malformed or not in bytes, in which case
+    it is ignored and the whole file is sent. Raises RangeNotSatisfiable when
+    no range overlaps the file or there are more than MAX_RANGES.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges: List[Tuple[int, int]] = []
+    for part in spec.split(","):
+        first, sep, last = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if not first:
+                # Suffix range: the last N bytes
+                n = int(last)
+                if n < 0:
+                    return None
+                if n == 0 or size == 0:
+                    continue
+                ranges.append((max(size - n, 0), size - 1))
+                continue
+            start = int(first)
+            end = int(last) if last else None
+        except ValueError:
+            return None
+        if start < 0 or (end is not None and end < start):
+            return None
+        end = size - 1 if end is None else end
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+    if not ranges or len(ranges) > MAX_RANGES:
+        raise RangeNotSatisfiable()
+    return ranges
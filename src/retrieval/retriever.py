@@ -1,53 +1,403 @@
 import asyncio
-import httpx
 import os
-from typing import List, Dict, Any
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, List, Dict, Any, Optional, Tuple
+from ..common.compression import ACCEPT_ENCODING, BY_HTTP_NAME, decompress
+from ..common.erasure import ReedSolomon
 from ..common.hashing import sha256_hex
-from ..dht.kademlia import find_value
+from ..common.merkle import merkle_root, verify_range
+from ..common.transport import get_transport
+from ..dht.kademlia import find_value, find_values
 from ..dht.routing import Contact
+from .cache import ChunkCache
+from .checkpoint import DownloadCheckpoint
 from .manifest import Manifest
+from .peers import PeerTracker
+from .ranges import ChunkLayout
+
+RESOLVE_BATCH = 512  # chunk hashes resolved per batched DHT lookup
+PEER_TIMEOUT = 5.0  # seconds before a single chunk request is abandoned
+MAX_HEDGES = 1  # extra replicas asked per chunk when the first is slow
+CHECKPOINT_CHUNKS = 64  # completed chunks between checkpoint saves
+CHECKPOINT_SECONDS = 2.0  # ...or this long, whichever comes first
+
+# Shared by every fetch in this process so rankings improve over time
+peer_tracker = PeerTracker()
+# Verified chunks kept by this process; consulted before any DHT lookup
+chunk_cache: Optional[ChunkCache] = None
+
+def get_chunk_cache() -> Optional[ChunkCache]:
+    return chunk_cache
+
+def set_chunk_cache(cache: Optional[ChunkCache]) -> Optional[ChunkCache]:
+    """Install the process-wide chunk cache (None disables it) and return the old one."""
+    global chunk_cache
+    previous, chunk_cache = chunk_cache, cache
+    return previous
+
+async def cache_get(cache: ChunkCache, chunk_hash: str) -> Optional[bytes]:
+    """Look a chunk up in memory inline; a disk read and its re-hash run in the default executor."""
+    data = cache.get_memory(chunk_hash)
+    if data is None and cache.disk_dir is None:
+        return cache.get_disk(chunk_hash)  # no disk tier: just records the miss
+    if data is None:
+        data = await asyncio.get_running_loop().run_in_executor(None, cache.get_disk, chunk_hash)
+    return data
+
+def cache_put(cache: ChunkCache, chunk_hash: str, data: bytes):
+    """Cache a verified chunk in memory now and write it to disk in the background."""
+    cache.put_memory(chunk_hash, data)
+    if cache.disk_dir is not None:
+        asyncio.get_running_loop().run_in_executor(None, cache.put_disk, chunk_hash, data)
 
 async def fetch_chunk_from_peer(peer: Dict[str, Any], chunk_hash: str, timeout=5.0) -> bytes:
-    url = f"http://{peer['host']}:{peer['port']}/chunks/{chunk_hash}"
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        return r.content
+    r = await get_transport().get(peer["host"], peer["port"], f"/chunks/{chunk_hash}", timeout=timeout,
+                                  headers={"Accept-Encoding": ACCEPT_ENCODING})
+    # httpx undoes "deflate" itself; codecs it does not know arrive as sent
+    codec = BY_HTTP_NAME.get(r.headers.get("content-encoding", "").strip().lower())
+    if codec is not None and codec.http_name != "deflate":
+        return decompress(codec.name, r.content)
+    return r.content
 
-async def retrieve_file(manifest: Manifest, bootstrap: List[Contact], out_dir="downloads", concurrency=6) -> str:
-    os.makedirs(out_dir, exist_ok=True)
-    buffers: List[bytes] = [b""] * manifest.totalChunks
+def erasure_codec(manifest: Manifest) -> Optional[ReedSolomon]:
+    if manifest.erasure is None:
+        return None
+    return ReedSolomon(manifest.erasure["k"], manifest.erasure["m"])
 
-    sem = asyncio.Semaphore(concurrency)
-    progress = 0
-
-    async def worker(i: int):
-        nonlocal progress
-        chunk_hash = manifest.chunkHashes[i]
-        async with sem:
-            value = await find_value(bootstrap, chunk_hash)
-            if not value or not isinstance(value, dict) or "peers" not in value or not value["peers"]:
+def shard_count(manifest: Manifest) -> int:
+    """Shards per chunk for erasure-coded files, 0 otherwise."""
+    if manifest.erasure is None:
+        return 0
+    return manifest.erasure["k"] + manifest.erasure["m"]
+
+async def resolve_chunks(manifest: Manifest, bootstrap: List[Contact], batch=RESOLVE_BATCH,
+                         first=0, stop: Optional[int] = None) -> AsyncIterator[Tuple[int, str, Optional[Any]]]:
+    """Yield ``(index, chunk_hash, dht_value)`` in order using batched lookups.
+
+    Covers chunks ``[first, stop)``, the whole file by default. The lookup
+    for the next batch runs while the current one is consumed.
+    """
+    stop = manifest.totalChunks if stop is None else stop
+    # Erasure-coded files are looked up shard by shard; their value is a list
+    n = shard_count(manifest)
+
+    def lookup(start: int):
+        keys: List[str] = []
+        for i in range(start, min(start + batch, stop)):
+            if chunk_cache is not None and manifest.chunkHashes[i] in chunk_cache:
+                continue  # served from the cache, no lookup needed
+            keys.extend(manifest.shardHashes[i * n:(i + 1) * n] if n else [manifest.chunkHashes[i]])
+        return asyncio.ensure_future(find_values(bootstrap, keys))
+
+    nxt = lookup(first) if first < stop else None
+    try:
+        for start in range(first, stop, batch):
+            values = await nxt
+            nxt = lookup(start + batch) if start + batch < stop else None
+            for i in range(start, min(start + batch, stop)):
+                chunk_hash = manifest.chunkHashes[i]
+                if n:
+                    yield i, chunk_hash, [values.get(h) for h in manifest.shardHashes[i * n:(i + 1) * n]]
+                else:
+                    yield i, chunk_hash, values.get(chunk_hash)
+    finally:
+        if nxt is not None:
+            nxt.cancel()
+
+def has_peers(value: Optional[Any]) -> bool:
+    """Whether a DHT value names at least one holder."""
+    return isinstance(value, dict) and bool(value.get("peers"))
+
+async def resolve_span(manifest: Manifest, bootstrap: List[Contact], first: int,
+                       stop: int) -> List[Tuple[int, str, Optional[Any]]]:
+    """Every ``resolve_chunks`` item for ``[first, stop)``, raising if a chunk cannot be fetched.
+
+    Lets a caller fail before committing to a response; pass the result to
+    ``stream_file(resolved=...)`` so the lookups are not repeated.
+    """
+    need = manifest.erasure["k"] if manifest.erasure is not None else 1
+    items = []
+    async for i, chunk_hash, value in resolve_chunks(manifest, bootstrap, first=first, stop=stop):
+        if chunk_cache is None or chunk_hash not in chunk_cache:
+            held = sum(map(has_peers, value)) if manifest.erasure is not None else has_peers(value)
+            if held < need:
                 raise RuntimeError(f"No peers for chunk {i}")
-            for p in value["peers"]:
+        items.append((i, chunk_hash, value))
+    return items
+
+async def replay(items) -> AsyncIterator:
+    for item in items:
+        yield item
+
+async def fetch_verified(peer: Dict[str, Any], chunk_hash: str) -> bytes:
+    """Fetch one copy and check its hash, recording the outcome in ``peer_tracker``."""
+    started = peer_tracker.started(peer)
+    try:
+        data = await fetch_chunk_from_peer(peer, chunk_hash, timeout=PEER_TIMEOUT)
+        if sha256_hex(data) != chunk_hash:
+            raise RuntimeError(f"Peer {peer['host']}:{peer['port']} returned a corrupt chunk")
+    except asyncio.CancelledError:
+        peer_tracker.cancelled(peer)
+        raise
+    except Exception:
+        peer_tracker.failed(peer)
+        raise
+    peer_tracker.succeeded(peer, started)
+    return data
+
+async def fetch_chunk(bootstrap: List[Contact], chunk_hash: str, index: int, value: Optional[Any] = None,
+                      use_cache: bool = True) -> bytes:
+    """Return the first copy of a chunk that verifies, looking up its peers unless given.
+
+    Replicas are tried fastest first. If a request outlives the hedge
+    deadline (a recent latency percentile) the next replica is asked too,
+    and the first good answer wins; failures move on immediately.
+    """
+    cache = chunk_cache if use_cache else None
+    if cache is not None:
+        data = await cache_get(cache, chunk_hash)
+        if data is not None:
+            return data
+    if value is None:
+        value = await find_value(bootstrap, chunk_hash)
+    if not has_peers(value):
+        raise RuntimeError(f"No peers for chunk {index}")
+    peers = deque(peer_tracker.rank(value["peers"]))
+    pending = {asyncio.ensure_future(fetch_verified(peers.popleft(), chunk_hash))}
+    hedges = 0
+    try:
+        while pending:
+            can_hedge = peers and hedges < MAX_HEDGES
+            done, pending = await asyncio.wait(
+                pending, timeout=peer_tracker.hedge_deadline() if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                hedges += 1
+                pending.add(asyncio.ensure_future(fetch_verified(peers.popleft(), chunk_hash)))
+                continue
+            for t in done:
+                if not t.exception():
+                    if cache is not None:
+                        cache_put(cache, chunk_hash, t.result())
+                    return t.result()
+                if peers:
+                    pending.add(asyncio.ensure_future(fetch_verified(peers.popleft(), chunk_hash)))
+    finally:
+        for t in pending:
+            t.cancel()
+    raise RuntimeError(f"All peers failed for chunk {index}")
+
+async def fetch_stripe(bootstrap: List[Contact], codec: ReedSolomon, chunk_hash: str, index: int,
+                       shard_hashes: List[str], values: List[Optional[Any]], length: int) -> bytes:
+    """Rebuild an erasure-coded chunk from the first ``k`` shards that verify.
+
+    The data shards are requested first, since they decode without any
+    arithmetic; each failure brings in the next parity shard. The decoded
+    chunk, not its shards, is what gets cached.
+    """
+    cache = chunk_cache
+    if cache is not None:
+        data = await cache_get(cache, chunk_hash)
+        if data is not None:
+            return data
+
+    async def fetch_shard(s: int) -> Tuple[int, bytes]:
+        return s, await fetch_chunk(bootstrap, shard_hashes[s], index, values[s], use_cache=False)
+
+    shards: Dict[int, bytes] = {}
+    pending = {asyncio.ensure_future(fetch_shard(s)) for s in range(codec.k)}
+    nxt = codec.k
+    try:
+        while pending and len(shards) < codec.k:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
                 try:
-                    data = await fetch_chunk_from_peer(p, chunk_hash)
-                    if sha256_hex(data) != chunk_hash:
-                        continue
-                    buffers[i] = data
-                    break
+                    s, data = t.result()
+                    shards[s] = data
                 except Exception:
-                    continue
-            else:
-                raise RuntimeError(f"All peers failed for chunk {i}")
-        progress += 1
-        pct = int(progress * 100 / manifest.totalChunks)
-        print(f"\rProgress: {pct}% ({progress}/{manifest.totalChunks})", end="", flush=True)
+                    if nxt < codec.n:
+                        pending.add(asyncio.ensure_future(fetch_shard(nxt)))
+                        nxt += 1
+    finally:
+        for t in pending:
+            t.cancel()
+    if len(shards) < codec.k:
+        raise RuntimeError(f"Only {len(shards)} of {codec.k} shards available for chunk {index}")
+    data = codec.decode(shards, length)
+    if sha256_hex(data) != chunk_hash:
+        raise RuntimeError(f"Chunk {index} failed verification after decoding")
+    if cache is not None:
+        cache_put(cache, chunk_hash, data)
+    return data
+
+def chunk_fetcher(manifest: Manifest, bootstrap: List[Contact]):
+    """``fetch(index, chunk_hash, value)`` for plain or erasure-coded manifests."""
+    codec = erasure_codec(manifest)
+    if codec is None:
+        return lambda i, chunk_hash, value: fetch_chunk(bootstrap, chunk_hash, i, value)
+    layout = ChunkLayout(manifest)
+    n = codec.n
+
+    def fetch(i: int, chunk_hash: str, values: List[Optional[Any]]):
+        shard_hashes = manifest.shardHashes[i * n:(i + 1) * n]
+        return fetch_stripe(bootstrap, codec, chunk_hash, i, shard_hashes, values, layout.length_of(i))
+    return fetch
+
+def verify_manifest(manifest: Manifest, content_id: Optional[str] = None):
+    """Raise unless the manifest's chunk list hashes to its root (and to ``content_id`` if given)."""
+    root = merkle_root(manifest.chunkHashes)
+    expected = content_id or manifest.merkleRoot
+    if expected is None:
+        raise RuntimeError("Manifest has no merkleRoot to verify against")
+    if root != expected:
+        raise RuntimeError(f"Manifest root {root} does not match {expected}")
+
+async def fetch_range_proof(host: str, port: int, file_id: str, start: int, end: int) -> Dict[str, Any]:
+    r = await get_transport().get(host, port, f"/api/proof/{file_id}", params={"start": start, "end": end}, timeout=30.0)
+    return r.json()
+
+async def fetch_verified_range(bootstrap: List[Contact], root: str, total_chunks: int, start: int,
+                               chunk_hashes: List[str], proof: List[str]) -> List[bytes]:
+    """Fetch chunks ``start..`` after checking their hashes against ``root``.
+
+    Only the requested hashes and O(log n) proof hashes are needed, never
+    the file's full hash list.
+    """
+    if not verify_range(root, total_chunks, start, chunk_hashes, proof):
+        raise RuntimeError(f"Proof for chunks [{start}, {start + len(chunk_hashes)}) does not match root {root}")
+    values = await find_values(bootstrap, list(chunk_hashes))
+    return list(await asyncio.gather(*(
+        fetch_chunk(bootstrap, h, start + i, values.get(h)) for i, h in enumerate(chunk_hashes)
+    )))
+
+async def retrieve_range(source: Contact, file_id: str, root: str, total_chunks: int,
+                         start: int, end: int, bootstrap: List[Contact]) -> List[bytes]:
+    """Chunks ``[start, end)`` of the file whose content ID is ``root``.
+
+    The hash list and proof come from ``source`` (any gateway holding the
+    manifest) and are trusted only once they verify against ``root``.
+    """
+    proof = await fetch_range_proof(source.host, source.port, file_id, start, end)
+    return await fetch_verified_range(bootstrap, root, total_chunks, start, proof["chunkHashes"], proof["proof"])
+
+async def stream_file(manifest: Manifest, bootstrap: List[Contact], window=6,
+                      first=0, stop: Optional[int] = None, resolved=None) -> AsyncIterator[bytes]:
+    """Yield verified chunks in file order, fetching at most `window` chunks ahead.
 
-    await asyncio.gather(*(worker(i) for i in range(manifest.totalChunks)))
-    print()
+    Memory stays at O(window * chunkSize) and nothing is written to disk.
+    ``first``/``stop`` restrict the stream to a chunk index range;
+    ``resolved`` (from ``resolve_span``) supplies its lookups instead.
+    """
+    pending: Deque[asyncio.Task] = deque()
+    fetch = chunk_fetcher(manifest, bootstrap)
+    if resolved is None:
+        resolved = resolve_chunks(manifest, bootstrap, first=first, stop=stop)
+    else:
+        resolved = replay(resolved)
+    try:
+        async for i, chunk_hash, value in resolved:
+            pending.append(asyncio.ensure_future(fetch(i, chunk_hash, value)))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for t in pending:
+            t.cancel()
+        await resolved.aclose()
 
+async def stream_byte_range(manifest: Manifest, bootstrap: List[Contact], layout: ChunkLayout,
+                            start: int, end: int, window=6, resolved=None) -> AsyncIterator[bytes]:
+    """Yield bytes ``start..end`` (inclusive), fetching only the chunks that overlap them."""
+    first, last = layout.span(start, end)
+    offset = layout.start_of(first)
+    chunks = stream_file(manifest, bootstrap, window, first=first, stop=last + 1, resolved=resolved)
+    try:
+        async for data in chunks:
+            lo = max(start - offset, 0)
+            hi = min(end + 1 - offset, len(data))
+            offset += len(data)
+            yield data[lo:hi]
+    finally:
+        await chunks.aclose()
+
+def preallocate(fd: int, size: int):
+    """Reserve ``size`` bytes so a full disk fails up front, not mid-download."""
+    os.ftruncate(fd, size)
+    if size and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass  # e.g. unsupported by the filesystem; the sparse file still works
+
+async def retrieve_file(manifest: Manifest, bootstrap: List[Contact], out_dir="downloads", concurrency=6) -> str:
+    """Download to ``out_dir/<fileId>``, writing each chunk at its offset as it arrives.
+
+    Data goes to a preallocated ``.part`` file with a ``.ckpt`` sidecar
+    recording finished chunks; rerunning after a crash fetches only the
+    missing ones. At most ``concurrency`` chunks are held in memory.
+    """
+    os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, manifest.fileId)
-    with open(out_path, "wb") as f:
-        for b in buffers:
-            f.write(b)
+    part_path = out_path + ".part"
+    layout = ChunkLayout(manifest)
+    key = manifest.merkleRoot or merkle_root(manifest.chunkHashes)
+    if os.path.exists(part_path):
+        ckpt = DownloadCheckpoint.load(out_path + ".ckpt", key, manifest.totalChunks)
+    else:
+        ckpt = DownloadCheckpoint(out_path + ".ckpt", key, manifest.totalChunks)
+
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(concurrency)
+    fetch = chunk_fetcher(manifest, bootstrap)
+    unsaved = 0
+    last_save = time.monotonic()
+
+    async def save_checkpoint():
+        nonlocal unsaved, last_save
+        # Snapshot first: chunks finishing during the fsync are not synced yet
+        bits, saving = bytes(ckpt.bits), unsaved
+        await loop.run_in_executor(None, os.fsync, fd)
+        ckpt.save(bits)
+        unsaved, last_save = unsaved - saving, time.monotonic()
+
+    async def worker(i: int, chunk_hash: str, value: Optional[Any]):
+        nonlocal unsaved
+        try:
+            data = await fetch(i, chunk_hash, value)
+        finally:
+            sem.release()
+        # A page-cache write; done inline so no write can outlive the fd
+        os.pwrite(fd, data, layout.start_of(i))
+        ckpt.mark(i)
+        unsaved += 1
+        pct = int(ckpt.count * 100 / manifest.totalChunks)
+        print(f"\rProgress: {pct}% ({ckpt.count}/{manifest.totalChunks})", end="", flush=True)
+
+    tasks: List[asyncio.Task] = []
+    try:
+        if layout.size is not None and os.fstat(fd).st_size != layout.size:
+            await loop.run_in_executor(None, preallocate, fd, layout.size)
+        for first, stop in list(ckpt.missing_runs()):
+            async for i, chunk_hash, value in resolve_chunks(manifest, bootstrap, first=first, stop=stop):
+                await sem.acquire()
+                tasks.append(asyncio.ensure_future(worker(i, chunk_hash, value)))
+                if unsaved >= CHECKPOINT_CHUNKS or (unsaved and time.monotonic() - last_save >= CHECKPOINT_SECONDS):
+                    await save_checkpoint()
+        await asyncio.gather(*tasks)
+        print()
+        await loop.run_in_executor(None, os.fsync, fd)
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if not ckpt.done() and unsaved:
+            await save_checkpoint()
+        os.close(fd)
+
+    os.replace(part_path, out_path)
+    ckpt.remove()
     return out_path
@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, NamedTuple, Optional, Sequence
+
+from ..common.compression import CODECS, DEFAULT_CODECS, compress, decompress
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+PACK_THRESHOLD = 64 * 1024  # chunks smaller than this go into packfiles
+PACK_MAX_BYTES = 256 * 1024 * 1024  # roll over to a new packfile past this size
+
+
+class ChunkLocation(NamedTuple):
+    path: str
+    offset: int
+    length: int
+    packed: bool
+    codec: Optional[str] = None  # how the stored bytes are compressed, None if raw
+
+
+class ChunkStore:
+    """Content-addressed chunk storage for one node.
+
+    Layout under ``root``::
+
+        ab/cd/<hash>                  loose chunk, sharded by hash prefix
+        ab/cd/<hash>.<codec>          loose chunk stored compressed
+        packs/pack-000001.pack        small chunks appended back to back
+        packs/index.sqlite3           hash -> (pack, offset, length)
+
+    Chunks smaller than ``pack_threshold`` are packed so millions of small
+    chunks do not cost millions of inodes; every read is one index lookup
+    plus a single positioned read. Chunks stored flat as ``<root>/<hash>``
+    by earlier versions are still found.
+
+    Each chunk is compressed with the best of ``codecs`` when that pays off
+    (see ``compression.compress``); the codec is recorded in the file name
+    or the pack index. ``read`` returns the stored bytes, ``get`` the
+    original ones, and the hash always names the original bytes.
+    """
+
+    def __init__(self, root: str, pack_threshold: int = PACK_THRESHOLD, pack_max_bytes: int = PACK_MAX_BYTES,
+                 codecs: Sequence[str] = DEFAULT_CODECS):
+        self.root = root
+        self.codecs = tuple(codecs)
+        self.pack_threshold = pack_threshold
+        self.pack_max_bytes = pack_max_bytes
+        self.packs_dir = os.path.join(root, "packs")
+        os.makedirs(self.packs_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(self.packs_dir, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS packed "
+            "(hash TEXT PRIMARY KEY, pack INTEGER NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL) "
+            "WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(packed)")}
+        if "codec" not in columns:
+            self._db.execute("ALTER TABLE packed ADD COLUMN codec TEXT")
+        self._db.commit()
+        row = self._db.execute("SELECT MAX(pack) FROM packed").fetchone()
+        self._pack_id = row[0] or 1
+
+    def pack_path(self, pack_id: int) -> str:
+        return os.path.join(self.packs_dir, f"pack-{pack_id:06d}.pack")
+
+    def loose_path(self, chunk_hash: str, codec: Optional[str] = None) -> str:
+        p = os.path.join(self.root, chunk_hash[:2], chunk_hash[2:4], chunk_hash)
+        return p if codec is None else f"{p}.{codec}"
+
+    def locate(self, chunk_hash: str) -> Optional[ChunkLocation]:
+        for codec in (None, *CODECS):
+            p = self.loose_path(chunk_hash, codec)
+            if os.path.isfile(p):
+                return ChunkLocation(p, 0, os.path.getsize(p), False, codec)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT pack, offset, length, codec FROM packed WHERE hash = ?", (chunk_hash,)
+            ).fetchone()
+        if row is not None:
+            return ChunkLocation(self.pack_path(row[0]), row[1], row[2], True, row[3])
+        legacy = os.path.join(self.root, chunk_hash)
+        if os.path.isfile(legacy):
+            return ChunkLocation(legacy, 0, os.path.getsize(legacy), False)
+        return None
+
+    def has(self, chunk_hash: str) -> bool:
+        return self.locate(chunk_hash) is not None
+
+    def read(self, loc: ChunkLocation) -> bytes:
+        """The bytes as stored, still compressed with ``loc.codec``."""
+        with open(loc.path, "rb") as f:
+            f.seek(loc.offset)
+            return f.read(loc.length)
+
+    def get(self, chunk_hash: str) -> Optional[bytes]:
+        loc = self.locate(chunk_hash)
+        return None if loc is None else decompress(loc.codec, self.read(loc))
+
+    def put(self, chunk_hash: str, data: bytes, codecs: Optional[Sequence[str]] = None):
+        """Store ``data`` under ``chunk_hash``, compressed with the best of ``codecs``
+        (default: the store's) if any of them helps."""
+        if self.has(chunk_hash):
+            return
+        codec, data = compress(data, self.codecs if codecs is None else codecs)
+        if len(data) >= self.pack_threshold:
+            p = self.loose_path(chunk_hash, codec)
+            os.makedirs(os.path.dirname(p), exist_ok=True)
+            tmp = f"{p}.{os.getpid()}.{threading.get_ident()}.tmp"  # gateway and node share the directory
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, p)
+            return
+        with self._lock:
+            path = self.pack_path(self._pack_id)
+            if os.path.exists(path) and os.path.getsize(path) + len(data) > self.pack_max_bytes:
+                self._pack_id += 1
+                path = self.pack_path(self._pack_id)
+            with open(path, "ab") as f:
+                # The gateway and the node may both append to the same pack
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                offset = f.seek(0, os.SEEK_END)
+                f.write(data)
+                f.flush()
+            # The index entry is only written once the bytes are in the pack
+            self._db.execute(
+                "INSERT OR IGNORE INTO packed (hash, pack, offset, length, codec) VALUES (?, ?, ?, ?, ?)",
+                (chunk_hash, self._pack_id, offset, len(data), codec),
+            )
+            self._db.commit()
+
+    def iter_hashes(self) -> Iterator[str]:
+        with self._lock:
+            packed = [row[0] for row in self._db.execute("SELECT hash FROM packed")]
+        yield from packed
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                if len(entry.name) == 64:
+                    yield entry.name
+                continue
+            if len(entry.name) != 2:
+                continue
+            for sub in os.scandir(entry.path):
+                if sub.is_dir():
+                    for f in os.scandir(sub.path):
+                        if not f.name.endswith(".tmp"):
+                            yield f.name.partition(".")[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_stores: Dict[str, ChunkStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(root: str) -> ChunkStore:
+    """Return the shared ChunkStore for ``root``, opening it on first use."""
+    key = os.path.abspath(root)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ChunkStore(root)
+        return store
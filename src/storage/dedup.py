@@ -0,0 +1,83 @@
+import math
+import os
+import sqlite3
+import threading
+from typing import Iterable
+
+
+class BloomFilter:
+    """Bloom filter over SHA-256 hex digests.
+
+    The digests are already uniformly random, so bit positions are derived
+    from the digest itself by double hashing instead of re-hashing it.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.num_bits = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, hex_digest: str):
+        h1 = int(hex_digest[:16], 16)
+        h2 = int(hex_digest[16:32], 16) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, hex_digest: str):
+        for p in self._positions(hex_digest):
+            self._bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, hex_digest: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(hex_digest))
+
+
+class DedupIndex:
+    """Set of chunk hashes already held by the storage nodes.
+
+    Lookups hit an in-memory Bloom filter first, so the common case of a new
+    chunk never touches disk; possible hits are confirmed against the
+    persistent SQLite set. The filter is rebuilt from that set on startup,
+    sized for at least twice the number of known chunks.
+    """
+
+    def __init__(self, path: str, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS chunks (hash TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._db.commit()
+        count = self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        self._count = count
+        self.bloom = BloomFilter(max(capacity, 2 * count), error_rate)
+        for (h,) in self._db.execute("SELECT hash FROM chunks"):
+            self.bloom.add(h)
+
+    def __contains__(self, chunk_hash: str) -> bool:
+        if chunk_hash not in self.bloom:
+            return False
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM chunks WHERE hash = ?", (chunk_hash,)).fetchone() is not None
+
+    def add_many(self, hashes: Iterable[str]):
+        hashes = list(hashes)
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO chunks (hash) VALUES (?)", ((h,) for h in hashes))
+            self._db.commit()
+            self._count += self._db.total_changes - before
+        for h in hashes:
+            self.bloom.add(h)
+
+    def add(self, chunk_hash: str):
+        self.add_many([chunk_hash])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from ..common.compression import get_codec
+from .chunk_store import ChunkLocation
+
+HASH_BLOCK = 1024 * 1024
+
+
+def hash_region(path: str, offset: int, length: int, codec: Optional[str] = None) -> str:
+    """SHA-256 of the region, decompressed first when it is stored with ``codec``."""
+    h = hashlib.sha256()
+    d = get_codec(codec).decompressor() if codec is not None else None
+    with open(path, "rb") as f:
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(HASH_BLOCK, remaining))
+            if not block:
+                break
+            h.update(block if d is None else d.decompress(block))
+            remaining -= len(block)
+    return h.hexdigest()
+
+
+class VerifyCache:
+    """Remembers which stored chunks have already been hashed and found intact.
+
+    Loose chunks are keyed on (inode, mtime, size), so any rewrite of the file
+    forces a re-hash. Packed chunks are keyed on (pack inode, offset, length)
+    because packs only ever grow. ``scrub`` re-hashes cached entries in the
+    background to catch corruption that does not touch file metadata.
+    """
+
+    def __init__(self, max_entries: int = 1_000_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[ChunkLocation, tuple]]" = OrderedDict()
+
+    @staticmethod
+    def _key(loc: ChunkLocation, st: os.stat_result) -> tuple:
+        if loc.packed:
+            return st.st_ino, loc.offset, loc.length
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def check(self, chunk_hash: str, loc: ChunkLocation) -> Optional[os.stat_result]:
+        """Stat the chunk and return it if its bytes hash to ``chunk_hash``, else None."""
+        try:
+            st = os.stat(loc.path)
+        except FileNotFoundError:
+            return None
+        key = self._key(loc, st)
+        with self._lock:
+            cached = self._entries.get(chunk_hash)
+            if cached is not None and cached[1] == key:
+                self._entries.move_to_end(chunk_hash)
+                return st
+        if hash_region(loc.path, loc.offset, loc.length, loc.codec) != chunk_hash:
+            self.invalidate(chunk_hash)
+            return None
+        with self._lock:
+            self._entries[chunk_hash] = (loc, key)
+            self._entries.move_to_end(chunk_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return st
+
+    def invalidate(self, chunk_hash: str):
+        with self._lock:
+            self._entries.pop(chunk_hash, None)
+
+    def scrub(self, limit: int = 100) -> List[str]:
+        """Re-hash up to ``limit`` of the least recently checked chunks; return the corrupted ones."""
+        with self._lock:
+            batch = list(self._entries.items())[:limit]
+            for chunk_hash, _ in batch:
+                self._entries.move_to_end(chunk_hash)
+        bad = []
+        for chunk_hash, (loc, _) in batch:
+            try:
+                ok = hash_region(loc.path, loc.offset, loc.length, loc.codec) == chunk_hash
+            except OSError:
+                ok = False
+            if not ok:
+                self.invalidate(chunk_hash)
+                bad.append(chunk_hash)
+        return bad
+
+    def __len__(self) -> int:
+        return len(self._entries)
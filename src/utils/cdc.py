@@ -0,0 +1,184 @@
+# src/utils/cdc.py
+"""FastCDC-style content-defined chunking.
+
+Cut points come from a 32-bit gear hash over the trailing 32 bytes, so an
+edit only moves the boundaries next to it and the rest of the file keeps
+its chunk hashes. Normalized chunking uses a stricter mask before the
+average size and a looser one after it, which keeps sizes close to the
+average. With NumPy the hash of each block is computed in five
+vectorised passes and only the positions that could become cut points are
+kept; without it a pure-Python loop gives identical cuts.
+"""
+import hashlib
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HASH_BITS = 32
+HASH_MASK = (1 << HASH_BITS) - 1
+WINDOW = HASH_BITS  # bytes that influence the hash at a position
+
+GEAR = [int.from_bytes(hashlib.sha256(b"gear" + bytes([i])).digest()[:4], "little") for i in range(256)]
+_GEAR_NP = np.array(GEAR, dtype=np.uint32) if np is not None else None
+_SHIFTS = np.arange(1, WINDOW, dtype=np.uint32) if np is not None else None
+_BLOCK = 64 * 1024  # bytes hashed per pass in gear_hashes
+
+
+def _high_mask(bits: int) -> int:
+    # High bits of a gear hash depend on the whole window, low bits only on the last few bytes
+    bits = min(bits, HASH_BITS)
+    return ((1 << bits) - 1) << (HASH_BITS - bits)
+
+
+def gear_hashes(data, prev: int = 0):
+    """Gear hash at every position of ``data`` as a NumPy uint32 array.
+
+    h[i] = sum(GEAR[data[i - j]] << j for j < 32) mod 2**32, built by doubling
+    the window width: 1, 2, 4, ... 32 bytes, in place and ``_BLOCK`` bytes at
+    a time so the passes run in cache. The hash rolls as
+    h[i] = 2 * h[i - 1] + GEAR[data[i]], so ``prev``, the hash just before
+    ``data``, carries it from one block (or call) to the next.
+    """
+    n = len(data)
+    raw = np.frombuffer(data, dtype=np.uint8)
+    h = np.empty(n, dtype=np.uint32)
+    scratch = np.empty(min(n, _BLOCK), dtype=np.uint32)
+    idx = np.empty(min(n, _BLOCK), dtype=np.intp)
+    for lo in range(0, n, _BLOCK):
+        b = h[lo:lo + _BLOCK]
+        # take() would widen uint8 indices itself, into a new array every call
+        i = idx[:len(b)]
+        np.copyto(i, raw[lo:lo + _BLOCK])
+        np.take(_GEAR_NP, i, out=b, mode="clip")
+        width = 1
+        while width < min(WINDOW, len(b)):
+            t = scratch[:len(b) - width]
+            np.left_shift(b[:-width], np.uint32(width), out=t)
+            np.add(b[width:], t, out=b[width:])
+            width *= 2
+        if prev:
+            # Earlier bytes still reach the first WINDOW - 1 positions
+            k = min(len(b), WINDOW - 1)
+            b[:k] += np.uint32(prev) << _SHIFTS[:k]
+        prev = int(b[-1])
+    return h
+
+
+class FastCDCChunker:
+    """Streaming content-defined chunker with min/avg/max chunk sizes.
+
+    Feed it arbitrary blocks; it returns every chunk whose boundary is
+    settled and keeps at most ``max_size`` bytes (plus the last block)
+    buffered until ``finish``.
+    """
+
+    name = "fastcdc"
+
+    def __init__(self, min_size: int, avg_size: int, max_size: int):
+        if not WINDOW <= min_size <= avg_size <= max_size:
+            raise ValueError(f"chunk sizes must satisfy {WINDOW} <= min <= avg <= max")
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        bits = max(avg_size.bit_length() - 1, 3)
+        self.mask_s = _high_mask(bits + 2)
+        self.mask_l = _high_mask(bits - 2)
+        self._buf = bytearray()
+        self._last = 0  # gear hash at the last byte fed
+        # Offsets in _buf of the cut candidates (see _hits), extended as blocks arrive
+        self._hits_l = np.empty(0, dtype=np.intp) if np is not None else None
+        self._hits_s = self._hits_l
+
+    def params(self) -> Dict[str, object]:
+        return {"algorithm": self.name, "minSize": self.min_size,
+                "avgSize": self.avg_size, "maxSize": self.max_size}
+
+    def _next_cut_py(self, data, s: int, n: int) -> int:
+        lo, mid, hi = s + self.min_size, min(s + self.avg_size, n), min(s + self.max_size, n)
+        h = 0
+        for j in range(lo - WINDOW + 1, lo):
+            h = ((h << 1) + GEAR[data[j]]) & HASH_MASK
+        i = lo
+        while i < mid:
+            h = ((h << 1) + GEAR[data[i]]) & HASH_MASK
+            if not h & self.mask_s:
+                return i + 1
+            i += 1
+        while i < hi:
+            h = ((h << 1) + GEAR[data[i]]) & HASH_MASK
+            if not h & self.mask_l:
+                return i + 1
+            i += 1
+        return hi
+
+    def _hits(self, h) -> Tuple["np.ndarray", "np.ndarray"]:
+        # Positions whose hash passes mask_l, then those also passing mask_s;
+        # mask_s is a superset of mask_l, so its hits are a subset
+        hits_l = np.flatnonzero((h & np.uint32(self.mask_l)) == 0)
+        return hits_l, hits_l[(h[hits_l] & np.uint32(self.mask_s)) == 0]
+
+    def cut_points(self, data: bytes, final: bool, hits=None) -> List[int]:
+        """End offsets of the chunks in ``data`` that can be emitted now.
+
+        ``hits`` are the candidate positions from ``_hits`` if already known.
+        """
+        n = len(data)
+        cuts: List[int] = []
+        if np is not None and hits is None and n - self.min_size > 0 and (final or n >= self.max_size):
+            hits = self._hits(gear_hashes(data))
+        s = 0
+        while s < n:
+            if n - s < self.max_size and not final:
+                break
+            if n - s <= self.min_size:
+                cuts.append(n)
+                break
+            if np is None:
+                cut = self._next_cut_py(data, s, n)
+            else:
+                hits_l, hits_s = hits
+                lo, mid, hi = s + self.min_size, min(s + self.avg_size, n), min(s + self.max_size, n)
+                k = np.searchsorted(hits_s, lo)
+                if k < len(hits_s) and hits_s[k] < mid:
+                    cut = int(hits_s[k]) + 1
+                else:
+                    k = np.searchsorted(hits_l, mid)
+                    cut = int(hits_l[k]) + 1 if k < len(hits_l) and hits_l[k] < hi else hi
+            cuts.append(cut)
+            s = cut
+        return cuts
+
+    def _emit(self, final: bool) -> List[bytes]:
+        hits = (self._hits_l, self._hits_s) if np is not None else None
+        cuts = self.cut_points(self._buf, final, hits)
+        if not cuts:
+            return []
+        with memoryview(self._buf) as view:
+            chunks = [bytes(view[a:b]) for a, b in zip([0] + cuts, cuts)]
+        start = cuts[-1]
+        del self._buf[:start]
+        if np is not None:
+            self._hits_l = self._hits_l[np.searchsorted(self._hits_l, start):] - start
+            self._hits_s = self._hits_s[np.searchsorted(self._hits_s, start):] - start
+        return chunks
+
+    def feed(self, block: bytes) -> List[bytes]:
+        if np is not None and len(block):
+            # Only the new bytes are hashed and scanned; candidates are kept as
+            # buffer offsets so settled cut points are never searched for again
+            h = gear_hashes(block, self._last)
+            self._last = int(h[-1])
+            hits_l, hits_s = self._hits(h)
+            base = len(self._buf)
+            self._hits_l = np.concatenate((self._hits_l, hits_l + base))
+            self._hits_s = np.concatenate((self._hits_s, hits_s + base))
+        self._buf += block
+        if len(self._buf) < self.max_size:
+            return []
+        return self._emit(final=False)
+
+    def finish(self) -> List[bytes]:
+        return self._emit(final=True)
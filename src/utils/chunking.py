@@ -1,19 +1,74 @@
 # src/utils/chunking.py
 import os, hashlib, json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List
+from .cdc import FastCDCChunker
+from .parallel import default_workers, ordered_map
 
-def chunk_file(file_path, chunk_size=1024*1024):
-    os.makedirs('chunks', exist_ok=True)
-    chunks = []
+PROCESS_POOL_THRESHOLD = 4 * 1024**3  # files at least this large are hashed in processes
+
+class FixedChunker:
+    """Cuts a stream into fixed-size chunks (the original chunking scheme)."""
+
+    name = "fixed"
+
+    def __init__(self, size: int):
+        self.size = size
+        self._buf = bytearray()
+
+    def params(self) -> Dict[str, object]:
+        return {"algorithm": self.name, "size": self.size}
+
+    def feed(self, block: bytes) -> List[bytes]:
+        self._buf += block
+        n = len(self._buf) - len(self._buf) % self.size
+        chunks = [bytes(self._buf[i:i + self.size]) for i in range(0, n, self.size)]
+        del self._buf[:n]
+        return chunks
+
+    def finish(self) -> List[bytes]:
+        chunks = [bytes(self._buf)] if self._buf else []
+        self._buf.clear()
+        return chunks
+
+CHUNKERS = ("fixed", "fastcdc")
+
+def make_chunker(algorithm: str = "fixed", chunk_size: int = 1024*1024):
+    """Chunker by name; for fastcdc ``chunk_size`` is the average, with min/max at 1/4 and 4x."""
+    if algorithm == "fixed":
+        return FixedChunker(chunk_size)
+    if algorithm == "fastcdc":
+        return FastCDCChunker(chunk_size // 4, chunk_size, chunk_size * 4)
+    raise ValueError(f"unknown chunking algorithm: {algorithm}")
+
+def _hash_and_write(chunk):
+    h = hashlib.sha256(chunk).hexdigest()
+    with open(os.path.join('chunks', f'{h}.chunk'), 'wb') as cf:
+        cf.write(chunk)
+    return h
+
+def _read_chunks(file_path, chunk_size, chunker):
     with open(file_path, 'rb') as f:
         while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
+            block = f.read(chunk_size)
+            if not block:
                 break
-            h = hashlib.sha256(chunk).hexdigest()
-            with open(os.path.join('chunks', f'{h}.chunk'), 'wb') as cf:
-                cf.write(chunk)
-            chunks.append(h)
-    return chunks
+            yield from chunker.feed(block)
+    yield from chunker.finish()
+
+def chunk_file(file_path, chunk_size=1024*1024, chunking="fixed", workers=None):
+    """Split a file into ``chunks/<sha256>.chunk`` files and return their hashes in order.
+
+    Hashing and writing run on ``workers`` threads (a process pool for files
+    of PROCESS_POOL_THRESHOLD bytes or more) with a bounded number of chunks
+    in flight.
+    """
+    os.makedirs('chunks', exist_ok=True)
+    chunker = make_chunker(chunking, chunk_size)
+    workers = workers or default_workers()
+    pool_cls = ProcessPoolExecutor if os.path.getsize(file_path) >= PROCESS_POOL_THRESHOLD else ThreadPoolExecutor
+    with pool_cls(max_workers=workers) as pool:
+        return list(ordered_map(_hash_and_write, _read_chunks(file_path, chunk_size, chunker), pool, 2 * workers))
 
 def make_manifest(filename, chunk_hashes):
     return {'filename': filename, 'chunks': chunk_hashes}
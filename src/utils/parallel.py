@@ -0,0 +1,51 @@
+# src/utils/parallel.py
+"""Bounded, order-preserving fan-out of CPU/IO work to executor pools.
+
+hashlib and file writes release the GIL on large buffers, so a thread pool
+is enough to spread chunk hashing across cores; a process pool can be
+passed in for inputs large enough to amortise pickling the chunks.
+"""
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import Executor
+from typing import AsyncIterable, AsyncIterator, Callable, Deque, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def ordered_map(fn: Callable[[T], R], items: Iterable[T], executor: Executor, window: int) -> Iterator[R]:
+    """``executor.map`` with at most ``window`` items in flight; results keep input order."""
+    pending: Deque = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for f in pending:
+            f.cancel()
+
+
+async def ordered_amap(fn: Callable[[T], R], items: AsyncIterable[T], executor: Executor,
+                       window: int) -> AsyncIterator[R]:
+    """Async counterpart of ``ordered_map``; the event loop only waits, never computes."""
+    loop = asyncio.get_running_loop()
+    pending: Deque[asyncio.Future] = deque()
+    try:
+        async for item in items:
+            pending.append(loop.run_in_executor(executor, fn, item))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for f in pending:
+            f.cancel()
@@ -0,0 +1,311 @@
+# tests/test_api.py
+import asyncio
+import os
+import shutil
+
+import httpx
+import pytest
+
+import api_server
+from src.common import transport
+from src.common.hashing import sha256_hex
+from src.common.transport import Transport
+from src.dht.routing import Contact
+from src.dht.server import DHTNode
+from src.retrieval import retriever
+from src.storage import chunk_store
+from src.storage.chunk_store import open_store
+
+GATEWAY_PORT = 8080
+
+
+class Network:
+    """The gateway's DHT and storage nodes, served in-process over ASGI."""
+
+    def __init__(self):
+        self.nodes = {}
+        self.apps = {GATEWAY_PORT: api_server.app}
+        for port in [api_server.DHT_PORT] + api_server.STORAGE_NODES:
+            self.start(port)
+
+    def start(self, port):
+        self.nodes[port] = DHTNode("127.0.0.1", port, [])
+        self.apps[port] = self.nodes[port].app()
+
+    def route(self, host, port):
+        # Looked up per request, so a restarted node is reached through the same pooled client
+        async def app(scope, receive, send):
+            await self.apps[port](scope, receive, send)
+        return httpx.ASGITransport(app=app)
+
+    def wipe(self, port):
+        """Lose everything a storage node held and bring it back empty."""
+        self.nodes[port].close()
+        root = os.path.abspath(f"./storage/{port}")
+        chunk_store._stores.pop(root).close()
+        shutil.rmtree(root)
+        self.start(port)
+
+    def holds(self, port, key):
+        return open_store(f"./storage/{port}").has(key)
+
+    def registered_ports(self, key):
+        value = self.nodes[api_server.DHT_PORT].store.get(key)
+        return sorted(p["port"] for p in value["peers"])
+
+    def close(self):
+        for node in self.nodes.values():
+            node.close()
+        for store in chunk_store._stores.values():
+            store.close()
+
+    def run(self, fn):
+        """Run ``fn(client)`` against the gateway app, inside its lifespan."""
+        async def main():
+            async with api_server.lifespan(api_server.app):
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api_server.app),
+                                             base_url="http://gateway") as client:
+                    return await fn(client)
+        return asyncio.run(main())
+
+
+@pytest.fixture
+def network(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(api_server.MANIFESTS_DIR)
+    os.makedirs(api_server.DOWNLOADS_DIR)
+    monkeypatch.setattr(chunk_store, "_stores", {})
+    # Downloads must reach the nodes, not a cache warmed by the upload
+    monkeypatch.setattr(api_server, "CACHE_MEMORY_BYTES", 0)
+    monkeypatch.setattr(api_server, "CACHE_DISK_BYTES", 0)
+    net = Network()
+    monkeypatch.setattr(api_server, "Transport", lambda **kw: Transport(transport_factory=net.route, **kw))
+    monkeypatch.setattr(transport, "_transport", transport._transport)  # put back after the test
+    yield net
+    net.close()
+
+
+async def upload(client, name, data, **params):
+    r = await client.post("/api/upload", params=params, files={"file": (name, data)})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"chunking": "fastcdc", "manifest_format": "binary"},
+    {"erasure": "2+2"},
+])
+def test_upload_download_round_trip(network, params, monkeypatch):
+    # fastcdc cuts up to 4x CHUNK_SIZE, so this is always several chunks
+    monkeypatch.setattr(api_server, "CHUNK_SIZE", 256 * 1024)
+    data = os.urandom(2 * 1024 * 1024 + 12345)
+
+    async def run(client):
+        uploaded = await upload(client, "f.bin", data, **params)
+        streamed = await client.get("/api/download/f.bin")
+        rebuilt = await client.get("/api/download/f.bin", params={"stream": "false"})
+        return uploaded, streamed, rebuilt
+
+    uploaded, streamed, rebuilt = network.run(run)
+    assert uploaded["chunks"] >= 2 and uploaded["dedupedChunks"] == 0
+    assert streamed.status_code == 200 and streamed.content == data
+    assert streamed.headers["etag"] == f'"{uploaded["contentId"]}"'
+    assert rebuilt.status_code == 200 and rebuilt.content == data
+
+
+def test_reupload_restores_replicas_lost_with_a_node(network):
+    data = os.urandom(3 * 1024 * 1024)
+    lost = api_server.STORAGE_NODES[-1]
+
+    async def run(client):
+        first = await upload(client, "a.bin", data)
+        network.wipe(lost)
+        degraded = await client.get("/api/download/a.bin")  # served by the surviving replicas
+        again = await upload(client, "b.bin", data)
+        return first, degraded, again
+
+    first, degraded, again = network.run(run)
+    assert degraded.content == data
+    assert again["dedupedChunks"] == 0  # every chunk had to be rewritten somewhere
+    for h in first["manifest"]["chunkHashes"]:
+        assert all(network.holds(port, h) for port in api_server.STORAGE_NODES)
+        assert network.registered_ports(h) == sorted(api_server.STORAGE_NODES)
+
+
+def test_reupload_restores_shards_lost_with_a_node(network):
+    data = os.urandom(2 * 1024 * 1024)
+    lost = api_server.STORAGE_NODES[0]
+
+    def placement(shards):
+        return {(port, h) for h in shards for port in api_server.STORAGE_NODES if network.holds(port, h)}
+
+    async def run(client):
+        first = await upload(client, "a.bin", data, erasure="2+2")
+        shards = first["manifest"]["shardHashes"]
+        before = placement(shards)
+        network.wipe(lost)
+        # Every stripe lost a data shard and rebuilds from parity
+        degraded = await client.get("/api/download/a.bin")
+        await upload(client, "b.bin", data, erasure="2+2")
+        return shards, before, degraded
+
+    shards, before, degraded = network.run(run)
+    assert any(port == lost for port, _ in before)
+    assert degraded.content == data
+    assert placement(shards) == before
+    for h in shards:
+        assert network.registered_ports(h) == sorted(port for port, key in before if key == h)
+
+
+def test_repeated_shard_is_registered_with_every_holder(network):
+    # One byte in four data shards: three of them are the same single zero byte
+    zero = sha256_hex(b"\0")
+
+    async def run(client):
+        uploaded = await upload(client, "z.bin", b"Z", erasure="4+2")
+        return uploaded, await client.get("/api/download/z.bin")
+
+    uploaded, downloaded = network.run(run)
+    assert uploaded["manifest"]["shardHashes"].count(zero) == 3
+    holders = [port for port in api_server.STORAGE_NODES if network.holds(port, zero)]
+    assert len(holders) == 2
+    assert network.registered_ports(zero) == holders
+    assert downloaded.content == b"Z"
+
+
+def test_registrations_keep_holders_across_batches(network, monkeypatch):
+    # The same key lands on a different node in each batch, as repeated shards
+    # ingested ahead of the registration loop can
+    a = Contact(id_hex="a" * 40, host="127.0.0.1", port=7002)
+    b = Contact(id_hex="b" * 40, host="127.0.0.1", port=7003)
+    key = sha256_hex(b"shard")
+    stored = [[(key, [a], False)], [(key, [b], False)], [(key, None, True)]]
+    registered = []
+
+    def ingest(replicas, codecs, item):
+        index, data = item
+        return sha256_hex(data), len(data), stored[index]
+
+    async def record(entries):
+        registered.append({e["key"]: [p["port"] for p in e["value"]["peers"]] for e in entries})
+
+    monkeypatch.setattr(api_server, "CHUNK_SIZE", 1)
+    monkeypatch.setattr(api_server, "REGISTER_BATCH", 1)
+    monkeypatch.setattr(api_server, "ingest_chunk", ingest)
+    monkeypatch.setattr(api_server, "register_chunks", record)
+
+    async def run(client):
+        return await upload(client, "k.bin", b"xyz")
+
+    uploaded = network.run(run)
+    assert registered == [{key: [7002]}, {key: [7002, 7003]}]
+    assert uploaded["dedupedChunks"] == 0  # the key was new to this upload
+
+
+def test_single_byte_range(network):
+    data = os.urandom(3 * 1024 * 1024)
+    start, end = 1024 * 1024 - 10, 2 * 1024 * 1024 + 9  # spans three chunks
+
+    async def run(client):
+        await upload(client, "r.bin", data)
+        return await client.get("/api/download/r.bin", headers={"Range": f"bytes={start}-{end}"})
+
+    r = network.run(run)
+    assert r.status_code == 206
+    assert r.headers["content-range"] == f"bytes {start}-{end}/{len(data)}"
+    assert r.content == data[start:end + 1]
+
+
+def test_multipart_byte_ranges(network):
+    data = os.urandom(3 * 1024 * 1024)
+
+    async def run(client):
+        await upload(client, "r.bin", data)
+        return await client.get("/api/download/r.bin", headers={"Range": "bytes=0-9,-10"})
+
+    r = network.run(run)
+    assert r.status_code == 206
+    boundary = r.headers["content-type"].split("boundary=")[1]
+    assert int(r.headers["content-length"]) == len(r.content)
+    parts = r.content.split(f"--{boundary}".encode())
+    assert parts[0] == b"" and parts[-1] == b"--\r\n"
+    (head0, body0), (head1, body1) = (p.split(b"\r\n\r\n", 1) for p in parts[1:-1])
+    assert f"Content-Range: bytes 0-9/{len(data)}".encode() in head0 and body0 == data[:10] + b"\r\n"
+    assert f"Content-Range: bytes {len(data) - 10}-{len(data) - 1}/{len(data)}".encode() in head1
+    assert body1 == data[-10:] + b"\r\n"
+
+
+def test_multipart_ranges_fail_up_front_when_a_chunk_is_missing(network, monkeypatch):
+    data = os.urandom(3 * 1024 * 1024)
+    lost = sha256_hex(data[2 * 1024 * 1024:])
+    find_values, find_value = retriever.find_values, retriever.find_value
+
+    async def without_lost(bootstrap, keys):
+        return {k: v for k, v in (await find_values(bootstrap, keys)).items() if k != lost}
+
+    async def lookup(bootstrap, key):
+        return None if key == lost else await find_value(bootstrap, key)
+
+    async def run(client):
+        await upload(client, "r.bin", data)
+        monkeypatch.setattr(retriever, "find_values", without_lost)
+        monkeypatch.setattr(retriever, "find_value", lookup)
+        # The first part is fine; only the second needs the unregistered chunk
+        return await client.get("/api/download/r.bin", headers={"Range": "bytes=0-9,-10"})
+
+    r = network.run(run)
+    assert r.status_code == 500
+    assert "No peers for chunk 2" in r.json()["detail"]
+
+
+def test_stale_if_range_sends_the_whole_file(network):
+    data = os.urandom(1024 * 1024 + 1)
+
+    async def run(client):
+        await upload(client, "r.bin", data)
+        fresh = await client.get("/api/download/r.bin", headers={"Range": "bytes=0-9"})
+        stale = await client.get("/api/download/r.bin",
+                                 headers={"Range": "bytes=0-9", "If-Range": '"not-the-content-id"'})
+        current = await client.get("/api/download/r.bin",
+                                   headers={"Range": "bytes=0-9", "If-Range": fresh.headers["etag"]})
+        return fresh, stale, current
+
+    fresh, stale, current = network.run(run)
+    assert stale.status_code == 200 and stale.content == data
+    assert current.status_code == 206 and current.content == data[:10]
+
+
+def test_unsatisfiable_range(network):
+    async def run(client):
+        await upload(client, "r.bin", b"0123456789")
+        return await client.get("/api/download/r.bin", headers={"Range": "bytes=10-20"})
+
+    r = network.run(run)
+    assert r.status_code == 416
+    assert r.headers["content-range"] == "bytes */10"
+
+
+def test_range_proofs_end_to_end(network, monkeypatch):
+    monkeypatch.setattr(api_server, "CHUNK_SIZE", 1000)
+    data = os.urandom(10500)
+    gateway = Contact(id_hex="0" * 40, host="127.0.0.1", port=GATEWAY_PORT)
+    bootstrap = [Contact(id_hex="0" * 40, host="127.0.0.1", port=api_server.DHT_PORT)]
+
+    async def run(client):
+        uploaded = await upload(client, "p.bin", data)
+        root, total = uploaded["contentId"], uploaded["chunks"]
+        proof = (await client.get("/api/proof/p.bin", params={"start": 3, "end": 7})).json()
+        chunks = await retriever.retrieve_range(gateway, "p.bin", root, total, 3, 7, bootstrap)
+        # A gateway serving another file's proof is caught against the trusted root
+        other = await upload(client, "q.bin", os.urandom(10500))
+        with pytest.raises(RuntimeError, match="does not match root"):
+            await retriever.retrieve_range(gateway, "q.bin", root, total, 3, 7, bootstrap)
+        outside = await client.get("/api/proof/p.bin", params={"start": 5, "end": total + 1})
+        return uploaded, other, proof, chunks, outside
+
+    uploaded, other, proof, chunks, outside = network.run(run)
+    assert proof["merkleRoot"] == uploaded["contentId"] != other["contentId"]
+    assert proof["chunkHashes"] == uploaded["manifest"]["chunkHashes"][3:7]
+    assert b"".join(chunks) == data[3000:7000]
+    assert outside.status_code == 416
@@ -0,0 +1,44 @@
+# tests/test_benchmarks.py
+import json
+
+from benchmarks import harness
+from benchmarks.harness import Case, compare, measure
+
+
+def test_measure_reports_per_op_time_and_throughput():
+    async def coro():
+        pass
+
+    r = measure(Case(lambda: sum(range(100)), ops=100, nbytes=800), min_time=0.001, repeats=3)
+    assert r["median_ns"] > 0 and r["repeats"] == 3 and r["mb_per_s"] > 0
+    assert measure(Case(coro), min_time=0.001, repeats=2)["median_ns"] > 0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    base = {"a": {"median_ns": 100.0}, "b": {"median_ns": 100.0}, "c": {"median_ns": 100.0}}
+    cur = {"a": {"median_ns": 130.0}, "b": {"median_ns": 110.0}, "c": {"median_ns": 70.0}, "d": {"median_ns": 1.0}}
+    status = {r["key"]: r["status"] for r in compare(base, cur, threshold=0.25)}
+    assert status == {"a": "regression", "b": "ok", "c": "improvement", "d": "new"}
+
+
+def test_run_saves_results_that_load_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(harness, "REGISTRY", [])
+
+    @harness.bench("toy", n=[1, 2])
+    def toy(n):
+        return lambda: [0] * n
+
+    results = harness.run(min_time=0.001, repeats=2, log=lambda line: None)
+    assert set(results) == {"toy[n=1]", "toy[n=2]"}
+    harness.save(str(tmp_path / "r.json"), results)
+    assert harness.load(str(tmp_path / "r.json")) == json.loads(json.dumps(results))
+    assert json.loads((tmp_path / "r.json").read_text())["environment"]["python"]
+
+
+def test_dht_benchmark_restores_the_transport():
+    from benchmarks import bench_dht
+    from src.common import transport
+
+    before = transport.get_transport()
+    measure(bench_dht.kademlia_find_value(nodes=50), min_time=0.001, repeats=1)
+    assert transport.get_transport() is before
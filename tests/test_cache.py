@@ -0,0 +1,97 @@
+# tests/test_cache.py
+import asyncio
+import os
+
+from src.common.hashing import sha256_hex
+from src.retrieval import cache as cache_module
+from src.retrieval.cache import ChunkCache
+from src.retrieval.retriever import cache_get, cache_put
+
+
+def chunk(n, size=100):
+    data = bytes([n]) * size
+    return sha256_hex(data), data
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ChunkCache(memory_bytes=250)
+    a, b, c = chunk(1), chunk(2), chunk(3)
+    cache.put(*a)
+    cache.put(*b)
+    assert cache.get(a[0]) == a[1]  # a is now most recent
+    cache.put(*c)
+    assert b[0] not in cache
+    assert cache.get(a[0]) == a[1] and cache.get(c[0]) == c[1]
+    assert cache.get(b[0]) is None
+    stats = cache.stats()
+    assert (stats["hitsMemory"], stats["misses"], stats["memoryBytes"]) == (3, 1, 200)
+
+
+def test_disk_tier_survives_restart_and_respects_limit(tmp_path):
+    d = str(tmp_path / "cache")
+    cache = ChunkCache(memory_bytes=100, disk_dir=d, disk_bytes=300)
+    chunks = [chunk(i) for i in range(4)]
+    for h, data in chunks:
+        cache.put(h, data)
+    assert cache.stats()["diskBytes"] == 300
+    assert chunks[0][0] not in cache
+
+    reopened = ChunkCache(memory_bytes=100, disk_dir=d, disk_bytes=300)
+    assert reopened.get(chunks[3][0]) == chunks[3][1]
+    assert reopened.stats()["hitsDisk"] == 1
+    assert reopened.get(chunks[3][0]) == chunks[3][1]
+    assert reopened.stats()["hitsMemory"] == 1
+
+
+def test_damaged_disk_entry_is_dropped(tmp_path):
+    d = str(tmp_path / "cache")
+    cache = ChunkCache(memory_bytes=0, disk_dir=d, disk_bytes=1000)
+    h, data = chunk(7)
+    cache.put(h, data)
+    with open(os.path.join(d, h[:2], h), "wb") as f:
+        f.write(b"garbage")
+    assert cache.get(h) is None
+    assert h not in cache
+    assert cache.stats()["diskBytes"] == 0
+
+
+def test_disk_io_happens_outside_the_lock(tmp_path, monkeypatch):
+    cache = ChunkCache(memory_bytes=0, disk_dir=str(tmp_path / "cache"), disk_bytes=1000)
+    held = []
+    real_replace, real_hash = os.replace, cache_module.sha256_hex
+
+    def replace(src, dst):
+        held.append(cache._lock.locked())
+        return real_replace(src, dst)
+
+    def hash_(data):
+        held.append(cache._lock.locked())
+        return real_hash(data)
+
+    monkeypatch.setattr(cache_module.os, "replace", replace)
+    monkeypatch.setattr(cache_module, "sha256_hex", hash_)
+    h, data = chunk(5)
+    cache.put(h, data)
+    assert cache.get(h) == data
+    assert held == [False, False]
+
+
+def test_async_helpers_serve_memory_inline_and_disk_in_background(tmp_path):
+    d = str(tmp_path / "cache")
+    cache = ChunkCache(memory_bytes=1000, disk_dir=d, disk_bytes=1000)
+    h, data = chunk(9)
+
+    async def run():
+        cache_put(cache, h, data)
+        assert cache.get_memory(h) == data  # available before the disk write lands
+        for _ in range(100):
+            if h in cache._disk:
+                break
+            await asyncio.sleep(0.01)
+        return await cache_get(cache, h), await cache_get(cache, chunk(10)[0])
+
+    assert asyncio.run(run()) == (data, None)
+    assert os.path.exists(os.path.join(d, h[:2], h))
+    reopened = ChunkCache(memory_bytes=1000, disk_dir=d, disk_bytes=1000)
+    assert asyncio.run(cache_get(reopened, h)) == data
+    assert reopened.stats()["hitsDisk"] == 1
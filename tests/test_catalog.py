@@ -0,0 +1,58 @@
+# tests/test_catalog.py
+import json
+import os
+
+from src.retrieval.catalog import ManifestCatalog
+
+
+def write_manifest(d, file_id, hashes, size=10):
+    path = os.path.join(d, f"{file_id}.json")
+    manifest = {"fileId": file_id, "originalName": file_id, "totalChunks": len(hashes),
+                "chunkHashes": hashes, "chunkSize": 4, "size": size}
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+    return manifest, path
+
+
+def test_add_list_and_search(tmp_path):
+    mdir = tmp_path / "manifests"
+    mdir.mkdir()
+    cat = ManifestCatalog(str(tmp_path / "catalog.sqlite3"), str(mdir))
+    for i in range(5):
+        manifest, path = write_manifest(str(mdir), f"f{i}", [f"h{i}", "shared"])
+        cat.add(f"f{i}", manifest, path)
+
+    total, page = cat.list(offset=1, limit=2)
+    assert total == 5
+    assert [f["name"] for f in page] == ["f3", "f2"]
+    _, oldest = cat.list(limit=1, newest_first=False)
+    assert oldest[0]["name"] == "f0"
+
+    assert cat.find_chunk("h2")["name"] == "f2"
+    assert cat.find_chunk("shared")["name"] == "f4"
+    assert cat.find_chunk("missing") is None
+    cat.close()
+
+
+def test_rebuild_tracks_directory(tmp_path):
+    mdir = tmp_path / "manifests"
+    mdir.mkdir()
+    write_manifest(str(mdir), "a", ["ha"])
+    write_manifest(str(mdir), "b", ["hb"])
+    (mdir / "notes.txt").write_text("not a manifest")
+    db = str(tmp_path / "catalog.sqlite3")
+    cat = ManifestCatalog(db, str(mdir))
+    cat.rebuild()
+    assert cat.list()[0] == 2
+    cat.close()
+
+    os.remove(mdir / "a.json")
+    write_manifest(str(mdir), "c", ["hc"])
+    cat = ManifestCatalog(db, str(mdir))
+    cat.rebuild()
+    total, files = cat.list()
+    assert total == 2
+    assert {f["name"] for f in files} == {"b", "c"}
+    assert cat.find_chunk("ha") is None
+    assert cat.find_chunk("hc")["name"] == "c"
+    cat.close()
@@ -0,0 +1,45 @@
+# tests/test_cdc.py
+import os
+import random
+import src.utils.cdc as cdc
+from src.utils.chunking import FixedChunker, make_chunker
+
+
+def chunk_all(chunker, data, block):
+    chunks = []
+    for i in range(0, len(data), block):
+        chunks += chunker.feed(data[i:i + block])
+    return chunks + chunker.finish()
+
+
+def test_chunks_respect_bounds_and_reassemble():
+    data = os.urandom(2 * 1024 * 1024)
+    chunks = chunk_all(cdc.FastCDCChunker(4096, 16384, 65536), data, 100_000)
+    assert b"".join(chunks) == data
+    assert all(4096 < len(c) <= 65536 for c in chunks[:-1])
+
+
+def test_streaming_cuts_match_one_shot_and_pure_python(monkeypatch):
+    data = os.urandom(512 * 1024)
+    one_shot = cdc.FastCDCChunker(1024, 4096, 16384).cut_points(data, final=True)
+    streamed = chunk_all(cdc.FastCDCChunker(1024, 4096, 16384), data, random.randint(1, 20000))
+    assert [len(c) for c in streamed] == [b - a for a, b in zip([0] + one_shot, one_shot)]
+
+    monkeypatch.setattr(cdc, "np", None)
+    assert cdc.FastCDCChunker(1024, 4096, 16384).cut_points(data, final=True) == one_shot
+
+
+def test_insertion_only_changes_nearby_chunks():
+    data = os.urandom(1024 * 1024)
+    edited = data[:300_000] + b"inserted" + data[300_000:]
+    before = chunk_all(cdc.FastCDCChunker(2048, 8192, 32768), data, 65536)
+    after = chunk_all(cdc.FastCDCChunker(2048, 8192, 32768), edited, 65536)
+    shared = set(before) & set(after)
+    assert len(shared) >= len(before) - 3
+
+
+def test_make_chunker():
+    assert isinstance(make_chunker("fixed", 10), FixedChunker)
+    assert chunk_all(make_chunker("fixed", 10), b"x" * 25, 7) == [b"x" * 10, b"x" * 10, b"x" * 5]
+    assert make_chunker("fastcdc", 1 << 20).params() == {
+        "algorithm": "fastcdc", "minSize": 1 << 18, "avgSize": 1 << 20, "maxSize": 1 << 22}
@@ -0,0 +1,72 @@
+# tests/test_checkpoint.py
+import asyncio
+import os
+
+import pytest
+
+from src.common.hashing import sha256_hex
+from src.common.merkle import merkle_root
+from src.retrieval import retriever
+from src.retrieval.checkpoint import DownloadCheckpoint
+from src.retrieval.manifest import Manifest
+
+KEY = "ab" * 32
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "f.ckpt")
+    ckpt = DownloadCheckpoint(path, KEY, 20)
+    for i in (0, 1, 2, 7, 19):
+        ckpt.mark(i)
+    ckpt.mark(7)
+    assert ckpt.count == 5
+    assert list(ckpt.missing_runs()) == [(3, 7), (8, 19)]
+    ckpt.save()
+
+    loaded = DownloadCheckpoint.load(path, KEY, 20)
+    assert loaded.count == 5 and 19 in loaded and 3 not in loaded
+    # A checkpoint for another manifest is ignored
+    assert DownloadCheckpoint.load(path, "cd" * 32, 20).count == 0
+    assert DownloadCheckpoint.load(path, KEY, 21).count == 0
+
+
+def make_manifest(chunks, with_size=True):
+    hashes = [sha256_hex(c) for c in chunks]
+    return Manifest(fileId="f.bin", totalChunks=len(chunks), chunkHashes=hashes, chunkSize=len(chunks[0]),
+                    size=sum(map(len, chunks)) if with_size else None, merkleRoot=merkle_root(hashes))
+
+
+@pytest.mark.parametrize("with_size", [True, False])
+def test_interrupted_download_resumes(tmp_path, monkeypatch, with_size):
+    chunks = [os.urandom(1000) for _ in range(9)] + [b"tail"]
+    by_hash = {sha256_hex(c): c for c in chunks}
+    manifest = make_manifest(chunks, with_size)
+    fetched = []
+    fail = {5}
+
+    async def find_values(bootstrap, keys):
+        return {}
+
+    async def fetch_chunk(bootstrap, chunk_hash, index, value=None):
+        fetched.append(index)
+        if index in fail:
+            raise RuntimeError("peer went away")
+        return by_hash[chunk_hash]
+
+    monkeypatch.setattr(retriever, "find_values", find_values)
+    monkeypatch.setattr(retriever, "fetch_chunk", fetch_chunk)
+    monkeypatch.setattr(retriever, "CHECKPOINT_CHUNKS", 1)
+    out = str(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(retriever.retrieve_file(manifest, [], out_dir=out, concurrency=1))
+    assert os.path.exists(os.path.join(out, "f.bin.part"))
+    assert os.path.exists(os.path.join(out, "f.bin.ckpt"))
+
+    fail.clear()
+    fetched.clear()
+    path = asyncio.run(retriever.retrieve_file(manifest, [], out_dir=out, concurrency=3))
+    assert 0 not in fetched and 5 in fetched
+    with open(path, "rb") as f:
+        assert f.read() == b"".join(chunks)
+    assert sorted(os.listdir(out)) == ["f.bin"]
@@ -0,0 +1,75 @@
+# tests/test_chunk_store.py
+import os
+from src.common.hashing import sha256_hex
+from src.storage.chunk_store import ChunkStore
+
+
+def test_small_chunks_are_packed_and_large_ones_sharded(tmp_path):
+    store = ChunkStore(str(tmp_path), pack_threshold=1024)
+    small = [os.urandom(100 + i) for i in range(20)]
+    large = os.urandom(4096)
+    for data in small + [large]:
+        store.put(sha256_hex(data), data)
+
+    for data in small:
+        loc = store.locate(sha256_hex(data))
+        assert loc.packed and loc.length == len(data)
+        assert store.get(sha256_hex(data)) == data
+    h = sha256_hex(large)
+    assert store.locate(h).path == os.path.join(str(tmp_path), h[:2], h[2:4], h)
+    assert store.get(h) == large
+    assert store.get("00" * 32) is None
+    assert set(store.iter_hashes()) == {sha256_hex(d) for d in small + [large]}
+
+
+def test_packs_roll_over_and_survive_reopen(tmp_path):
+    store = ChunkStore(str(tmp_path), pack_threshold=1024, pack_max_bytes=1000)
+    chunks = [os.urandom(300) for _ in range(10)]
+    for data in chunks:
+        store.put(sha256_hex(data), data)
+    store.put(sha256_hex(chunks[0]), chunks[0])
+    store.close()
+
+    reopened = ChunkStore(str(tmp_path), pack_threshold=1024, pack_max_bytes=1000)
+    assert len({reopened.locate(sha256_hex(d)).path for d in chunks}) > 1
+    assert all(reopened.get(sha256_hex(d)) == d for d in chunks)
+
+
+def test_legacy_flat_chunks_are_readable(tmp_path):
+    data = b"legacy chunk"
+    (tmp_path / sha256_hex(data)).write_bytes(data)
+    store = ChunkStore(str(tmp_path))
+    assert store.get(sha256_hex(data)) == data
+    assert list(store.iter_hashes()) == [sha256_hex(data)]
+
+
+def test_verify_cache_hashes_once_and_catches_corruption(tmp_path, monkeypatch):
+    import src.storage.verify as verify
+
+    store = ChunkStore(str(tmp_path), pack_threshold=1024)
+    data = os.urandom(4096)
+    h = sha256_hex(data)
+    store.put(h, data)
+    cache = verify.VerifyCache()
+
+    calls = []
+    real_hash = verify.hash_region
+    monkeypatch.setattr(verify, "hash_region", lambda *a: calls.append(a) or real_hash(*a))
+    assert cache.check(h, store.locate(h)) is not None
+    assert cache.check(h, store.locate(h)) is not None
+    assert len(calls) == 1
+
+    # Same size, same mtime: only the scrubber notices
+    p = store.locate(h).path
+    st = os.stat(p)
+    with open(p, "r+b") as f:
+        f.write(b"\0")
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert cache.scrub() == [h]
+    assert cache.check(h, store.locate(h)) is None
+
+
+def test_directories_are_never_chunks(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    os.makedirs(os.path.join(str(tmp_path), "ab", "ab"))
+    assert store.locate("ab") is None and not store.has("abab")
@@ -0,0 +1,121 @@
+# tests/test_compression.py
+import asyncio
+import os
+import sqlite3
+
+import httpx
+import pytest
+
+from src.common.compression import accepted_codecs, compress, decompress, parse_codecs
+from src.common.hashing import sha256_hex
+from src.common import transport
+from src.common.transport import Transport
+from src.dht.server import DHTNode
+from src.retrieval.retriever import fetch_chunk_from_peer
+from src.storage.chunk_store import ChunkStore
+from src.storage.verify import VerifyCache
+
+TEXT = b"".join(b"%d,sensor-%d,%.3f\n" % (i, i % 17, i / 7) for i in range(20000))
+
+
+def test_best_codec_is_chosen_and_incompressible_data_stays_raw():
+    codec, payload = compress(TEXT, ("zlib", "lzma"))
+    assert codec in ("zlib", "lzma") and len(payload) < len(TEXT) // 3
+    assert decompress(codec, payload) == TEXT
+    assert len(payload) == min(len(compress(TEXT, (c,))[1]) for c in ("zlib", "lzma"))
+
+    noise = os.urandom(200_000)
+    assert compress(noise, ("zlib", "lzma")) == (None, noise)
+    assert compress(TEXT, ()) == (None, TEXT)
+    assert compress(b"a" * 100, ("zlib",)) == (None, b"a" * 100)  # too small to bother
+    assert compress(TEXT) == (None, TEXT)  # no codecs unless asked for
+
+
+def test_codec_lists_are_validated():
+    assert parse_codecs("zlib, lzma") == ("zlib", "lzma")
+    assert parse_codecs("none") == ()
+    for bad in ("zstd", "zlib,brotli", ","):
+        with pytest.raises(ValueError):
+            parse_codecs(bad)
+
+
+def test_accept_encoding_parsing():
+    assert set(accepted_codecs("gzip, deflate, x-lzma")) == {"zlib", "lzma"}
+    assert set(accepted_codecs("deflate;q=0, x-lzma;q=0.5")) == {"lzma"}
+    assert accepted_codecs(None) == {}
+
+
+def test_store_records_codec_and_returns_original_bytes(tmp_path):
+    store = ChunkStore(str(tmp_path), pack_threshold=64 * 1024, codecs=("zlib",))
+    small = TEXT[:30000]
+    for data in (TEXT, small):
+        store.put(sha256_hex(data), data)
+    store.put(sha256_hex(TEXT[:1000]), TEXT[:1000], codecs=())
+
+    big = store.locate(sha256_hex(TEXT))
+    assert big.codec == "zlib" and not big.packed and big.path.endswith(".zlib")
+    assert big.length < len(TEXT)
+    packed = store.locate(sha256_hex(small))
+    assert packed.codec == "zlib" and packed.packed
+    assert store.locate(sha256_hex(TEXT[:1000])).codec is None
+    store.close()
+
+    reopened = ChunkStore(str(tmp_path), pack_threshold=64 * 1024)
+    for data in (TEXT, small, TEXT[:1000]):
+        assert reopened.get(sha256_hex(data)) == data
+    assert set(reopened.iter_hashes()) == {sha256_hex(d) for d in (TEXT, small, TEXT[:1000])}
+    cache = VerifyCache()
+    assert cache.check(sha256_hex(TEXT), big) is not None
+    assert cache.check(sha256_hex(small), packed) is not None
+
+
+def test_pack_index_without_codec_column_is_upgraded(tmp_path):
+    os.makedirs(tmp_path / "packs")
+    db = sqlite3.connect(str(tmp_path / "packs" / "index.sqlite3"))
+    db.execute("CREATE TABLE packed (hash TEXT PRIMARY KEY, pack INTEGER NOT NULL, "
+               "offset INTEGER NOT NULL, length INTEGER NOT NULL) WITHOUT ROWID")
+    data = b"old packed chunk"
+    (tmp_path / "packs" / "pack-000001.pack").write_bytes(data)
+    db.execute("INSERT INTO packed VALUES (?, 1, 0, ?)", (sha256_hex(data), len(data)))
+    db.commit()
+    db.close()
+
+    store = ChunkStore(str(tmp_path))
+    assert store.locate(sha256_hex(data)).codec is None
+    assert store.get(sha256_hex(data)) == data
+
+
+def test_chunks_endpoint_negotiates_encoding(tmp_path, monkeypatch):
+    node = DHTNode("127.0.0.1", 9100, [], storage_dir=str(tmp_path))
+    app = node.app()
+    sent = []
+
+    class Recording(httpx.ASGITransport):
+        async def handle_async_request(self, request):
+            response = await super().handle_async_request(request)
+            sent.append(response.headers.get("content-encoding"))
+            return response
+
+    monkeypatch.setattr(transport, "_transport", Transport(transport_factory=lambda host, port: Recording(app=app)))
+    peer = {"host": node.host, "port": node.port}
+    chunks = {}
+    for codec in ("zlib", "lzma"):
+        data = TEXT + codec.encode()
+        node.chunks.put(sha256_hex(data), data, (codec,))
+        chunks[codec] = data
+
+    async def run():
+        got = [await fetch_chunk_from_peer(peer, sha256_hex(d)) for d in chunks.values()]
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://node") as c:
+            plain = await c.get(f"/chunks/{sha256_hex(chunks['lzma'])}", headers={"Accept-Encoding": "identity"})
+            short = await c.get("/chunks/abab")
+        return got, plain, short
+
+    try:
+        got, plain, short = asyncio.run(run())
+    finally:
+        node.close()
+    assert got == list(chunks.values())
+    assert sent == ["deflate", "x-lzma"]
+    assert "content-encoding" not in plain.headers and plain.content == chunks["lzma"]
+    assert short.status_code == 400
@@ -0,0 +1,30 @@
+# tests/test_dedup.py
+import os
+from src.common.hashing import sha256_hex
+from src.storage.dedup import BloomFilter, DedupIndex
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(10_000, error_rate=0.01)
+    members = [sha256_hex(os.urandom(16)) for _ in range(10_000)]
+    for h in members:
+        bloom.add(h)
+    assert all(h in bloom for h in members)
+    others = [sha256_hex(os.urandom(16)) for _ in range(10_000)]
+    assert sum(h in bloom for h in others) < 300
+
+
+def test_index_persists_and_rebuilds_filter(tmp_path):
+    path = str(tmp_path / "dedup.sqlite3")
+    known = [sha256_hex(bytes([i])) for i in range(100)]
+    index = DedupIndex(path, capacity=10)
+    index.add_many(known)
+    index.add(known[0])
+    assert len(index) == 100
+    index.close()
+
+    reopened = DedupIndex(path, capacity=10)
+    assert len(reopened) == 100
+    assert reopened.bloom.capacity >= 200
+    assert all(h in reopened for h in known)
+    assert sha256_hex(b"new") not in reopened
@@ -0,0 +1,63 @@
+# tests/test_erasure.py
+import itertools
+import os
+
+import pytest
+
+from src.common import erasure
+from src.common.erasure import ReedSolomon, gf_inv, gf_mul, invert_matrix
+
+
+def test_field_inverse():
+    for a in range(1, 256):
+        assert gf_mul(a, gf_inv(a)) == 1
+
+
+def test_matrix_inverse():
+    rs = ReedSolomon(3, 2)
+    rows = [rs.rows[i] for i in (0, 3, 4)]
+    inv = invert_matrix(rows)
+    product = [[0] * 3 for _ in range(3)]
+    for i in range(3):
+        for j in range(3):
+            for t in range(3):
+                product[i][j] ^= gf_mul(rows[i][t], inv[t][j])
+    assert product == [[1, 0, 0], [0, 1, 0], [0, 0, 1]]
+
+
+@pytest.mark.parametrize("k,m", [(1, 1), (2, 2), (4, 2), (5, 3)])
+@pytest.mark.parametrize("length", [0, 1, 1001])
+def test_any_k_shards_decode(k, m, length):
+    rs = ReedSolomon(k, m)
+    data = os.urandom(length)
+    shards = rs.encode(data)
+    assert len(shards) == k + m
+    assert len({len(s) for s in shards}) == 1
+    for chosen in itertools.combinations(range(k + m), k):
+        assert rs.decode({i: shards[i] for i in chosen}, length) == data
+
+
+def test_pure_python_matches_numpy(monkeypatch):
+    rs = ReedSolomon(4, 2)
+    data = os.urandom(100_000)
+    shards = rs.encode(data)
+    monkeypatch.setattr(erasure, "np", None)
+    assert rs.encode(data) == shards
+    assert rs.decode({i: shards[i] for i in (1, 2, 4, 5)}, len(data)) == data
+
+
+@pytest.mark.parametrize("k,m", [(3, 3), (2, 5), (6, 11)])
+def test_packed_parity_rows_match_pure_python(k, m, monkeypatch):
+    # Groups of 3, 5 and 8 + 3 rows use every packed word width
+    rs = ReedSolomon(k, m)
+    data = os.urandom(200_003)
+    shards = rs.encode(data)
+    monkeypatch.setattr(erasure, "np", None)
+    assert rs.encode(data) == shards
+
+
+def test_too_few_shards():
+    rs = ReedSolomon(2, 1)
+    shards = rs.encode(b"abc")
+    with pytest.raises(ValueError):
+        rs.decode({2: shards[2]}, 3)
@@ -0,0 +1,74 @@
+# tests/test_file_transfer.py
+import os
+import socket
+import threading
+
+import pytest
+
+from p2p_network.file_transfer import receive_chunk, send_chunk
+from p2p_network.message_protocol import encode_frame, recv_json, send_json
+from src.common.hashing import sha256_hex
+
+
+def connected_pair():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        client = socket.create_connection(server.getsockname())
+        conn, _ = server.accept()
+    return conn, client
+
+
+def test_chunk_round_trip_writes_file_and_hash(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    src = tmp_path / "chunk"
+    src.write_bytes(data)
+    conn, client = connected_pair()
+    sender = threading.Thread(target=send_chunk, args=(conn, str(src)))
+    sender.start()
+    try:
+        digest = receive_chunk(client, str(tmp_path / "out"), buffer=bytearray(4096))
+    finally:
+        sender.join()
+        conn.close()
+        client.close()
+    assert digest == sha256_hex(data)
+    assert (tmp_path / "out").read_bytes() == data
+
+
+def test_truncated_transfer_leaves_no_file(tmp_path):
+    conn, client = connected_pair()
+    send_json(conn, {"type": "CHUNK_RESPONSE", "content_length": 10000})
+    conn.sendall(b"x" * 500)
+    conn.close()
+    with pytest.raises(ConnectionError):
+        receive_chunk(client, str(tmp_path / "out"))
+    client.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_recv_json_reassembles_split_frames():
+    conn, client = connected_pair()
+    frame = encode_frame({"type": "HELLO", "payload": "x" * 1000})
+
+    def trickle():
+        for i in range(0, len(frame), 3):
+            conn.sendall(frame[i:i + 3])
+        conn.close()
+
+    t = threading.Thread(target=trickle)
+    t.start()
+    try:
+        assert recv_json(client) == {"type": "HELLO", "payload": "x" * 1000}
+        assert recv_json(client) is None
+    finally:
+        t.join()
+        client.close()
+
+
+def test_empty_buffer_is_rejected(tmp_path):
+    conn, client = connected_pair()
+    try:
+        with pytest.raises(ValueError):
+            receive_chunk(client, str(tmp_path / "out"), buffer=bytearray())
+    finally:
+        conn.close()
+        client.close()
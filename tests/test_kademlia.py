@@ -0,0 +1,84 @@
+# tests/test_kademlia.py
+import asyncio
+import httpx
+import pytest
+from src.common import transport
+from src.common.transport import Transport
+from src.dht.kademlia import LookupStats, find_value, find_values, store_values
+from src.dht.routing import Contact
+from src.dht.server import DHTNode
+
+
+@pytest.fixture
+def make_network(tmp_path, monkeypatch):
+    """Build n DHT nodes, each bootstrapped from the previous one, served over ASGI.
+
+    The process-wide transport is restored and the nodes closed after the test.
+    """
+    monkeypatch.setenv("STORAGE_DIR", str(tmp_path))
+    built = []
+
+    def build(n):
+        nodes = []
+        for i in range(n):
+            bootstrap = []
+            if nodes:
+                prev = nodes[-1]
+                bootstrap = [{"host": prev.host, "port": prev.port, "id": prev.id_hex}]
+            nodes.append(DHTNode("127.0.0.1", 9000 + i, bootstrap))
+        built.extend(nodes)
+        apps = {(node.host, node.port): node.app() for node in nodes}
+        monkeypatch.setattr(transport, "_transport", Transport(
+            transport_factory=lambda host, port: httpx.ASGITransport(app=apps[(host, port)])))
+        return nodes
+
+    yield build
+    for node in built:
+        node.close()
+
+
+def contact(node):
+    return Contact(id_hex=node.id_hex, host=node.host, port=node.port)
+
+
+def test_store_values_and_find_values_batch(make_network):
+    nodes = make_network(1)
+    items = {f"{i:064x}": {"peers": [{"host": "127.0.0.1", "port": 7002}]} for i in range(50)}
+
+    async def run():
+        await store_values([contact(nodes[0])], items, batch_size=16)
+        return await find_values([contact(nodes[0])], list(items) + ["ff" * 32])
+
+    found = asyncio.run(run())
+    assert found == items
+
+
+def test_find_values_follows_closest_contacts(make_network):
+    nodes = make_network(3)
+    # Only the first node holds the values; lookups start from the last one
+    nodes[0].store.update({"aa" * 32: {"peers": []}, "bb" * 32: {"peers": []}})
+
+    found = asyncio.run(find_values([contact(nodes[-1])], ["aa" * 32, "bb" * 32, "cc" * 32]))
+    assert set(found) == {"aa" * 32, "bb" * 32}
+
+
+def test_find_value_converges_and_caches(make_network):
+    nodes = make_network(30)
+    # Give every node a full view so the lookup can converge on the true closest
+    for node in nodes:
+        for other in nodes:
+            node.rt.add(contact(other))
+    key = "ab" * 32
+    holder = nodes[0].rt.closest(key, 1)[0]
+    by_port = {n.port: n for n in nodes}
+    by_port[holder.port].store[key] = {"peers": []}
+
+    start = [contact(n) for n in nodes if n.port != holder.port][:1]
+    stats = LookupStats()
+    assert asyncio.run(find_value(start, key, stats=stats)) == {"peers": []}
+    assert stats.hops <= 3
+    assert sum(key in n.store for n in nodes) == 2
+
+    miss = LookupStats()
+    assert asyncio.run(find_value(start, "cd" * 32, stats=miss)) is None
+    assert miss.rpcs <= 20 + 3
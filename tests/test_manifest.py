@@ -0,0 +1,64 @@
+# tests/test_manifest.py
+import json
+import os
+
+import pytest
+
+from src.common.hashing import sha256_hex
+from src.retrieval.manifest import Manifest, PackedArray, is_binary_manifest, save_binary_manifest
+
+
+def sample(n=1000, sizes=False):
+    m = {"fileId": "f.bin", "originalName": "f.bin", "totalChunks": n,
+         "chunkHashes": [sha256_hex(str(i).encode()) for i in range(n)],
+         "chunkSize": 1024, "size": n * 1000}
+    if sizes:
+        m["chunking"] = {"algorithm": "fastcdc", "minSize": 256, "avgSize": 1024, "maxSize": 4096}
+        m["chunkSizes"] = [1000 + i for i in range(n)]
+    return m
+
+
+@pytest.mark.parametrize("sizes", [False, True])
+def test_binary_round_trip_matches_json(tmp_path, sizes):
+    m = sample(sizes=sizes)
+    bin_path = str(tmp_path / "f.bin.dfsm")
+    json_path = str(tmp_path / "f.bin.json")
+    save_binary_manifest(m, bin_path)
+    with open(json_path, "w") as f:
+        json.dump(m, f)
+    assert is_binary_manifest(bin_path) and not is_binary_manifest(json_path)
+    assert os.path.getsize(bin_path) < os.path.getsize(json_path) / 2
+
+    binary, parsed = Manifest.load(bin_path), Manifest.load(json_path)
+    assert isinstance(binary.chunkHashes, PackedArray)
+    for field in ("fileId", "totalChunks", "chunkSize", "size", "chunking"):
+        assert getattr(binary, field) == getattr(parsed, field)
+    assert binary.chunkHashes[0] == m["chunkHashes"][0]
+    assert binary.chunkHashes[-1] == m["chunkHashes"][-1]
+    assert binary.chunkHashes[10:13] == m["chunkHashes"][10:13]
+    assert list(binary.chunkHashes) == m["chunkHashes"]
+    assert binary.chunkSizes == parsed.chunkSizes
+    with pytest.raises(IndexError):
+        binary.chunkHashes[len(m["chunkHashes"])]
+
+
+def test_binary_shard_hashes(tmp_path):
+    m = sample(10, sizes=True)
+    m["erasure"] = {"algorithm": "cauchy-rs", "k": 2, "m": 1}
+    m["shardHashes"] = [sha256_hex(b"shard%d" % i) for i in range(30)]
+    path = str(tmp_path / "f.dfsm")
+    save_binary_manifest(m, path)
+    loaded = Manifest.load(path)
+    assert loaded.erasure == m["erasure"]
+    assert list(loaded.shardHashes) == m["shardHashes"]
+    assert list(loaded.chunkSizes) == m["chunkSizes"]
+    assert list(loaded.chunkHashes) == m["chunkHashes"]
+
+
+def test_truncated_binary_manifest_is_rejected(tmp_path):
+    path = str(tmp_path / "f.dfsm")
+    save_binary_manifest(sample(10), path)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)
+    with pytest.raises(ValueError):
+        Manifest.load(path)
@@ -0,0 +1,66 @@
+# tests/test_merkle.py
+from hashlib import sha256
+
+import pytest
+
+from src.common.hashing import sha256_hex
+from src.common.merkle import MerkleBuilder, MerkleTree, leaf_hash, merkle_root, node_hash, verify_range
+
+
+def rfc6962_root(leaves):
+    # Reference definition: split at the largest power of two below n
+    if len(leaves) == 1:
+        return leaf_hash(leaves[0])
+    k = 1
+    while k * 2 < len(leaves):
+        k *= 2
+    return node_hash(rfc6962_root(leaves[:k]), rfc6962_root(leaves[k:]))
+
+
+def hashes(n):
+    return [sha256_hex(str(i).encode()) for i in range(n)]
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 8, 13, 64, 100])
+def test_roots_agree_with_rfc6962(n):
+    leaves = hashes(n)
+    expected = rfc6962_root(leaves).hex()
+    assert merkle_root(leaves) == expected
+    assert MerkleTree(leaves).root() == expected
+
+
+def test_empty_root():
+    assert merkle_root([]) == MerkleTree([]).root() == sha256(b"").hexdigest()
+    assert MerkleBuilder().count == 0
+
+
+@pytest.mark.parametrize("n", [1, 2, 7, 16, 33])
+def test_every_range_proof_verifies(n):
+    leaves = hashes(n)
+    tree = MerkleTree(leaves)
+    root = tree.root()
+    for start in range(n):
+        for end in range(start + 1, n + 1):
+            proof = tree.prove_range(start, end)
+            assert verify_range(root, n, start, leaves[start:end], proof)
+
+
+def test_tampered_proofs_are_rejected():
+    leaves = hashes(20)
+    tree = MerkleTree(leaves)
+    root = tree.root()
+    proof = tree.prove_range(5, 9)
+    assert not verify_range(root, 20, 5, [leaves[4]] + leaves[6:9], proof)
+    assert not verify_range(root, 20, 6, leaves[5:9], proof)
+    assert not verify_range(root, 20, 5, leaves[5:9], proof[:-1])
+    assert not verify_range(root, 20, 5, leaves[5:9], proof + [proof[0]])
+    with pytest.raises(ValueError):
+        tree.prove_range(3, 3)
+
+
+def test_tree_is_stored_as_packed_digests():
+    tree = MerkleTree(hashes(5))
+    # 5 leaves, then 3, 2 and 1 nodes
+    assert [len(level) for level in tree.levels] == [5 * 32, 3 * 32, 2 * 32, 32]
+    assert tree.nbytes == 11 * 32 and len(tree) == 5
+    assert MerkleTree([]).nbytes == 0
@@ -0,0 +1,157 @@
+# tests/test_p2p_server.py
+import asyncio
+import json
+import socket
+import struct
+
+from p2p_network.client import PeerClient
+from p2p_network.message_protocol import recv_json, send_json
+from p2p_network.server import PeerServer
+
+
+def run_with_server(server, body):
+    async def run():
+        await server.start("127.0.0.1", 0)
+        try:
+            return await body(server.port)
+        finally:
+            await server.close()
+    return asyncio.run(run())
+
+
+def test_pipelined_requests_on_one_connection_match_by_id():
+    server = PeerServer()
+
+    @server.route("ECHO")
+    async def echo(msg):
+        # Earlier requests finish later, so responses arrive out of order
+        await asyncio.sleep(0.001 * (50 - msg["n"] % 50))
+        return {"status": "ok", "n": msg["n"]}
+
+    async def body(port):
+        async with PeerClient("127.0.0.1", port) as client:
+            return await asyncio.gather(*(client.request({"type": "ECHO", "n": i}) for i in range(500)))
+
+    responses = run_with_server(server, body)
+    assert [r["n"] for r in responses] == list(range(500))
+    assert server.requests == 500
+
+
+def test_reads_pause_when_a_connection_is_saturated():
+    server = PeerServer(max_inflight=4)
+    running = []
+    peak = []
+    release = None
+
+    @server.route("WORK")
+    async def work(msg):
+        running.append(msg["id"])
+        peak.append(len(running))
+        await release.wait()
+        running.remove(msg["id"])
+        return {"status": "ok"}
+
+    async def body(port):
+        nonlocal release
+        release = asyncio.Event()
+        async with PeerClient("127.0.0.1", port) as client:
+            calls = asyncio.ensure_future(asyncio.gather(*(client.request({"type": "WORK"}) for _ in range(20))))
+            await asyncio.sleep(0.2)
+            started = server.requests
+            release.set()
+            await calls
+            return started
+
+    assert run_with_server(server, body) == 4
+    assert max(peak) == 4 and server.requests == 20
+
+
+def test_handler_errors_and_unknown_types_are_answered():
+    server = PeerServer()
+
+    @server.route("FAIL")
+    async def fail(msg):
+        raise ValueError("nope")
+
+    async def body(port):
+        async with PeerClient("127.0.0.1", port) as client:
+            return await client.request({"type": "FAIL"}), await client.request({"type": "HELLO"})
+
+    failed, hello = run_with_server(server, body)
+    assert failed["status"] == "error" and failed["message"] == "nope"
+    assert hello["status"] == "ok"
+
+
+def test_many_concurrent_connections_and_blocking_clients():
+    server = PeerServer()
+
+    async def body(port):
+        clients = [await PeerClient("127.0.0.1", port).connect() for _ in range(200)]
+        try:
+            responses = await asyncio.gather(*(c.request({"type": "HELLO"}) for c in clients))
+            open_connections = server.connections
+        finally:
+            await asyncio.gather(*(c.close() for c in clients))
+
+        def blocking():
+            with socket.create_connection(("127.0.0.1", port)) as s:
+                send_json(s, {"type": "HELLO", "id": 7})
+                send_json(s, {"type": "HELLO", "id": 8})
+                return recv_json(s), recv_json(s)
+
+        legacy = await asyncio.get_running_loop().run_in_executor(None, blocking)
+        return responses, open_connections, legacy
+
+    responses, open_connections, legacy = run_with_server(server, body)
+    assert len(responses) == 200 and all(r["status"] == "ok" for r in responses)
+    assert open_connections == 200
+    assert sorted(r["id"] for r in legacy) == [7, 8]
+
+
+def test_oversized_frames_close_the_connection():
+    server = PeerServer(max_frame=1024)
+
+    async def body(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(struct.pack("!I", 1 << 20))
+        await writer.drain()
+        error = await reader.read()
+        writer.close()
+        return error
+
+    error = run_with_server(server, body)
+    (length,) = struct.unpack("!I", error[:4])
+    assert len(error) == 4 + length
+    assert json.loads(error[4:])["status"] == "error"
+
+
+def test_idle_connections_are_swept():
+    server = PeerServer(idle_timeout=0.2)
+
+    async def body(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await asyncio.sleep(0.05)
+        before = server.connections
+        closed = await asyncio.wait_for(reader.read(), 2)
+        await asyncio.sleep(0.01)
+        writer.close()
+        return before, closed, server.connections
+
+    assert run_with_server(server, body) == (1, b"", 0)
+
+
+def test_close_ends_connected_peers():
+    server = PeerServer()
+
+    async def run():
+        await server.start("127.0.0.1", 0)
+        client = await PeerClient("127.0.0.1", server.port).connect()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        assert (await client.request({"type": "HELLO"}))["status"] == "ok"
+        await asyncio.wait_for(server.close(), 5)
+        eof = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        await client.close()
+        return eof, server.connections
+
+    assert asyncio.run(run()) == (b"", 0)
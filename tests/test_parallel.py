@@ -0,0 +1,40 @@
+# tests/test_parallel.py
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.parallel import ordered_amap, ordered_map
+
+
+def slow_square(x):
+    time.sleep(random.random() / 500)
+    return x * x
+
+
+def test_ordered_map_keeps_input_order_with_bounded_window():
+    submitted = []
+
+    def items():
+        for i in range(100):
+            submitted.append(i)
+            yield i
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = []
+        for r in ordered_map(slow_square, items(), pool, window=8):
+            # never more than `window` items ahead of what has been consumed
+            assert len(submitted) - len(results) <= 8
+            results.append(r)
+    assert results == [i * i for i in range(100)]
+
+
+def test_ordered_amap_keeps_input_order():
+    async def items():
+        for i in range(50):
+            yield i
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            return [r async for r in ordered_amap(slow_square, items(), pool, window=6)]
+
+    assert asyncio.run(run()) == [i * i for i in range(50)]
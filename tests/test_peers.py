@@ -0,0 +1,78 @@
+# tests/test_peers.py
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.common.hashing import sha256_hex
+from src.common import transport
+from src.common.transport import Transport
+from src.retrieval import retriever
+from src.retrieval.peers import HEDGE_DEFAULT, HEDGE_MIN_SAMPLES, PeerTracker
+
+FAST = {"host": "fast", "port": 1}
+SLOW = {"host": "slow", "port": 2}
+DEAD = {"host": "dead", "port": 3}
+
+
+def test_ranking_prefers_fast_healthy_peers():
+    tracker = PeerTracker()
+    for _ in range(5):
+        tracker.succeeded(FAST, tracker.started(FAST) - 0.01)
+        tracker.succeeded(SLOW, tracker.started(SLOW) - 0.5)
+        tracker.started(DEAD)
+        tracker.failed(DEAD)
+    assert tracker.rank([DEAD, SLOW, FAST]) == [FAST, SLOW, DEAD]
+    assert tracker.stats(FAST).inflight == 0
+
+
+def test_hedge_deadline_follows_recent_latency():
+    tracker = PeerTracker()
+    assert tracker.hedge_deadline() == HEDGE_DEFAULT
+    for _ in range(HEDGE_MIN_SAMPLES * 2):
+        tracker.succeeded(FAST, tracker.started(FAST) - 0.1)
+    assert 0.1 <= tracker.hedge_deadline() < 0.2
+
+
+def serve(monkeypatch, data, delays, failing=()):
+    async def handler(request):
+        host = request.url.host
+        if host in failing:
+            return httpx.Response(500)
+        await asyncio.sleep(delays.get(host, 0))
+        return httpx.Response(200, content=data)
+    # monkeypatch puts the process-wide transport back after the test
+    monkeypatch.setattr(transport, "_transport", Transport(
+        transport_factory=lambda host, port: httpx.MockTransport(handler)))
+
+
+def test_slow_replica_is_hedged(monkeypatch):
+    monkeypatch.setattr(retriever, "peer_tracker", PeerTracker())
+    data = b"chunk"
+    serve(monkeypatch, data, {"slow": 3.0})
+    value = {"peers": [SLOW, FAST]}
+
+    async def run():
+        # Whatever the first pick, no fetch waits for the slow replica
+        for _ in range(4):
+            t = time.monotonic()
+            assert await retriever.fetch_chunk([], sha256_hex(data), 0, value) == data
+            assert time.monotonic() - t < 1.5
+    asyncio.run(run())
+    assert retriever.peer_tracker.rank([SLOW, FAST])[0] == FAST
+
+
+def test_failed_replica_falls_through(monkeypatch):
+    monkeypatch.setattr(retriever, "peer_tracker", PeerTracker())
+    data = b"chunk"
+    serve(monkeypatch, data, {}, failing=("dead",))
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await retriever.fetch_chunk([], sha256_hex(data), 0, {"peers": [DEAD]})
+        for _ in range(3):
+            assert await retriever.fetch_chunk([], sha256_hex(data), 0, {"peers": [DEAD, FAST]}) == data
+    asyncio.run(run())
+    assert retriever.peer_tracker.stats(DEAD).error_rate > 0
+    assert retriever.peer_tracker.rank([DEAD, FAST])[0] == FAST
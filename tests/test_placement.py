@@ -0,0 +1,37 @@
+# tests/test_placement.py
+from collections import Counter
+
+from src.common.hashing import sha256_hex
+from src.dht.placement import Placement
+
+KEYS = [sha256_hex(str(i).encode()) for i in range(4000)]
+
+
+def nodes(n):
+    return [("127.0.0.1", 7000 + i) for i in range(n)]
+
+
+def holders(placement, key):
+    return {c.port for c in placement.nodes_for(key)}
+
+
+def test_replicas_are_distinct_and_stable():
+    a, b = Placement(nodes(10), replicas=3), Placement(reversed(nodes(10)), replicas=3)
+    for key in KEYS[:200]:
+        assert len(holders(a, key)) == 3
+        assert holders(a, key) == holders(b, key)
+    assert len(Placement(nodes(2), replicas=5).nodes_for(KEYS[0])) == 2
+
+
+def test_load_is_spread():
+    placement = Placement(nodes(10), replicas=2)
+    load = Counter(port for key in KEYS for port in holders(placement, key))
+    assert min(load.values()) > 0.4 * len(KEYS) * 2 / 10
+
+
+def test_adding_a_node_moves_about_r_over_n():
+    before, after = Placement(nodes(10), replicas=2), Placement(nodes(11), replicas=2)
+    moved = sum(holders(before, k) != holders(after, k) for k in KEYS)
+    # Only keys whose new replica set includes the new node change
+    assert all(7010 in holders(after, k) for k in KEYS if holders(before, k) != holders(after, k))
+    assert moved < len(KEYS) * 2 * 2 / 11
@@ -0,0 +1,68 @@
+# tests/test_ranges.py
+import pytest
+
+from src.retrieval.manifest import Manifest, PackedArray, save_binary_manifest
+from src.retrieval.ranges import MAX_RANGES, ChunkLayout, RangeNotSatisfiable, parse_range
+
+
+def test_parse_range_forms():
+    assert parse_range("bytes=0-9", 100) == [(0, 9)]
+    assert parse_range("bytes=90-", 100) == [(90, 99)]
+    assert parse_range("bytes=-10", 100) == [(90, 99)]
+    assert parse_range("bytes=-500", 100) == [(0, 99)]
+    assert parse_range("bytes=95-200", 100) == [(95, 99)]
+    assert parse_range("bytes=0-1, 5-6,-1", 100) == [(0, 1), (5, 6), (99, 99)]
+    # Parts starting past the end are dropped, not fatal
+    assert parse_range("bytes=0-1,200-300", 100) == [(0, 1)]
+
+
+@pytest.mark.parametrize("header", ["items=0-9", "bytes=", "bytes=a-b", "bytes=9-0", "bytes=5"])
+def test_malformed_ranges_are_ignored(header):
+    assert parse_range(header, 100) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=-0", "bytes=" + ",".join(["0-0"] * (MAX_RANGES + 1))])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 100)
+
+
+def manifest(**kw):
+    base = {"fileId": "f", "totalChunks": 4, "chunkHashes": ["00" * 32] * 4, "chunkSize": 10, "size": 35}
+    base.update(kw)
+    return Manifest(**base)
+
+
+def test_fixed_layout():
+    layout = ChunkLayout(manifest())
+    assert layout.size == 35
+    assert layout.span(0, 9) == (0, 0)
+    assert layout.span(9, 10) == (0, 1)
+    assert layout.span(25, 34) == (2, 3)
+    assert layout.start_of(3) == 30
+
+
+def test_variable_layout():
+    layout = ChunkLayout(manifest(chunkSizes=[5, 20, 3, 7], size=None))
+    assert layout.size == 35
+    assert layout.span(0, 4) == (0, 0)
+    assert layout.span(4, 5) == (0, 1)
+    assert layout.span(25, 27) == (2, 2)
+    assert layout.span(28, 34) == (3, 3)
+    assert [layout.start_of(i) for i in range(4)] == [0, 5, 25, 28]
+
+
+def test_binary_manifest_layout_sums_the_mapped_sizes(tmp_path, monkeypatch):
+    sizes = [5, 20, 3, 7, 70000, 1]
+    data = manifest(totalChunks=6, chunkHashes=["00" * 32] * 6, chunkSizes=sizes, size=None).model_dump()
+    path = str(tmp_path / "m.dfsm")
+    save_binary_manifest(data, path)
+    loaded = Manifest.load(path)
+    assert isinstance(loaded.chunkSizes, PackedArray)
+    # Sizes must be summed from the buffer, not decoded one by one
+    monkeypatch.setattr(PackedArray, "__iter__", None)
+    monkeypatch.setattr(PackedArray, "__getitem__", None)
+    layout = ChunkLayout(loaded)
+    assert layout.size == sum(sizes)
+    assert [layout.start_of(i) for i in range(6)] == [0, 5, 25, 28, 35, 70035]
+    assert layout.span(70034, 70035) == (4, 5) and layout.length_of(5) == 1
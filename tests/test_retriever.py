@@ -0,0 +1,152 @@
+# tests/test_retriever.py
+import asyncio
+import os
+import random
+
+import pytest
+
+from src.common.erasure import ReedSolomon
+from src.common.hashing import sha256_hex
+from src.common.merkle import MerkleTree, merkle_root
+from src.retrieval import retriever
+from src.retrieval.manifest import Manifest
+from src.retrieval.ranges import ChunkLayout
+
+
+def make_manifest(chunks):
+    hashes = [sha256_hex(c) for c in chunks]
+    return Manifest(fileId="f.bin", totalChunks=len(chunks), chunkHashes=hashes, chunkSize=len(chunks[0]),
+                    size=sum(map(len, chunks)), merkleRoot=merkle_root(hashes))
+
+
+@pytest.fixture
+def network(monkeypatch):
+    """Chunks served by a stubbed fetch_chunk that finishes in random order."""
+    net = {"chunks": {}, "inflight": 0, "max_inflight": 0, "fetched": [], "lookups": []}
+
+    async def find_values(bootstrap, keys):
+        net["lookups"].extend(keys)
+        return {}
+
+    async def fetch_chunk(bootstrap, chunk_hash, index, value=None, use_cache=True):
+        net["fetched"].append(index)
+        net["inflight"] += 1
+        net["max_inflight"] = max(net["max_inflight"], net["inflight"])
+        try:
+            await asyncio.sleep(random.random() / 100)
+            return net["chunks"][chunk_hash]
+        finally:
+            net["inflight"] -= 1
+
+    monkeypatch.setattr(retriever, "chunk_cache", None)
+    monkeypatch.setattr(retriever, "find_values", find_values)
+    monkeypatch.setattr(retriever, "fetch_chunk", fetch_chunk)
+    return net
+
+
+def serve(net, chunks):
+    net["chunks"].update((sha256_hex(c), c) for c in chunks)
+    return make_manifest(chunks)
+
+
+async def collect(chunks):
+    return [c async for c in chunks]
+
+
+def test_stream_file_keeps_order_within_the_window(network):
+    chunks = [os.urandom(100) for _ in range(20)]
+    manifest = serve(network, chunks)
+
+    async def run():
+        stream = retriever.stream_file(manifest, [], window=4)
+        first = await stream.__anext__()
+        started = len(network["fetched"])
+        return [first] + await collect(stream), started
+
+    received, started = asyncio.run(run())
+    assert received == chunks
+    # Nothing runs more than ``window`` chunks ahead of the consumer
+    assert started == 4
+    assert network["max_inflight"] <= 4
+
+
+def test_stream_file_covers_a_chunk_range(network):
+    chunks = [os.urandom(100) for _ in range(10)]
+    manifest = serve(network, chunks)
+
+    received = asyncio.run(collect(retriever.stream_file(manifest, [], window=3, first=2, stop=7)))
+    assert received == chunks[2:7]
+    assert sorted(network["fetched"]) == [2, 3, 4, 5, 6]
+
+
+@pytest.mark.parametrize("start,end", [(0, 0), (5, 95), (90, 110), (0, 936), (250, 899), (936, 936)])
+def test_stream_byte_range_fetches_only_overlapping_chunks(network, start, end):
+    chunks = [os.urandom(100) for _ in range(9)] + [os.urandom(37)]
+    manifest = serve(network, chunks)
+    data = b"".join(chunks)
+    layout = ChunkLayout(manifest)
+
+    received = asyncio.run(collect(retriever.stream_byte_range(manifest, [], layout, start, end, window=2)))
+    assert b"".join(received) == data[start:end + 1]
+    assert sorted(network["fetched"]) == list(range(start // 100, end // 100 + 1))
+
+
+def test_resolve_span_fails_before_fetching(network, monkeypatch):
+    chunks = [os.urandom(100) for _ in range(4)]
+    manifest = serve(network, chunks)
+
+    async def find_values(bootstrap, keys):
+        return {k: {"peers": [{"host": "h", "port": 1}]} for k in keys if k != manifest.chunkHashes[2]}
+
+    monkeypatch.setattr(retriever, "find_values", find_values)
+    items = asyncio.run(retriever.resolve_span(manifest, [], 0, 2))
+    assert [i for i, _, _ in items] == [0, 1]
+    with pytest.raises(RuntimeError, match="chunk 2"):
+        asyncio.run(retriever.resolve_span(manifest, [], 1, 4))
+    assert network["fetched"] == []
+
+
+def test_fetch_stripe_rebuilds_from_parity(network, monkeypatch):
+    codec = ReedSolomon(3, 2)
+    data = os.urandom(1000)
+    shards = codec.encode(data)
+    shard_hashes = [sha256_hex(s) for s in shards]
+    serve(network, shards)
+    fetch_chunk = retriever.fetch_chunk
+    lost = {0, 2}
+
+    async def flaky(bootstrap, chunk_hash, index, value=None, use_cache=True):
+        if shard_hashes.index(chunk_hash) in lost:
+            raise RuntimeError("shard missing")
+        return await fetch_chunk(bootstrap, chunk_hash, index, value, use_cache)
+
+    monkeypatch.setattr(retriever, "fetch_chunk", flaky)
+    values = [None] * codec.n
+    rebuilt = asyncio.run(retriever.fetch_stripe([], codec, sha256_hex(data), 0, shard_hashes, values, len(data)))
+    assert rebuilt == data
+    # Both parity shards were needed and asked for
+    assert len(network["fetched"]) == 3
+
+    lost.add(1)
+    with pytest.raises(RuntimeError, match="Only 2 of 3 shards"):
+        asyncio.run(retriever.fetch_stripe([], codec, sha256_hex(data), 0, shard_hashes, values, len(data)))
+
+
+def test_fetch_verified_range_checks_the_proof_first(network):
+    chunks = [os.urandom(100) for _ in range(11)]
+    manifest = serve(network, chunks)
+    hashes = manifest.chunkHashes
+    proof = MerkleTree(hashes).prove_range(3, 8)
+    root = manifest.merkleRoot
+
+    received = asyncio.run(retriever.fetch_verified_range([], root, 11, 3, hashes[3:8], proof))
+    assert received == chunks[3:8]
+    assert network["lookups"] == hashes[3:8]
+
+    network["fetched"].clear()
+    swapped = hashes[3:8][::-1]
+    with pytest.raises(RuntimeError, match="does not match root"):
+        asyncio.run(retriever.fetch_verified_range([], root, 11, 3, swapped, proof))
+    with pytest.raises(RuntimeError, match="does not match root"):
+        asyncio.run(retriever.fetch_verified_range([], root, 11, 4, hashes[3:8], proof))
+    assert network["fetched"] == []
@@ -0,0 +1,55 @@
+# tests/test_routing.py
+import os
+from src.dht.id import random_node_id, xor_distance
+from src.dht.routing import Contact, RoutingTable
+
+
+def make_contacts(n):
+    return [Contact(id_hex=random_node_id().hex(), host="127.0.0.1", port=7000 + i) for i in range(n)]
+
+
+def test_closest_matches_full_sort():
+    rt = RoutingTable(random_node_id(), k=1000)
+    contacts = make_contacts(2000)
+    for c in contacts:
+        rt.add(c)
+    for _ in range(50):
+        target = os.urandom(32).hex()
+        expected = sorted(rt.all(), key=lambda c: xor_distance(bytes.fromhex(c.id_hex), bytes.fromhex(target)))
+        assert [c.id_hex for c in rt.closest(target, 20)] == [c.id_hex for c in expected[:20]]
+
+
+def test_buckets_are_bounded_and_deduplicated():
+    rt = RoutingTable(random_node_id(), k=4)
+    contacts = make_contacts(500)
+    for c in contacts:
+        rt.add(c)
+        rt.add(c)
+    assert len(rt) == len(rt.all()) <= 4 * 160
+    assert len({c.id_hex for c in rt.all()}) == len(rt)
+
+
+def test_re_adding_updates_contact_and_remove_promotes_replacement():
+    self_id = bytes(20)
+    rt = RoutingTable(self_id, k=1)
+    # Both IDs have the top bit set, so they land in the same bucket
+    a = Contact(id_hex="80" + "00" * 19, host="h", port=1)
+    b = Contact(id_hex="ff" * 20, host="h", port=2)
+    rt.add(a)
+    rt.add(b)
+    assert [c.port for c in rt.all()] == [1]
+
+    rt.add(Contact(id_hex=a.id_hex, host="h", port=3))
+    assert [c.port for c in rt.all()] == [3]
+
+    rt.remove(a.id_hex)
+    assert [c.port for c in rt.all()] == [2]
+
+
+def test_replacement_cache_is_bounded_by_k():
+    rt = RoutingTable(bytes(20), k=1)
+    rt.add(Contact(id_hex="80" + "00" * 19, host="h", port=1))
+    for i in range(50):
+        rt.add(Contact(id_hex="ff" + "%038x" % i, host="h", port=100 + i))
+    assert [len(cache) for cache in rt._replacements.values()] == [1]
+    assert [c.port for c in rt._replacements[160]] == [149]
@@ -0,0 +1,66 @@
+# tests/test_store.py
+import sqlite3
+import threading
+
+import pytest
+
+from src.dht.store import KVStore
+
+
+def test_records_survive_reopen(tmp_path):
+    path = str(tmp_path / "dht.sqlite3")
+    store = KVStore(path)
+    store["a" * 64] = {"peers": [{"host": "127.0.0.1", "port": 7002}]}
+    store.put_many([("b" * 64, {"peers": []}), ("c" * 64, {"peers": []})])
+    store.close()
+
+    reopened = KVStore(path)
+    assert reopened["a" * 64] == {"peers": [{"host": "127.0.0.1", "port": 7002}]}
+    assert "b" * 64 in reopened
+    assert "d" * 64 not in reopened
+    assert reopened.get_many(["a" * 64, "c" * 64, "d" * 64]).keys() == {"a" * 64, "c" * 64}
+    assert len(reopened) == 3
+    reopened.close()
+
+
+def test_concurrent_writers_are_group_committed(tmp_path):
+    store = KVStore(str(tmp_path / "dht.sqlite3"))
+
+    def writer(t):
+        for i in range(50):
+            store.put(f"{t:02d}{i:062d}", {"n": i})
+
+    threads = [threading.Thread(target=writer, args=(t,)) for t in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(store) == 400
+    assert store.get(f"07{49:062d}") == {"n": 49}
+    store.close()
+
+
+def test_unflushed_writes_are_readable(tmp_path):
+    store = KVStore(str(tmp_path / "dht.sqlite3"))
+    store.put("k" * 64, [1, 2, 3], wait=False)
+    assert store["k" * 64] == [1, 2, 3]
+    store.close()
+    assert KVStore(str(tmp_path / "dht.sqlite3"))["k" * 64] == [1, 2, 3]
+
+
+def test_close_closes_every_reader_connection(tmp_path):
+    store = KVStore(str(tmp_path / "kv.sqlite3"))
+    store["a"] = 1
+    threads = [threading.Thread(target=store.get, args=("a",)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    readers = list(store._readers)
+    assert len(readers) == 5  # the opening thread plus four readers
+    store.close()
+    for conn in readers:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    with pytest.raises(RuntimeError):
+        store.get("a")
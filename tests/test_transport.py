@@ -0,0 +1,35 @@
+# tests/test_transport.py
+import asyncio
+
+import httpx
+
+from src.common.transport import Transport
+
+
+class CountingTransport(httpx.MockTransport):
+    closed = 0
+
+    async def aclose(self):
+        CountingTransport.closed += 1
+
+
+def test_clients_are_closed_when_their_event_loop_ends():
+    CountingTransport.closed = 0
+    t = Transport(transport_factory=lambda host, port: CountingTransport(lambda r: httpx.Response(200)))
+
+    async def use():
+        await t.get("a", 1, "/")
+        await t.get("b", 2, "/")
+
+    asyncio.run(use())
+    assert CountingTransport.closed == 2
+    asyncio.run(use())
+    assert CountingTransport.closed == 4
+
+    async def use_and_close():
+        await use()
+        await t.aclose()
+        await t.get("a", 1, "/")
+
+    asyncio.run(use_and_close())
+    assert CountingTransport.closed == 7